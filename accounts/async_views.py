@@ -0,0 +1,11 @@
+from django.views.decorators.csrf import csrf_exempt
+
+from .cache import asession_profile
+from .views import session_response
+
+
+# Versión asíncrona de session_view para el perfil ASGI (main.settings_asgi):
+# la sesión y el perfil cacheado se leen sin ocupar un hilo
+@csrf_exempt
+async def session_view(request):
+    return session_response(await asession_profile(request))
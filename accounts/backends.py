@@ -0,0 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password, verify_password
+from django.core.exceptions import PermissionDenied
+
+from .hashing import hash_pool
+
+
+UserModel = get_user_model()
+
+
+class PooledHashBackend(ModelBackend):
+    """
+    ModelBackend que busca al usuario en el hilo del request y calcula el hash
+    en hash_pool(). Con el pool lleno propaga HashingBusy antes de hashear.
+    Un intento fallido lanza PermissionDenied para que authenticate() no lo
+    repita con el ModelBackend que sigue en AUTHENTICATION_BACKENDS (listado
+    solo para que las sesiones abiertas con él sigan siendo válidas).
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return
+        pool = hash_pool()
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Igual que ModelBackend: se hashea una vez para no delatar qué emails existen
+            pool.run(make_password, password)
+            raise PermissionDenied
+        valid, must_update = pool.run(verify_password, password, user.password)
+        if not valid or not self.user_can_authenticate(user):
+            raise PermissionDenied
+        if must_update:
+            user.password = pool.run(make_password, password)
+            user.save(update_fields=['password'])
+        return user
@@ -0,0 +1,88 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare
+
+
+# Campos del usuario que devuelve session_view
+PROFILE_FIELDS = ('first_name', 'last_name', 'email', 'rol')
+PROFILE_CACHE_TIMEOUT = getattr(settings, 'PROFILE_CACHE_TIMEOUT', 60)
+
+
+def profile_key(user_id):
+    return f'accounts:profile:{user_id}'
+
+
+def make_profile(user):
+    """
+    Campos de PROFILE_FIELDS más el hash de autenticación de la sesión, que
+    deriva de la contraseña: así una sesión de antes de un cambio de contraseña
+    no se valida contra el perfil cacheado. ``is_active`` y ``cached_at``
+    permiten rechazar perfiles de usuarios desactivados o demasiado viejos.
+    """
+    profile = {field: getattr(user, field) for field in PROFILE_FIELDS}
+    profile['session_hash'] = user.get_session_auth_hash()
+    profile['is_active'] = user.is_active
+    profile['cached_at'] = time.time()
+    return profile
+
+
+def cache_profile(user):
+    profile = make_profile(user)
+    cache.set(profile_key(user.pk), profile, PROFILE_CACHE_TIMEOUT)
+    return profile
+
+
+def invalidate_profile(user_id):
+    cache.delete(profile_key(user_id))
+
+
+def cached_profile(session, profile):
+    """
+    El perfil cacheado sirve solo si la sesión lo respalda igual que lo haría
+    get_user() y tiene menos de PROFILE_CACHE_TIMEOUT segundos, aunque la
+    caché lo conserve más (por ejemplo, si no expira las claves).
+    """
+    return (
+        profile is not None
+        and profile.get('is_active', False)
+        and time.time() - profile.get('cached_at', 0) < PROFILE_CACHE_TIMEOUT
+        and session.get(BACKEND_SESSION_KEY) in settings.AUTHENTICATION_BACKENDS
+        and constant_time_compare(profile['session_hash'], session.get(HASH_SESSION_KEY, ''))
+    )
+
+
+def session_profile(request):
+    """
+    Perfil del usuario de la sesión, o None si no hay usuario autenticado.
+    Con SESSION_ENGINE cached_db y el perfil en caché no toca la base de datos.
+    Ante cualquier duda (sin perfil, hash distinto, backend desconocido) se
+    resuelve con request.user, que hace todas las comprobaciones de Django
+    y, si el usuario es válido, vuelve a cachear el perfil.
+    """
+    user_id = request.session.get(SESSION_KEY)
+    if user_id is None:
+        return None
+    profile = cache.get(profile_key(user_id))
+    if cached_profile(request.session, profile):
+        return profile
+    if not request.user.is_authenticated:
+        return None
+    return cache_profile(request.user)
+
+
+async def asession_profile(request):
+    user_id = await request.session.aget(SESSION_KEY)
+    if user_id is None:
+        return None
+    profile = await cache.aget(profile_key(user_id))
+    if cached_profile(request.session, profile):
+        return profile
+    user = await request.auser()
+    if not user.is_authenticated:
+        return None
+    profile = make_profile(user)
+    await cache.aset(profile_key(user.pk), profile, PROFILE_CACHE_TIMEOUT)
+    return profile
@@ -0,0 +1,60 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.conf import settings
+
+
+def setup_worker(settings_module):
+    """
+    Inicializa los procesos que hashean las contraseñas de accounts/importer.py.
+    Se inician con spawn y parten sin Django configurado, por eso vive en este
+    módulo, que no importa modelos.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    django.setup()
+
+
+class HashingBusy(Exception):
+    """Todos los workers y lugares de la cola de hashing están ocupados."""
+
+
+class HashPool:
+    """
+    Pool acotado para calcular hashes de contraseñas fuera del hilo del request.
+    Hay ``workers`` hilos y a lo sumo ``queue`` trabajos esperando; si no queda
+    lugar, run() lanza HashingBusy de inmediato, sin calcular nada. Los hashers
+    de Django (PBKDF2 con hashlib, Argon2, bcrypt) liberan el GIL, así los hilos
+    usan varios núcleos a la vez.
+    """
+
+    def __init__(self, workers, queue):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self.slots = threading.BoundedSemaphore(workers + queue)
+
+    def run(self, fn, *args):
+        if not self.slots.acquire(blocking=False):
+            raise HashingBusy
+        try:
+            future = self.executor.submit(fn, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda future: self.slots.release())
+        return future.result()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def hash_pool():
+    """Pool del proceso, creado en el primer uso con LOGIN_HASH_WORKERS y LOGIN_HASH_QUEUE."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                workers = getattr(settings, 'LOGIN_HASH_WORKERS', None) or os.cpu_count() or 1
+                _pool = HashPool(workers, getattr(settings, 'LOGIN_HASH_QUEUE', workers))
+    return _pool
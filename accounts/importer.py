@@ -0,0 +1,202 @@
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from products.importer import MAX_REPORTED_ERRORS, READERS, SCALAR_TYPES, RowError
+
+from .hashing import setup_worker
+from .models import CustomUser
+
+
+IMPORT_BATCH_SIZE = 1000
+REQUIRED_FIELDS = ('email', 'password', 'first_name', 'last_name')
+ROLES = {value for value, label in CustomUser.ROLES}
+# Campos de texto con su largo máximo en la tabla
+MAX_LENGTHS = {field: CustomUser._meta.get_field(field).max_length for field in ('email', 'first_name', 'last_name')}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class TooManyRows(Exception):
+    """El archivo trae más filas de las que se importan en un request."""
+
+
+def make_executor(workers):
+    # spawn y no fork: el proceso web tiene hilos y conexiones abiertas que un fork copiaría a medias
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=setup_worker,
+        initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'main.settings'),),
+    )
+
+
+def hash_executor():
+    """
+    Pool del proceso web para hashear las contraseñas de las importaciones,
+    creado en el primer uso con USER_IMPORT_WORKERS y compartido entre
+    requests para no iniciar procesos en cada uno. None si hay un solo worker.
+    """
+    global _executor
+    workers = getattr(settings, 'USER_IMPORT_WORKERS', None) or os.cpu_count() or 1
+    if workers <= 1:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = make_executor(workers)
+    return _executor
+
+
+class UserImporter:
+    """
+    Crea usuarios por lotes. Las contraseñas de cada lote se hashean en un pool
+    de ``workers`` procesos (uno por núcleo por defecto) y las filas se insertan
+    con un bulk_create. Los emails ya registrados o repetidos en el archivo se
+    informan como errores y no se actualizan. Con ``executor`` se usa ese pool
+    (sin cerrarlo al terminar) en lugar de crear uno propio.
+    """
+    def __init__(self, batch_size=IMPORT_BATCH_SIZE, workers=None, executor=None):
+        self.batch_size = batch_size
+        self.executor = executor
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = executor
+        self.seen = set()
+        self.created = 0
+        self.error_count = 0
+        self.errors = []
+
+    def run(self, rows):
+        if self.pool is None and self.workers > 1:
+            self.pool = make_executor(self.workers)
+        try:
+            batch = []
+            for number, row in rows:
+                if isinstance(row, RowError):
+                    self.add_error(number, row)
+                    continue
+                batch.append((number, row))
+                if len(batch) >= self.batch_size:
+                    self.flush(batch)
+                    batch = []
+            if batch:
+                self.flush(batch)
+        finally:
+            if self.pool is not None and self.pool is not self.executor:
+                self.pool.shutdown()
+        return self.report()
+
+    def report(self):
+        return {
+            'created': self.created,
+            'error_count': self.error_count,
+            'errors': sorted(self.errors, key=lambda error: error['row']),
+        }
+
+    def add_error(self, number, error):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': number, 'error': str(error)})
+
+    def clean(self, row):
+        missing = [field for field in REQUIRED_FIELDS if field not in row]
+        if missing:
+            raise RowError(f"Faltan campos requeridos: {', '.join(missing)}")
+        for field in REQUIRED_FIELDS + ('rol',):
+            if field in row and not isinstance(row[field], SCALAR_TYPES):
+                raise RowError(f'El campo {field} debe ser un texto o un número')
+        email = CustomUser.objects.normalize_email(str(row['email']).strip())
+        try:
+            validate_email(email)
+        except ValidationError:
+            raise RowError(f'El email {email} no es válido')
+        values = {'email': email, 'first_name': str(row['first_name']), 'last_name': str(row['last_name'])}
+        for field, value in values.items():
+            if len(value) > MAX_LENGTHS[field]:
+                raise RowError(f'El campo {field} admite hasta {MAX_LENGTHS[field]} caracteres')
+        rol = row.get('rol', 'user')
+        if not isinstance(rol, str) or rol not in ROLES:
+            raise RowError(f"El rol debe ser uno de: {', '.join(sorted(ROLES))}")
+        return {**values, 'rol': rol}, str(row['password'])
+
+    def hash_passwords(self, passwords):
+        if self.pool is None:
+            return [make_password(password) for password in passwords]
+        chunksize = max(1, math.ceil(len(passwords) / (self.workers * 4)))
+        return list(self.pool.map(make_password, passwords, chunksize=chunksize))
+
+    def registered(self, emails):
+        return set(CustomUser.objects.filter(email__in=emails).values_list('email', flat=True))
+
+    def write(self, rows):
+        """
+        Inserta los usuarios de ``rows`` (pares número de fila, usuario) en una
+        transacción. Si otro request registró alguno de los emails después de
+        la consulta de flush(), el INSERT falla y se revierte entero: esas filas
+        se informan como errores y se reintenta con el resto.
+        """
+        while rows:
+            try:
+                with transaction.atomic():
+                    CustomUser.objects.bulk_create([user for number, user in rows], batch_size=self.batch_size)
+            except IntegrityError:
+                taken = self.registered([user.email for number, user in rows])
+                if not taken:
+                    raise
+                for number, user in rows:
+                    if user.email in taken:
+                        self.add_error(number, RowError(f'El email {user.email} ya está en uso'))
+                rows = [(number, user) for number, user in rows if user.email not in taken]
+            else:
+                self.created += len(rows)
+                return
+
+    def flush(self, batch):
+        cleaned = []
+        for number, row in batch:
+            try:
+                values, password = self.clean(row)
+            except RowError as error:
+                self.add_error(number, error)
+                continue
+            cleaned.append((number, values, password))
+
+        existing = self.registered([values['email'] for number, values, password in cleaned])
+        rows = []
+        passwords = []
+        for number, values, password in cleaned:
+            if values['email'] in existing or values['email'] in self.seen:
+                self.add_error(number, RowError(f"El email {values['email']} ya está en uso"))
+                continue
+            self.seen.add(values['email'])
+            rows.append((number, CustomUser(**values)))
+            passwords.append(password)
+
+        for (number, user), password in zip(rows, self.hash_passwords(passwords)):
+            user.password = password
+        self.write(rows)
+
+
+def import_users(lines, format, batch_size=IMPORT_BATCH_SIZE, workers=None, executor=None, max_rows=None):
+    """
+    Importa usuarios desde líneas de texto en formato ``csv`` o ``jsonl``. Con
+    ``max_rows`` se leen todas las filas antes de crear usuarios y, si hay más,
+    se lanza TooManyRows sin importar ninguna.
+    """
+    if workers is None:
+        workers = getattr(settings, 'USER_IMPORT_WORKERS', None)
+    rows = READERS[format](lines)
+    if max_rows is not None:
+        rows = list(islice(rows, max_rows + 1))
+        if len(rows) > max_rows:
+            raise TooManyRows
+    return UserImporter(batch_size=batch_size, workers=workers, executor=executor).run(rows)
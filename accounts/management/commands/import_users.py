@@ -0,0 +1,33 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.importer import IMPORT_BATCH_SIZE, READERS, import_users
+
+
+class Command(BaseCommand):
+    help = "Crea usuarios desde un archivo CSV o JSONL (usar - para stdin); las contraseñas se hashean en paralelo"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=sorted(READERS), help="Por defecto se deduce de la extensión")
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+        parser.add_argument('--workers', type=int, help="Procesos que hashean contraseñas (por defecto, uno por núcleo)")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = options['format'] or ('csv' if path.endswith('.csv') else 'jsonl' if path.endswith(('.jsonl', '.ndjson')) else None)
+        if format is None:
+            raise CommandError("No se pudo deducir el formato, use --format")
+
+        if path == '-':
+            report = import_users(sys.stdin, format, options['batch_size'], options['workers'])
+        else:
+            with open(path, newline='', encoding='utf-8') as lines:
+                report = import_users(lines, format, options['batch_size'], options['workers'])
+
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+        if report['error_count']:
+            self.stderr.write(self.style.WARNING(f"{report['error_count']} filas con errores"))
+        self.stdout.write(self.style.SUCCESS(f"Usuarios creados: {report['created']}"))
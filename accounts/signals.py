@@ -0,0 +1,20 @@
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import cache_profile, invalidate_profile
+from .models import CustomUser
+
+
+# Cualquier cambio del usuario (datos, rol, contraseña) descarta su perfil cacheado.
+# Los .update() sobre el queryset no disparan la señal y con LocMemCache solo se descarta en este
+# proceso; en esos casos el perfil deja de usarse a los PROFILE_CACHE_TIMEOUT segundos.
+@receiver([post_save, post_delete], sender=CustomUser)
+def user_changed(sender, instance, **kwargs):
+    invalidate_profile(instance.pk)
+
+
+# Tras el login el perfil queda cacheado, así la primera consulta de sesión ya no va a la base de datos
+@receiver(user_logged_in)
+def user_logged_in_profile(sender, request, user, **kwargs):
+    cache_profile(user)
@@ -1,3 +1,245 @@
-from django.test import TestCase
+import json
+import threading
+import time
+from unittest import mock
+
+from django.conf import global_settings
+from django.contrib.auth.hashers import make_password
+from django.test import TestCase, override_settings
+
+from main.testing import SMALL, AsyncParityTestCase, QueryCountTestCase
+
+from .cache import PROFILE_CACHE_TIMEOUT, cache_profile
+from .hashing import HashingBusy, HashPool
+from .importer import UserImporter, import_users
+from .models import CustomUser
+from .throttle import memory_store
+
+
+PASSWORD = 'secreta123'
+
+
+def seed_users(rows):
+    """Completa hasta ``rows`` usuarios con la misma contraseña y devuelve el primero."""
+    start = CustomUser.objects.count()
+    password = make_password(PASSWORD)
+    CustomUser.objects.bulk_create([
+        CustomUser(email=f'usuario{rows}-{i}@example.com', first_name='Usuario', last_name=str(i), password=password)
+        for i in range(start, rows)
+    ])
+    return CustomUser.objects.order_by('id').first()
+
+
+def post_json(client, url, data):
+    return client.post(url, json.dumps(data), content_type='application/json')
+
+
+class AccountQueryCountTests(QueryCountTestCase):
+    def test_register(self):
+        def seed(rows):
+            seed_users(rows)
+            return f'nuevo{rows}@example.com'
+        self.assertStableQueries(2, seed, lambda email: post_json(self.client, '/accounts/register/', {
+            'email': email, 'password': PASSWORD, 'first_name': 'Nuevo', 'last_name': 'Usuario',
+        }))
+
+    def test_login(self):
+        def seed(rows):
+            self.client.cookies.clear()
+            return seed_users(rows)
+        self.assertStableQueries(9, seed, lambda user: post_json(self.client, '/accounts/login/', {
+            'email': user.email, 'password': PASSWORD,
+        }))
+
+    def test_logout(self):
+        def seed(rows):
+            user = seed_users(rows)
+            self.client.force_login(user)
+        self.assertStableQueries(4, seed, lambda context: self.client.post('/accounts/logout/'))
+
+    def test_session(self):
+        def seed(rows):
+            user = seed_users(rows)
+            self.client.force_login(user)
+        self.assertStableQueries(2, seed, lambda context: self.client.get('/accounts/session/'))
+
+    def test_session_cached(self):
+        # Con la sesión y el perfil en caché la consulta de sesión no toca la base de datos
+        user = seed_users(SMALL)
+        self.client.force_login(user)
+        with self.assertNumQueries(0):
+            response = self.client.get('/accounts/session/')
+        self.assertEqual(response.json()['email'], user.email)
+
+        # Guardar el usuario descarta el perfil; el siguiente request lo vuelve a cachear
+        user.rol = 'gerente'
+        user.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/accounts/session/').json()['rol'], 'gerente')
+        with self.assertNumQueries(0):
+            self.client.get('/accounts/session/')
+
+        # Cambiar la contraseña cierra la sesión
+        user.set_password('otra-clave')
+        user.save()
+        self.assertFalse(self.client.get('/accounts/session/').json()['estaAutenticado'])
+
+    def test_session_deactivated(self):
+        user = seed_users(SMALL)
+        self.client.force_login(user)
+        self.assertTrue(self.client.get('/accounts/session/').json()['estaAutenticado'])
+
+        # Desactivado sin señal (o en otro worker): el perfil cacheado vale hasta que vence
+        CustomUser.objects.filter(pk=user.pk).update(is_active=False)
+        self.assertTrue(self.client.get('/accounts/session/').json()['estaAutenticado'])
+        with mock.patch('accounts.cache.time') as clock:
+            clock.time.return_value = time.time() + PROFILE_CACHE_TIMEOUT
+            self.assertFalse(self.client.get('/accounts/session/').json()['estaAutenticado'])
+
+        # Un perfil de un usuario inactivo nunca se acepta
+        user.refresh_from_db()
+        cache_profile(user)
+        self.assertFalse(self.client.get('/accounts/session/').json()['estaAutenticado'])
+
+
+@override_settings(LOGIN_THROTTLE_RATES={'ip': (3, 60), 'email': (2, 60)})
+class LoginThrottleTests(TestCase):
+    def setUp(self):
+        memory_store.clear()
+        self.user = seed_users(1)
+
+    def login(self, email, ip='10.0.0.1'):
+        return self.client.post('/accounts/login/', json.dumps({'email': email, 'password': 'incorrecta'}),
+                                content_type='application/json', REMOTE_ADDR=ip)
+
+    def test_email_limit(self):
+        # Con el reloj detenido el bucket no se rellena mientras se hashean los intentos
+        with mock.patch.object(memory_store, 'now', return_value=1000.0) as clock:
+            self.assertEqual(self.login(self.user.email).status_code, 400)
+            self.assertEqual(self.login(self.user.email, '10.0.0.2').status_code, 400)
+            response = self.login(self.user.email, '10.0.0.3')
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response['Retry-After'], '30')
+
+            # A los 30 segundos hay un token nuevo para el email
+            clock.return_value = 1030.0
+            self.assertEqual(self.login(self.user.email, '10.0.0.4').status_code, 400)
+
+    def test_ip_limit(self):
+        for i in range(3):
+            self.assertEqual(self.login(f'desconocido{i}@example.com').status_code, 400)
+        self.assertEqual(self.login('otro@example.com').status_code, 429)
+        self.assertEqual(self.login('otro@example.com', '10.0.0.2').status_code, 400)
+
+    @override_settings(LOGIN_THROTTLE_RATES={'ip': (3, 60), 'email': (2, 300)})
+    def test_prune_keeps_longer_periods(self):
+        with mock.patch.object(memory_store, 'now', return_value=1000.0) as clock, \
+                mock.patch.object(memory_store, 'max_keys', 3):
+            self.login(self.user.email)
+            self.login(self.user.email, '10.0.0.2')
+
+            # A los 100 segundos los buckets de IP (60 s) vencieron, pero el del email (300 s) no:
+            # el bucket nuevo de la IP llena el store y el prune solo descarta los vencidos
+            clock.return_value = 1100.0
+            response = self.login(self.user.email, '10.0.0.3')
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response['Retry-After'], '50')
+            self.assertEqual(set(memory_store.buckets), {'login:ip:10.0.0.3', f'login:email:{self.user.email}'})
+
+    def test_busy_pool(self):
+        pool = HashPool(workers=1, queue=0)
+        started, release = threading.Event(), threading.Event()
+
+        def block():
+            started.set()
+            release.wait()
+
+        worker = threading.Thread(target=pool.run, args=(block,))
+        worker.start()
+        started.wait()
+        with self.assertRaises(HashingBusy):
+            pool.run(make_password, 'x')
+        release.set()
+        worker.join()
+        self.assertTrue(pool.run(make_password, 'x'))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], USER_IMPORT_WORKERS=1)
+class ImportUsersTests(TestCase):
+    def test_import(self):
+        manager = CustomUser.objects.create_user(email='gerente@example.com', password=PASSWORD, first_name='G', last_name='G', rol='gerente')
+        self.client.force_login(manager)
+        lines = ['email,password,first_name,last_name,rol']
+        lines += [f'nuevo{i}@example.com,clave{i},Nuevo,{i},conductor' for i in range(20)]
+        lines += ['gerente@example.com,x,Repetido,Email,user', 'nuevo0@example.com,x,Repetido,Archivo,user', 'sin-arroba,x,A,B,user']
+        lines += [f'largo@example.com,x,{"N" * 101},B,user', f'largo2@example.com,x,A,{"A" * 101},user']
+        response = self.client.post('/accounts/import/?format=csv', '\n'.join(lines), content_type='text/csv')
+
+        self.assertEqual(response.status_code, 201)
+        report = response.json()['data']
+        self.assertEqual(report['created'], 20)
+        self.assertEqual([error['row'] for error in report['errors']], [21, 22, 23, 24, 25])
+        user = CustomUser.objects.get(email='nuevo7@example.com')
+        self.assertTrue(user.check_password('clave7'))
+        self.assertEqual(user.rol, 'conductor')
+
+    # Los procesos del pool parten con spawn desde DJANGO_SETTINGS_MODULE: no ven override_settings
+    @override_settings(PASSWORD_HASHERS=global_settings.PASSWORD_HASHERS)
+    def test_process_pool(self):
+        lines = ['email,password,first_name,last_name'] + [f'nuevo{i}@example.com,clave{i},Nuevo,{i}' for i in range(4)]
+        report = import_users(lines, 'csv', workers=2)
+        self.assertEqual(report['created'], 4)
+        self.assertTrue(CustomUser.objects.get(email='nuevo3@example.com').check_password('clave3'))
+
+    @override_settings(USER_IMPORT_MAX_ROWS=5)
+    def test_too_many_rows(self):
+        self.client.force_login(CustomUser.objects.create_user(
+            email='gerente@example.com', password=PASSWORD, first_name='G', last_name='G', rol='gerente'
+        ))
+        lines = ['email,password,first_name,last_name'] + [f'nuevo{i}@example.com,clave,Nuevo,{i}' for i in range(6)]
+        response = self.client.post('/accounts/import/?format=csv', '\n'.join(lines), content_type='text/csv')
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(CustomUser.objects.count(), 1)
+
+    def test_non_scalar_values(self):
+        base = {'email': 'nuevo@example.com', 'password': 'clave', 'first_name': 'Nuevo', 'last_name': 'Usuario'}
+        rows = [{**base, 'rol': ['gerente']}, {**base, 'rol': {'es': 'gerente'}}, {**base, 'first_name': ['Nuevo']}, base]
+        report = import_users([json.dumps(row) for row in rows], 'jsonl')
+        self.assertEqual([error['row'] for error in report['errors']], [1, 2, 3])
+        self.assertEqual(report['created'], 1)
+
+    def test_email_registered_concurrently(self):
+        lines = ['email,password,first_name,last_name'] + [f'nuevo{i}@example.com,clave,Nuevo,{i}' for i in range(3)]
+        # Otro request registra nuevo1 después de que la importación consultó los emails existentes
+        registered = UserImporter.registered
+        checks = []
+
+        def racing(importer, emails):
+            if not checks:
+                CustomUser.objects.create_user(email='nuevo1@example.com', password='x', first_name='Otro', last_name='Request')
+            checks.append(emails)
+            return registered(importer, emails) if len(checks) > 1 else set()
+
+        with mock.patch.object(UserImporter, 'registered', racing):
+            report = import_users(lines, 'csv')
+        self.assertEqual(report['created'], 2)
+        self.assertEqual(report['errors'], [{'row': 2, 'error': 'El email nuevo1@example.com ya está en uso'}])
+        self.assertEqual(CustomUser.objects.get(email='nuevo1@example.com').first_name, 'Otro')
+        self.assertEqual(CustomUser.objects.count(), 3)
+
+    def test_requires_manager(self):
+        self.client.force_login(seed_users(1))
+        response = self.client.post('/accounts/import/?format=csv', 'email,password,first_name,last_name', content_type='text/csv')
+        self.assertEqual(response.status_code, 403)
+
+
+class SessionAsyncViewTests(AsyncParityTestCase):
+    def test_same_responses(self):
+        self.assertSameResponse('/accounts/session/')
+
+        user = seed_users(1)
+        self.client.force_login(user)
+        self.async_client.force_login(user)
+        response = self.assertSameResponse('/accounts/session/')
+        self.assertTrue(response.json()['estaAutenticado'])
 
-# Create your tests here.
@@ -0,0 +1,97 @@
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class MemoryStore:
+    """
+    Buckets en la memoria del proceso. Los que llevan más de un período sin uso
+    ya están llenos y se descartan; cada bucket guarda cuándo vence según su
+    propio período, porque la IP y el email se rellenan a ritmos distintos.
+    """
+
+    max_keys = 10_000
+    now = staticmethod(time.monotonic)
+
+    def __init__(self):
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def update(self, key, step, timeout):
+        with self.lock:
+            if len(self.buckets) >= self.max_keys:
+                self.prune()
+            state, result = step(self.buckets.get(key, (None, None))[0])
+            self.buckets[key] = (state, self.now() + timeout)
+            return result
+
+    def prune(self):
+        now = self.now()
+        self.buckets = {key: entry for key, entry in self.buckets.items() if entry[1] >= now}
+
+    def clear(self):
+        with self.lock:
+            self.buckets.clear()
+
+
+class CacheStore:
+    """
+    Buckets en una caché compartida entre procesos. Leer y escribir no es
+    atómico: con intentos simultáneos se puede colar alguno de más, que para
+    frenar ráfagas basta. Usa el reloj de pared, que es común a los procesos.
+    """
+
+    now = staticmethod(time.time)
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def update(self, key, step, timeout):
+        state, result = step(self.cache.get(key))
+        self.cache.set(key, state, timeout)
+        return result
+
+
+def take(store, key, capacity, period):
+    """
+    Consume un token del bucket ``key``, que se rellena a ``capacity / period``
+    tokens por segundo. Devuelve 0 si había token o los segundos a esperar.
+    """
+    rate = capacity / period
+    now = store.now()
+
+    def step(state):
+        tokens, updated = state or (capacity, now)
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        if tokens >= 1:
+            return (tokens - 1, now), 0
+        return (tokens, now), math.ceil((1 - tokens) / rate)
+
+    return store.update(key, step, period)
+
+
+memory_store = MemoryStore()
+
+
+def store():
+    alias = getattr(settings, 'LOGIN_THROTTLE_CACHE', None)
+    return CacheStore(caches[alias]) if alias else memory_store
+
+
+def throttle_login(request, email):
+    """
+    Descuenta un intento de la IP y otro del email. Devuelve 0 si el login puede
+    seguir o los segundos para el Retry-After; si la IP está agotada no se toca
+    el bucket del email.
+    """
+    rates = settings.LOGIN_THROTTLE_RATES
+    current = store()
+    for scope, value in (('ip', request.META.get('REMOTE_ADDR', '')), ('email', (email or '').strip().lower())):
+        capacity, period = rates[scope]
+        wait = take(current, f'login:{scope}:{value}', capacity, period)
+        if wait:
+            return wait
+    return 0
@@ -1,9 +1,10 @@
 from django.urls import path
-from .views import login_view, logout_view, session_view, register_view
+from .views import import_users_view, login_view, logout_view, session_view, register_view
 
 urlpatterns = [
     path('login/', login_view, name='login'),
     path('register/', register_view, name='register'),
     path('logout/', logout_view, name='logout'),
-    path('session/', session_view, name='session')
+    path('session/', session_view, name='session'),
+    path('import/', import_users_view, name='import_users'),
 ]
\ No newline at end of file
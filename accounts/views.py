@@ -1,8 +1,13 @@
+from django.conf import settings
 from django.contrib.auth import authenticate, login, logout
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required
+from .cache import session_profile
+from .hashing import HashingBusy
+from .importer import READERS, TooManyRows, hash_executor, import_users
 from .models import CustomUser
+from .throttle import throttle_login
 import json
 
 # Create your views here.
@@ -34,8 +39,7 @@ def register_view(request):
                                 json_dumps_params={'ensure_ascii': False
                                                    })
 
-        user = CustomUser.objects.create_user(email=email, password=password, first_name=first_name, last_name=last_name)
-        user.save()
+        CustomUser.objects.create_user(email=email, password=password, first_name=first_name, last_name=last_name)
         return JsonResponse({'message': 'Usuario creado exitosamente'},
                             status=201,
                             json_dumps_params={'ensure_ascii': False
@@ -45,6 +49,17 @@ def register_view(request):
                         json_dumps_params={'ensure_ascii': False
                                            })
 
+
+# Respuesta de un login rechazado por exceso de intentos o por el pool de hashing lleno
+def too_many_attempts(wait):
+    response = JsonResponse({'error': 'Demasiados intentos, intente más tarde'},
+                            status=429,
+                            json_dumps_params={'ensure_ascii': False
+                                               })
+    response['Retry-After'] = str(wait)
+    return response
+
+
 @csrf_exempt
 def login_view(request):
     if request.method == 'POST':
@@ -52,7 +67,14 @@ def login_view(request):
         email = data.get('email', None)
         password = data.get('password', None)
 
-        usuario = authenticate(email=email, password=password)
+        # Los intentos de más se rechazan antes de calcular cualquier hash
+        wait = throttle_login(request, email)
+        if wait:
+            return too_many_attempts(wait)
+        try:
+            usuario = authenticate(request, email=email, password=password)
+        except HashingBusy:
+            return too_many_attempts(1)
 
         if usuario is not None:
             login(request, usuario)
@@ -86,22 +108,73 @@ def logout_view(request):
                                            })
 
 
+# Respuesta de session_view a partir del perfil de la sesión (compartida con async_views.py)
+def session_response(usuario):
+    if usuario is None:
+        return JsonResponse({'estaAutenticado': False}, status=200)
+    return JsonResponse({
+        'estaAutenticado': True,
+        'nombre': usuario['first_name'],
+        'apellido': usuario['last_name'],
+        'email': usuario['email'],
+        'rol': usuario['rol']
+    },
+        json_dumps_params={'ensure_ascii': False
+                           })
+
+
 @csrf_exempt
 # @login_required  # Solo usuarios autenticados pueden acceder a esta vista
 def session_view(request):
-    if request.user.is_authenticated:
-        usuario = request.user
-        return JsonResponse({
-            'estaAutenticado': True,
-            'nombre': usuario.first_name,
-            'apellido': usuario.last_name,
-            'email': usuario.email,
-            'rol': usuario.rol
-        },
-            json_dumps_params={'ensure_ascii': False
-                               })
-    else:
+    # El perfil sale de la caché; request.user solo se carga si no está o no coincide con la sesión
+    usuario = session_profile(request)
+    if usuario is None:
         print("no está autenticado")
-        return JsonResponse({'estaAutenticado': False}, status=200)
+    return session_response(usuario)
     
     
+
+
+# POST para crear usuarios en lote desde CSV o JSONL (solo gerentes y staff), hasta USER_IMPORT_MAX_ROWS filas.
+# Las contraseñas se hashean en el pool de procesos compartido, ver accounts/importer.py
+@csrf_exempt
+def import_users_view(request):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Petición inválida!'},
+                            status=400,
+                            json_dumps_params={'ensure_ascii': False
+                                               })
+    if not request.user.is_authenticated or not (request.user.is_staff or request.user.rol == 'gerente'):
+        return JsonResponse({'error': 'No tiene permisos para importar usuarios'},
+                            status=403,
+                            json_dumps_params={'ensure_ascii': False
+                                               })
+
+    format = request.GET.get('format')
+    if not format:
+        content_type = request.content_type or ''
+        format = 'csv' if content_type == 'text/csv' else 'jsonl' if content_type in ('application/jsonl', 'application/x-ndjson') else None
+    if format not in READERS:
+        return JsonResponse({'error': 'Formato no soportado, use format=csv o format=jsonl'},
+                            status=400,
+                            json_dumps_params={'ensure_ascii': False
+                                               })
+
+    max_rows = settings.USER_IMPORT_MAX_ROWS
+    try:
+        report = import_users((line.decode('utf-8') for line in request), format,
+                              executor=hash_executor(), max_rows=max_rows)
+    except UnicodeDecodeError:
+        return JsonResponse({'error': 'El archivo debe estar codificado en UTF-8'},
+                            status=400,
+                            json_dumps_params={'ensure_ascii': False
+                                               })
+    except TooManyRows:
+        return JsonResponse({'error': f'Se aceptan hasta {max_rows} filas por importación; use manage.py import_users para archivos más grandes'},
+                            status=413,
+                            json_dumps_params={'ensure_ascii': False
+                                               })
+    return JsonResponse({'message': 'Importación finalizada', 'data': report},
+                        status=201 if report['created'] else 200,
+                        json_dumps_params={'ensure_ascii': False
+                                           })
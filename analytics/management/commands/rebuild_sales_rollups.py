@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from analytics.models import DailyProductSales, DailyStatusSales
+from analytics.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recalcula las tablas de resumen de ventas desde las órdenes existentes"
+
+    def handle(self, *args, **options):
+        rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Resumen reconstruido: {DailyStatusSales.objects.count()} filas por estado, "
+            f"{DailyProductSales.objects.count()} filas por producto"
+        ))
@@ -0,0 +1,28 @@
+from django.db import models
+from products.models import Product
+
+
+# Ventas diarias por producto (solo órdenes no canceladas), mantenidas por analytics/signals.py
+class DailyProductSales(models.Model):
+    day = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    units = models.IntegerField(default=0)
+    revenue = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'product'], name='daily_product_sales_unique'),
+        ]
+
+
+# Órdenes e ingresos diarios por estado, mantenidos por analytics/signals.py
+class DailyStatusSales(models.Model):
+    day = models.DateField()
+    status = models.CharField(max_length=10)
+    orders = models.IntegerField(default=0)
+    revenue = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'status'], name='daily_status_sales_unique'),
+        ]
@@ -0,0 +1,112 @@
+from django.db import IntegrityError, transaction
+from django.db.models import BigIntegerField, Case, Count, F, IntegerField, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from orders.models import Order, OrderItem
+from .models import DailyProductSales, DailyStatusSales
+
+
+CANCELLED = 'Cancelado'
+
+
+def order_day(order):
+    return timezone.localdate(order.created_at)
+
+
+def _increment(model, lookup, **deltas):
+    """Suma ``deltas`` a la fila ``lookup`` con un UPDATE ... SET x = x + n, creándola si no existe."""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    if model.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        # Otra transacción creó la fila en paralelo
+        model.objects.filter(**lookup).update(**changes)
+
+
+def add_order(day, status, total_price, sign=1):
+    _increment(DailyStatusSales, {'day': day, 'status': status}, orders=sign, revenue=sign * total_price)
+
+
+def add_items(day, items, sign=1):
+    """
+    ``items`` es un iterable de (product_id, quantity, price). Con varios
+    productos las filas existentes se actualizan con un solo
+    ``UPDATE ... SET units = units + CASE product_id ... END`` y las nuevas se
+    insertan con un bulk_create, así la cantidad de consultas no crece con la
+    cantidad de productos de la orden.
+    """
+    totals = {}
+    for product_id, quantity, price in items:
+        units, revenue = totals.get(product_id, (0, 0))
+        totals[product_id] = (units + quantity, revenue + quantity * price)
+    totals = {product_id: (sign * units, sign * revenue) for product_id, (units, revenue) in totals.items() if units or revenue}
+    if len(totals) <= 1:
+        for product_id, (units, revenue) in totals.items():
+            _increment(DailyProductSales, {'day': day, 'product_id': product_id}, units=units, revenue=revenue)
+        return
+
+    existing = set(
+        DailyProductSales.objects.filter(day=day, product_id__in=list(totals)).values_list('product_id', flat=True)
+    )
+    if existing:
+        def delta(index, output_field):
+            return Case(
+                *[When(product_id=product_id, then=Value(totals[product_id][index])) for product_id in existing],
+                output_field=output_field,
+            )
+        DailyProductSales.objects.filter(day=day, product_id__in=existing).update(
+            units=F('units') + delta(0, IntegerField()),
+            revenue=F('revenue') + delta(1, BigIntegerField()),
+        )
+
+    missing = [product_id for product_id in totals if product_id not in existing]
+    if not missing:
+        return
+    try:
+        with transaction.atomic():
+            DailyProductSales.objects.bulk_create([
+                DailyProductSales(day=day, product_id=product_id, units=totals[product_id][0], revenue=totals[product_id][1])
+                for product_id in missing
+            ])
+    except IntegrityError:
+        # Otra transacción creó alguna de las filas en paralelo
+        for product_id in missing:
+            units, revenue = totals[product_id]
+            _increment(DailyProductSales, {'day': day, 'product_id': product_id}, units=units, revenue=revenue)
+
+
+def order_items(order):
+    return order.items.values_list('product_id', 'quantity', 'price')
+
+
+def rebuild():
+    """Recalcula todas las tablas de resumen desde Order y OrderItem."""
+    with transaction.atomic():
+        DailyStatusSales.objects.all().delete()
+        DailyProductSales.objects.all().delete()
+
+        DailyStatusSales.objects.bulk_create(
+            DailyStatusSales(day=row['day'], status=row['status'], orders=row['orders'], revenue=row['revenue'] or 0)
+            for row in Order.objects.annotate(day=TruncDate('created_at'))
+            .values('day', 'status')
+            .annotate(orders=Count('id'), revenue=Sum('total_price'))
+            .order_by()
+        )
+        DailyProductSales.objects.bulk_create(
+            (
+                DailyProductSales(day=row['day'], product_id=row['product'], units=row['units'], revenue=row['revenue'])
+                for row in OrderItem.objects.exclude(order__status=CANCELLED)
+                .annotate(day=TruncDate('order__created_at'))
+                .values('day', 'product')
+                .annotate(units=Sum('quantity'), revenue=Sum(F('quantity') * F('price')))
+                .order_by()
+            ),
+            batch_size=1000,
+        )
@@ -0,0 +1,99 @@
+"""
+Mantiene incrementalmente las tablas de resumen de ventas:
+
+- DailyStatusSales cuenta cada orden (y su total) en el día de creación y su estado actual.
+- DailyProductSales suma las unidades e ingresos de los ítems de órdenes no canceladas.
+"""
+import threading
+
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from orders.models import Order, OrderItem
+from orders.signals import order_items_bulk_created
+from .rollups import CANCELLED, add_items, add_order, order_day, order_items
+
+
+# Órdenes que se están eliminando en este hilo: sus ítems se descuentan junto con la orden
+_deleting = threading.local()
+
+
+def deleting_orders():
+    if not hasattr(_deleting, 'ids'):
+        _deleting.ids = set()
+    return _deleting.ids
+
+
+@receiver(pre_save, sender=Order)
+def remember_order(sender, instance, raw=False, **kwargs):
+    instance._rollup_previous = None
+    if not raw and instance.pk:
+        instance._rollup_previous = Order.objects.filter(pk=instance.pk).values('status', 'total_price').first()
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    day = order_day(instance)
+    previous = getattr(instance, '_rollup_previous', None)
+    if created or previous is None:
+        add_order(day, instance.status, instance.total_price)
+        return
+
+    if previous['status'] != instance.status or previous['total_price'] != instance.total_price:
+        add_order(day, previous['status'], previous['total_price'], sign=-1)
+        add_order(day, instance.status, instance.total_price)
+
+    # Al cancelar (o reactivar) una orden sus ítems salen (o vuelven a entrar) del resumen por producto
+    was_cancelled = previous['status'] == CANCELLED
+    is_cancelled = instance.status == CANCELLED
+    if was_cancelled != is_cancelled:
+        add_items(day, order_items(instance), sign=-1 if is_cancelled else 1)
+
+
+@receiver(pre_delete, sender=Order)
+def order_deleting(sender, instance, **kwargs):
+    deleting_orders().add(instance.pk)
+    day = order_day(instance)
+    add_order(day, instance.status, instance.total_price, sign=-1)
+    if instance.status != CANCELLED:
+        add_items(day, order_items(instance), sign=-1)
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    deleting_orders().discard(instance.pk)
+
+
+@receiver(pre_save, sender=OrderItem)
+def remember_item(sender, instance, raw=False, **kwargs):
+    instance._rollup_previous = None
+    if not raw and instance.pk:
+        instance._rollup_previous = OrderItem.objects.filter(pk=instance.pk).values('product_id', 'quantity', 'price').first()
+
+
+@receiver(post_save, sender=OrderItem)
+def item_saved(sender, instance, created, raw=False, **kwargs):
+    if raw or instance.order.status == CANCELLED:
+        return
+    day = order_day(instance.order)
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous is not None:
+        add_items(day, [(previous['product_id'], previous['quantity'], previous['price'])], sign=-1)
+    add_items(day, [(instance.product_id, instance.quantity, instance.price)])
+
+
+@receiver(post_delete, sender=OrderItem)
+def item_deleted(sender, instance, **kwargs):
+    if instance.order_id in deleting_orders():
+        return
+    order = Order.objects.filter(pk=instance.order_id).only('status', 'created_at').first()
+    if order is not None and order.status != CANCELLED:
+        add_items(order_day(order), [(instance.product_id, instance.quantity, instance.price)], sign=-1)
+
+
+@receiver(order_items_bulk_created)
+def items_bulk_created(sender, order, items, **kwargs):
+    if order.status != CANCELLED:
+        add_items(order_day(order), [(item.product_id, item.quantity, item.price) for item in items])
@@ -0,0 +1,98 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from orders.models import Order, OrderItem
+from products.models import Category, Product
+
+from .models import DailyProductSales, DailyStatusSales
+from .rollups import add_items, order_day, rebuild
+
+
+def rollups():
+    """Contenido de las tablas de resumen, sin las filas que quedaron en cero."""
+    return (
+        sorted(DailyStatusSales.objects.exclude(orders=0, revenue=0).values_list('day', 'status', 'orders', 'revenue')),
+        sorted(DailyProductSales.objects.exclude(units=0, revenue=0).values_list('day', 'product', 'units', 'revenue')),
+    )
+
+
+class RollupTests(TestCase):
+    """Las tablas mantenidas por las señales deben coincidir con un rebuild() desde cero."""
+
+    def setUp(self):
+        category = Category.objects.create(name='Frutas')
+        self.products = [
+            Product.objects.create(name=f'Producto {i}', price=1000 * (i + 1), description='-', stock=1000, category=category)
+            for i in range(3)
+        ]
+        self.user = get_user_model().objects.create(email='cliente@example.com', first_name='Cliente', last_name='Prueba')
+
+    def create_order(self, *quantities):
+        return Order.objects.create_with_items(self.user, [
+            (product.pk, quantity) for product, quantity in zip(self.products, quantities) if quantity
+        ])
+
+    def assertMatchesRebuild(self):
+        maintained = rollups()
+        rebuild()
+        self.assertEqual(maintained, rollups())
+        return maintained
+
+    def test_create_orders(self):
+        self.create_order(1, 2, 3)
+        self.create_order(4, 0, 1)
+        statuses, products = self.assertMatchesRebuild()
+        self.assertEqual([row[2:] for row in statuses], [(2, 21000)])
+        self.assertEqual([row[2:] for row in products], [(5, 5000), (2, 4000), (4, 12000)])
+
+    def test_add_and_remove_items(self):
+        order = self.create_order(1, 2, 0)
+        OrderItem.objects.create(order=order, product=self.products[2], quantity=2, price=3000)
+        item = order.items.get(product=self.products[0])
+        item.quantity = 5
+        item.save()
+        order.items.get(product=self.products[1]).delete()
+        self.assertMatchesRebuild()
+
+    def test_status_changes(self):
+        order = self.create_order(1, 2, 3)
+        self.create_order(1, 0, 0)
+        for status in ('Enviado', 'Cancelado', 'Pendiente', 'Entregado'):
+            order.status = status
+            order.save()
+            with self.subTest(status=status):
+                self.assertMatchesRebuild()
+
+    def test_delete_orders(self):
+        kept = self.create_order(1, 1, 1)
+        self.create_order(2, 2, 0).delete()
+        cancelled = self.create_order(0, 1, 1)
+        cancelled.status = 'Cancelado'
+        cancelled.save()
+        cancelled.delete()
+        statuses, products = self.assertMatchesRebuild()
+        self.assertEqual([row[2:] for row in statuses], [(1, kept.total_price)])
+
+    def test_add_items_single_update(self):
+        # Las filas existentes se actualizan en una sola sentencia: el SELECT de las existentes y un UPDATE
+        order = self.create_order(1, 1, 1)
+        with self.assertNumQueries(2):
+            add_items(order_day(order), [(product.pk, 2, int(product.price)) for product in self.products])
+        self.assertEqual(
+            sorted(DailyProductSales.objects.values_list('product', 'units')),
+            [(product.pk, 3) for product in self.products],
+        )
+
+    def test_rebuild_is_idempotent(self):
+        self.create_order(1, 2, 3)
+        first = self.assertMatchesRebuild()
+        rebuild()
+        self.assertEqual(rollups(), first)
+
+
+class AnalyticsFilterTests(TestCase):
+    def test_impossible_dates(self):
+        for url in ('/api/analytics/revenue/', '/api/analytics/products/', '/api/analytics/categories/', '/api/analytics/status/'):
+            for query in ('from=2024-02-30', 'to=2024-13-01', 'from=ayer'):
+                with self.subTest(url=url, query=query):
+                    self.assertEqual(self.client.get(f'{url}?{query}').status_code, 400)
@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('api/analytics/revenue/', views.revenue, name='analytics_revenue'),
+    path('api/analytics/products/', views.products, name='analytics_products'),
+    path('api/analytics/categories/', views.categories, name='analytics_categories'),
+    path('api/analytics/status/', views.statuses, name='analytics_status'),
+]
@@ -0,0 +1,94 @@
+from django.db.models import F, Sum
+from django.utils.dateparse import parse_date
+from django.views.decorators.http import require_http_methods
+from main.metrics import JsonResponse
+from main.pagination import InvalidQueryParam, get_limit
+from .models import DailyProductSales, DailyStatusSales
+from .rollups import CANCELLED
+
+
+# Todas las vistas leen solo las tablas de resumen: su costo depende de la cantidad de días, no de ítems
+
+# Filtra por rango de días (?from=AAAA-MM-DD&to=AAAA-MM-DD, ambos inclusivos)
+def filter_days(request, rows):
+    for param, lookup in (('from', 'day__gte'), ('to', 'day__lte')):
+        value = request.GET.get(param)
+        if value:
+            try:
+                # parse_date lanza ValueError con fechas bien formadas pero imposibles (2024-02-30)
+                day = parse_date(value)
+            except ValueError:
+                day = None
+            if day is None:
+                raise InvalidQueryParam(f'El parámetro {param} debe tener el formato AAAA-MM-DD')
+            rows = rows.filter(**{lookup: day})
+    return rows
+
+
+# GET para obtener los ingresos diarios (órdenes no canceladas)
+@require_http_methods(["GET"])
+def revenue(request):
+    try:
+        rows = filter_days(request, DailyStatusSales.objects.exclude(status=CANCELLED))
+    except InvalidQueryParam as error:
+        return JsonResponse({'status': 'error', 'message': str(error)}, status=400)
+
+    rows = rows.values('day').annotate(orders=Sum('orders'), total=Sum('revenue')).order_by('day')
+    return JsonResponse({'revenue': [
+        {'day': row['day'].isoformat(), 'orders': row['orders'], 'revenue': row['total']}
+        for row in rows
+    ]})
+
+
+# GET para obtener las unidades vendidas e ingresos por producto
+@require_http_methods(["GET"])
+def products(request):
+    try:
+        limit = get_limit(request)
+        rows = filter_days(request, DailyProductSales.objects.all())
+    except InvalidQueryParam as error:
+        return JsonResponse({'status': 'error', 'message': str(error)}, status=400)
+
+    rows = (
+        rows.values('product', name=F('product__name'))
+        .annotate(units=Sum('units'), total=Sum('revenue'))
+        .order_by('-units', 'product')[:limit]
+    )
+    return JsonResponse({'products': [
+        {'id': row['product'], 'name': row['name'], 'units': row['units'], 'revenue': row['total']}
+        for row in rows
+    ]})
+
+
+# GET para obtener las ventas por categoría
+@require_http_methods(["GET"])
+def categories(request):
+    try:
+        rows = filter_days(request, DailyProductSales.objects.all())
+    except InvalidQueryParam as error:
+        return JsonResponse({'status': 'error', 'message': str(error)}, status=400)
+
+    rows = (
+        rows.values(category=F('product__category'), name=F('product__category__name'))
+        .annotate(units=Sum('units'), total=Sum('revenue'))
+        .order_by('-total')
+    )
+    return JsonResponse({'categories': [
+        {'id': row['category'], 'name': row['name'], 'units': row['units'], 'revenue': row['total']}
+        for row in rows
+    ]})
+
+
+# GET para obtener la cantidad de órdenes e ingresos por estado
+@require_http_methods(["GET"])
+def statuses(request):
+    try:
+        rows = filter_days(request, DailyStatusSales.objects.all())
+    except InvalidQueryParam as error:
+        return JsonResponse({'status': 'error', 'message': str(error)}, status=400)
+
+    rows = rows.values('status').annotate(orders=Sum('orders'), total=Sum('revenue')).order_by('status')
+    return JsonResponse({'statuses': [
+        {'status': row['status'], 'orders': row['orders'], 'revenue': row['total']}
+        for row in rows
+    ]})
@@ -0,0 +1,229 @@
+"""
+Benchmark de los endpoints GET sobre una base SQLite con datos sintéticos.
+
+    python -m benchmarks.run --products 100000 --order-items 1000000 --output benchmarks/results/base.json
+    python -m benchmarks.run --output benchmarks/results/cambio.json --compare benchmarks/results/base.json
+
+La primera ejecución migra y siembra la base (BENCHMARK_DB, por defecto
+benchmarks/data.sqlite3); las siguientes la reutilizan salvo con --reseed.
+Cada URL de main/urls.py (más las variantes de EXTRA_URLS) se pide --repeat
+veces con el cliente de pruebas de Django. Se informa p50/p95/p99 de la
+latencia, las consultas SQL por request y el pico de memoria asignada
+(tracemalloc, medido en una pasada aparte para no inflar las latencias).
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter
+
+
+# Variantes con parámetros que ejercitan filtros, paginación y expansiones
+EXTRA_URLS = [
+    '/api/products/?limit=200',
+    '/api/products/?category={category_id}&in_stock=true',
+    '/api/products/?fields=id,name,price',
+    '/api/products/search/?q=tomate+organico',
+    '/api/orders/?limit=200',
+    '/api/orders/?status=Pendiente&limit=200',
+    '/api/orders/?expand=items.product,vehicle.driver&limit=50',
+    '/api/vehicles/?expand=driver.user',
+    '/api/analytics/products/?limit=20',
+]
+
+# Rutas que no se miden: el admin y los archivos subidos
+SKIPPED_PREFIXES = ('admin1/', 'media/')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de los endpoints GET de la API")
+    parser.add_argument('--products', type=int, default=10_000)
+    parser.add_argument('--order-items', type=int, default=100_000)
+    parser.add_argument('--items-per-order', type=int, default=5)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--reseed', action='store_true', help="Borra la base y la vuelve a sembrar")
+    parser.add_argument('--repeat', type=int, default=20, help="Requests por endpoint")
+    parser.add_argument('--warmup', type=int, default=2, help="Requests previos no medidos por endpoint")
+    parser.add_argument('--cold-cache', action='store_true', help="Vacía la caché antes de cada request")
+    parser.add_argument('--only', help="Mide solo las URLs que contienen este texto")
+    parser.add_argument('--output', default='benchmarks/results/latest.json')
+    parser.add_argument('--compare', help="JSON de una ejecución anterior para mostrar las diferencias")
+    return parser.parse_args(argv)
+
+
+def setup_database(args):
+    from django.core.management import call_command
+    from benchmarks.seed import counts, seed
+
+    database = Path(os.environ.get('BENCHMARK_DB', Path(__file__).resolve().parent / 'data.sqlite3'))
+    if args.reseed and database.exists():
+        database.unlink()
+    call_command('migrate', verbosity=0)
+    existing = counts()
+    if existing['products']:
+        print(f"Reutilizando {database}: {existing}")
+        return existing
+    print(f"Sembrando {database}")
+    return seed(
+        products=args.products,
+        order_items=args.order_items,
+        items_per_order=args.items_per_order,
+        users=args.users,
+    )
+
+
+def route_urls():
+    """URLs concretas de cada ruta GET de main/urls.py; los <int:x_id> se llenan con ids existentes."""
+    from django.urls import URLPattern, URLResolver, get_resolver
+    from orders.models import Driver, Order, Vehicle
+    from products.models import Category, Product, Supplier
+
+    models = {
+        'product_id': Product, 'supplier_id': Supplier, 'category_id': Category,
+        'order_id': Order, 'vehicle_id': Vehicle, 'driver_id': Driver,
+    }
+    ids = {name: model.objects.order_by('-id').values_list('id', flat=True).first() for name, model in models.items()}
+
+    def walk(patterns, prefix=''):
+        for pattern in patterns:
+            route = prefix + str(pattern.pattern)
+            if route.startswith(SKIPPED_PREFIXES) or route.startswith('^'):
+                continue
+            if isinstance(pattern, URLResolver):
+                yield from walk(pattern.url_patterns, route)
+            elif isinstance(pattern, URLPattern):
+                yield route
+
+    urls = []
+    for route in walk(get_resolver().url_patterns):
+        url = '/' + re.sub(r'<int:(\w+)>', lambda match: str(ids.get(match.group(1))), route)
+        if url not in urls:
+            urls.append(url)
+    return urls + [url.format(**ids) for url in EXTRA_URLS]
+
+
+def percentile(samples, percent):
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method='inclusive')[percent - 1]
+
+
+def measure(client, url, args):
+    from django.core.cache import cache
+    from django.db import connection
+
+    queries = []
+
+    def count(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    def request():
+        if args.cold_cache:
+            cache.clear()
+        response = client.get(url)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response.status_code, len(body)
+
+    for _ in range(args.warmup):
+        request()
+
+    latencies = []
+    query_counts = []
+    for _ in range(args.repeat):
+        queries.clear()
+        with connection.execute_wrapper(count):
+            start = perf_counter()
+            status, size = request()
+            latencies.append((perf_counter() - start) * 1000)
+        query_counts.append(len(queries))
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    request()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'status': status,
+        'bytes': size,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'mean_ms': round(statistics.fmean(latencies), 3),
+        'queries': max(query_counts),
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, previous):
+    print(f"\n{'endpoint':<60} {'p50':>10} {'p95':>10} {'consultas':>10}")
+    for url, current in results['endpoints'].items():
+        before = previous['endpoints'].get(url)
+        if before is None:
+            continue
+        print(
+            f"{url[:60]:<60} "
+            f"{current['p50_ms'] - before['p50_ms']:>+9.2f}ms "
+            f"{current['p95_ms'] - before['p95_ms']:>+9.2f}ms "
+            f"{current['queries'] - before['queries']:>+10d}"
+        )
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'benchmarks.settings'
+    import django
+    django.setup()
+    from django.test import Client
+
+    dataset = setup_database(args)
+    client = Client()
+    endpoints = {}
+    for url in route_urls():
+        if args.only and args.only not in url:
+            continue
+        result = measure(client, url, args)
+        if result['status'] == 405:
+            continue
+        endpoints[url] = result
+        print(f"{url[:60]:<60} {result['status']} p50={result['p50_ms']:.2f}ms p95={result['p95_ms']:.2f}ms "
+              f"p99={result['p99_ms']:.2f}ms consultas={result['queries']} memoria={result['peak_memory_kb']}KB")
+
+    results = {
+        'meta': {
+            'date': datetime.now(timezone.utc).isoformat(),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'repeat': args.repeat,
+            'cold_cache': args.cold_cache,
+            'dataset': dataset,
+        },
+        'endpoints': endpoints,
+    }
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2, ensure_ascii=False))
+    print(f"\nResultados en {output}")
+
+    if args.compare:
+        compare(results, json.loads(Path(args.compare).read_text()))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+Datos sintéticos para los benchmarks. Todo se inserta con bulk_create en
+lotes, así que sembrar 1M de ítems toma minutos y no horas. bulk_create no
+dispara señales, por eso al final se reconstruyen el índice de búsqueda y los
+resúmenes de ventas.
+"""
+import random
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from analytics.rollups import rebuild as rebuild_rollups
+from orders.models import Driver, Order, OrderItem, Vehicle
+from products.models import Category, Product, Supplier
+from products.search import rebuild_index
+
+
+BATCH_SIZE = 5000
+STATUSES = ['Pendiente', 'Enviado', 'Entregado', 'Cancelado']
+VEHICLE_TYPES = ['Camioneta', 'Moto', 'Bicicleta']
+NAMES = ['Tomate', 'Lechuga', 'Papa', 'Cebolla', 'Zanahoria', 'Palta', 'Manzana', 'Plátano', 'Naranja', 'Limón',
+         'Pimentón', 'Zapallo', 'Choclo', 'Pera', 'Uva', 'Frutilla', 'Ajo', 'Cilantro', 'Espinaca', 'Betarraga']
+QUALIFIERS = ['orgánico', 'de temporada', 'importado', 'nacional', 'premium', 'en malla', 'a granel', 'seleccionado']
+
+
+def batches(total, size=BATCH_SIZE):
+    for start in range(0, total, size):
+        yield start, min(size, total - start)
+
+
+def seed(products=10_000, order_items=100_000, items_per_order=5, users=500, vehicles=50, categories=20,
+         suppliers=100, days=90, search_index=True, log=print):
+    """Siembra una base vacía con los volúmenes indicados y devuelve los conteos finales."""
+    rng = random.Random(42)
+    User = get_user_model()
+    password = make_password('benchmark')
+
+    with transaction.atomic():
+        log(f'Usuarios: {users}, conductores y vehículos: {vehicles}')
+        User.objects.bulk_create([
+            User(email=f'usuario{i}@benchmark.cl', first_name=f'Usuario {i}', last_name='Benchmark', password=password)
+            for i in range(users)
+        ], batch_size=BATCH_SIZE)
+        driver_users = User.objects.bulk_create([
+            User(email=f'conductor{i}@benchmark.cl', first_name=f'Conductor {i}', last_name='Benchmark', password=password, rol='conductor')
+            for i in range(vehicles)
+        ])
+        drivers = Driver.objects.bulk_create([
+            Driver(user=user, phone_number=f'9{i:08d}', license_number=f'BEN{i:05d}') for i, user in enumerate(driver_users)
+        ])
+        Vehicle.objects.bulk_create([
+            Vehicle(license_plate=f'BN{i:04d}', vehicle_type=VEHICLE_TYPES[i % 3], model='Benchmark', driver=driver)
+            for i, driver in enumerate(drivers)
+        ])
+
+        log(f'Categorías: {categories}, proveedores: {suppliers}, productos: {products}')
+        category_ids = [category.id for category in Category.objects.bulk_create([
+            Category(name=f'Categoría {i}') for i in range(categories)
+        ])]
+        Supplier.objects.bulk_create([
+            Supplier(name=f'Proveedor {i}', email=f'proveedor{i}@benchmark.cl', phone=900000000 + i, address=f'Calle {i}')
+            for i in range(suppliers)
+        ], batch_size=BATCH_SIZE)
+        for start, size in batches(products):
+            Product.objects.bulk_create([
+                Product(
+                    name=f'{rng.choice(NAMES)} {rng.choice(QUALIFIERS)} {start + i}',
+                    price=rng.randint(300, 20000),
+                    description=f'{rng.choice(NAMES)} {rng.choice(QUALIFIERS)} en caja de {rng.randint(1, 20)} kg',
+                    stock=rng.randint(0, 5000),
+                    category_id=rng.choice(category_ids),
+                    is_featured=rng.random() < 0.05,
+                )
+                for i in range(size)
+            ])
+
+    user_ids = list(User.objects.filter(rol='user').values_list('id', flat=True))
+    vehicle_ids = list(Vehicle.objects.values_list('id', flat=True))
+    prices = dict(Product.objects.values_list('id', 'price'))
+    product_ids = list(prices)
+
+    order_count = max(1, order_items // items_per_order)
+    log(f'Órdenes: {order_count}, ítems: {order_items}')
+    first_order_id = None
+    for start, size in batches(order_count):
+        with transaction.atomic():
+            lines = []
+            orders = []
+            for i in range(size):
+                count = items_per_order + (1 if start + i < order_items % order_count else 0)
+                order_lines = [(rng.choice(product_ids), rng.randint(1, 10)) for _ in range(count)]
+                lines.append(order_lines)
+                status = rng.choice(STATUSES)
+                orders.append(Order(
+                    user_id=rng.choice(user_ids),
+                    status=status,
+                    vehicle_id=rng.choice(vehicle_ids) if status != 'Pendiente' or rng.random() < 0.5 else None,
+                    total_price=sum(int(prices[product_id]) * quantity for product_id, quantity in order_lines),
+                    delivery_latitude=-33.45 + rng.uniform(-0.15, 0.15),
+                    delivery_longitude=-70.65 + rng.uniform(-0.15, 0.15),
+                ))
+            orders = Order.objects.bulk_create(orders)
+            first_order_id = first_order_id or orders[0].id
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product_id=product_id, quantity=quantity, price=int(prices[product_id]))
+                for order, order_lines in zip(orders, lines)
+                for product_id, quantity in order_lines
+            ], batch_size=BATCH_SIZE)
+
+    # created_at es auto_now_add; se reparte después en `days` días con un UPDATE por día
+    today = timezone.now()
+    per_day = -(-order_count // days)
+    with transaction.atomic():
+        for day in range(days):
+            low = first_order_id + day * per_day
+            Order.objects.filter(id__gte=low, id__lt=low + per_day).update(created_at=today - timedelta(days=days - 1 - day))
+
+    if search_index:
+        log('Índice de búsqueda')
+        rebuild_index()
+    log('Resúmenes de ventas')
+    rebuild_rollups()
+    return counts()
+
+
+def counts():
+    return {
+        'users': get_user_model().objects.count(),
+        'products': Product.objects.count(),
+        'orders': Order.objects.count(),
+        'order_items': OrderItem.objects.count(),
+        'vehicles': Vehicle.objects.count(),
+    }
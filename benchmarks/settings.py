@@ -0,0 +1,21 @@
+"""
+Settings para los benchmarks: las mismas de main.settings sobre una base
+SQLite local (ruta configurable con BENCHMARK_DB), sin DEBUG para que Django
+no guarde cada consulta en memoria.
+"""
+import os
+
+from main.settings import *  # noqa: F401,F403
+from main.settings import BASE_DIR
+
+
+DEBUG = False
+ALLOWED_HOSTS = ['testserver']
+QUERY_BUDGET_ENFORCED = False
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('BENCHMARK_DB', BASE_DIR / 'benchmarks' / 'data.sqlite3'),
+    }
+}
@@ -2,6 +2,8 @@
 ASGI config for main project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+By default it loads the ASGI profile (main.settings_asgi), which serves the
+read-heavy endpoints with async views.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.1/howto/deployment/asgi/
@@ -11,6 +13,6 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'main.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'main.settings_asgi')
 
 application = get_asgi_application()
@@ -0,0 +1,21 @@
+"""
+URLs del perfil ASGI (main.settings_asgi).
+
+Las vistas de lectura más usadas se reemplazan por sus versiones asíncronas;
+el resto de las rutas son las mismas de main.urls.
+"""
+from django.urls import include, path
+
+from accounts import async_views as accounts_views
+from orders import async_views as orders_views
+from products import async_views as products_views
+
+urlpatterns = [
+    path('api/products/', products_views.products, name='products'),
+    path('api/categories/', products_views.categories, name='categories'),
+    path('api/orders/', orders_views.orders, name='orders'),
+    path('api/vehicles/', orders_views.vehicles, name='vehicles'),
+    path('api/drivers/', orders_views.drivers, name='drivers'),
+    path('accounts/session/', accounts_views.session_view, name='session'),
+    path('', include('main.urls')),
+]
@@ -0,0 +1,95 @@
+import hashlib
+from datetime import datetime
+from functools import wraps
+
+from django.db.models import Count, IntegerField, Max, Value
+from django.views.decorators.http import condition
+
+
+def conditional(stamp):
+    """
+    Versión de ``condition`` basada en una sola función de sello.
+    ``stamp(request, *args, **kwargs)`` devuelve una lista de valores que cambian
+    cuando cambia el recurso (o None si no existe). El ETag es un hash de esos
+    valores y de la URL, y Last-Modified es la fecha más reciente entre ellos.
+    Los GET con If-None-Match/If-Modified-Since vigentes responden 304 sin
+    ejecutar la vista. El sello se calcula una sola vez por request y solo en GET/HEAD.
+    """
+    def values(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        if not hasattr(request, '_conditional_stamp'):
+            request._conditional_stamp = stamp(request, *args, **kwargs)
+        return request._conditional_stamp
+
+    def etag_func(request, *args, **kwargs):
+        stamp_values = values(request, *args, **kwargs)
+        if stamp_values is None:
+            return None
+        raw = repr((request.get_full_path(), stamp_values)).encode()
+        return '"%s"' % hashlib.sha1(raw).hexdigest()
+
+    def last_modified_func(request, *args, **kwargs):
+        stamp_values = values(request, *args, **kwargs)
+        dates = [value for value in stamp_values or [] if isinstance(value, datetime)]
+        return max(dates) if dates else None
+
+    return condition(etag_func=etag_func, last_modified_func=last_modified_func)
+
+
+def async_conditional(stamp):
+    """
+    ``conditional`` para vistas asíncronas. ``condition`` llama a sus funciones
+    de forma síncrona, así que el sello (una corrutina) se calcula antes y queda
+    guardado en el request, donde ``conditional`` lo reutiliza sin consultar.
+    """
+    def decorator(view):
+        conditional_view = conditional(stamp)(view)
+
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method in ('GET', 'HEAD'):
+                request._conditional_stamp = await stamp(request, *args, **kwargs)
+            return await conditional_view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def stamp_rows(querysets):
+    """
+    Una sola consulta (UNION ALL) con el último updated_at y la cantidad de
+    filas de cada queryset; la cantidad detecta las eliminaciones. Cada fila
+    lleva su posición porque UNION no garantiza el orden.
+    """
+    rows = [
+        queryset.order_by()
+        .annotate(position=Value(position, output_field=IntegerField()))
+        .values('position')
+        .annotate(latest=Max('updated_at'), total=Count('pk'))
+        .values_list('position', 'latest', 'total')
+        for position, queryset in enumerate(querysets)
+    ]
+    return rows[0].union(*rows[1:], all=True) if len(rows) > 1 else rows[0]
+
+
+def flatten_stamp(rows):
+    stamp_values = []
+    for position, latest, total in sorted(rows):
+        stamp_values += [latest, total]
+    return stamp_values
+
+
+# Sello de una colección: último updated_at y cantidad de filas de cada queryset
+def collection_stamp(*querysets):
+    return flatten_stamp(list(stamp_rows(querysets)))
+
+
+async def acollection_stamp(*querysets):
+    return flatten_stamp([row async for row in stamp_rows(querysets)])
+
+
+# Sello de un objeto: los campos updated_at propios y de las relaciones que se serializan,
+# más agregados de las relaciones múltiples (p. ej. los ítems de una orden)
+def object_stamp(queryset, pk, *fields, **aggregates):
+    row = queryset.filter(pk=pk).annotate(**aggregates).values_list('updated_at', *fields, *aggregates).first()
+    return list(row) if row else None
@@ -0,0 +1,272 @@
+"""
+Métricas de rendimiento por request.
+
+``PerformanceMiddleware`` mide la latencia total, la cantidad y el tiempo de
+las consultas SQL y el tiempo de serialización (incluida la codificación a
+JSON) de cada request. Los envía al cliente en la cabecera ``Server-Timing`` y
+los acumula en histogramas por nombre de URL, que ``metrics_view`` publica en
+formato de texto de Prometheus. En las respuestas en streaming el cuerpo se
+genera después de enviar las cabeceras: ``Server-Timing`` cubre hasta ellas y
+los histogramas se actualizan al cerrar la respuesta, con el cuerpo completo.
+Los histogramas son por proceso: con varios workers, Prometheus debe consultar
+cada uno o hay que agregar los valores aparte.
+"""
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, JsonResponse as BaseJsonResponse
+from django.views.decorators.http import require_http_methods
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+# Métricas del request en curso; las vistas asíncronas las heredan en los hilos de sync_to_async
+current_stats = ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    __slots__ = ('start', 'queries', 'db', 'serialize', 'depth')
+
+    def __init__(self):
+        self.start = perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.serialize = 0.0
+        self.depth = 0
+
+
+def record_query(execute, sql, params, many, context):
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db += perf_counter() - start
+        stats.queries += 1
+
+
+# Instala record_query una sola vez en cada conexión
+def install_query_recorder(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(install_query_recorder)
+
+
+def timed_serialization(serializer):
+    """
+    Suma al request en curso el tiempo del serializador decorado. Solo cuenta
+    la llamada más externa, así los serializadores anidados no se cuentan dos veces.
+    """
+    @wraps(serializer)
+    def wrapper(*args, **kwargs):
+        stats = current_stats.get()
+        if stats is None or stats.depth:
+            return serializer(*args, **kwargs)
+        stats.depth += 1
+        start = perf_counter()
+        try:
+            return serializer(*args, **kwargs)
+        finally:
+            stats.serialize += perf_counter() - start
+            stats.depth -= 1
+    return wrapper
+
+
+class TimedJSONEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder cuyo encode() cuenta como tiempo de serialización."""
+    encode = timed_serialization(DjangoJSONEncoder.encode)
+
+
+class JsonResponse(BaseJsonResponse):
+    """JsonResponse que codifica con TimedJSONEncoder."""
+    def __init__(self, data, encoder=TimedJSONEncoder, **kwargs):
+        super().__init__(data, encoder, **kwargs)
+
+
+class Histogram:
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        counts, total = self.series.get(labels, ([0] * (len(self.buckets) + 1), 0))
+        counts[bisect_left(self.buckets, value)] += 1
+        self.series[labels] = (counts, total + value)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        for labels, (counts, total) in sorted(self.series.items()):
+            label_text = format_labels(labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {total}')
+            lines.append(f'{self.name}_count{{{label_text}}} {cumulative}')
+        return lines
+
+
+def format_labels(labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{name}="{escape(value)}"' for name, value in labels)
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = Histogram('http_request_duration_seconds', 'Latencia total del request', LATENCY_BUCKETS)
+        self.db_time = Histogram('db_query_duration_seconds', 'Tiempo total en consultas SQL por request', LATENCY_BUCKETS)
+        self.db_queries = Histogram('db_queries_per_request', 'Consultas SQL por request', QUERY_BUCKETS)
+        self.serialize = Histogram('serialization_duration_seconds', 'Tiempo de serialización por request', LATENCY_BUCKETS)
+        self.responses = {}
+
+    def observe(self, view, method, status, stats, total):
+        labels = (('view', view), ('method', method))
+        with self.lock:
+            self.latency.observe(labels, total)
+            self.db_time.observe(labels, stats.db)
+            self.db_queries.observe(labels, stats.queries)
+            self.serialize.observe(labels, stats.serialize)
+            key = labels + (('status', status),)
+            self.responses[key] = self.responses.get(key, 0) + 1
+
+    def render(self):
+        with self.lock:
+            lines = ['# HELP http_responses_total Respuestas por vista, método y estado', '# TYPE http_responses_total counter']
+            lines += [f'http_responses_total{{{format_labels(labels)}}} {count}' for labels, count in sorted(self.responses.items())]
+            for histogram in (self.latency, self.db_time, self.db_queries, self.serialize):
+                lines += histogram.render()
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def server_timing(stats, total):
+    return ', '.join([
+        f'db;desc="{stats.queries} queries";dur={stats.db * 1000:.1f}',
+        f'serialize;dur={stats.serialize * 1000:.1f}',
+        f'total;dur={total * 1000:.1f}',
+    ])
+
+
+class PerformanceMiddleware:
+    """
+    Debe ir primero en MIDDLEWARE para que la latencia incluya el resto de los
+    middlewares. Funciona con vistas síncronas y asíncronas.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        # La conexión del hilo puede haberse abierto antes de cargar este módulo
+        install_query_recorder(connection)
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        return self.finish(request, response, stats)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        return self.finish(request, response, stats)
+
+    def finish(self, request, response, stats):
+        total = perf_counter() - stats.start
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unmatched'
+        response['Server-Timing'] = server_timing(stats, total)
+
+        def observe():
+            registry.observe(view, request.method, response.status_code, stats, perf_counter() - stats.start)
+
+        if response.streaming:
+            # Las consultas y la serialización del cuerpo cuentan cuando el servidor lo consume
+            stream = AsyncObservedStream if response.is_async else ObservedStream
+            response.streaming_content = stream(response.streaming_content, stats, observe)
+        else:
+            observe()
+        return response
+
+
+class ObservedStream:
+    """
+    Cuerpo de una respuesta en streaming que se genera con ``stats`` como
+    métricas del request en curso y las registra una sola vez al cerrarse la
+    respuesta, aunque el cliente se desconecte antes del final.
+    """
+    def __init__(self, content, stats, observe):
+        self.content = content
+        self.stats = stats
+        self.observe = observe
+        self.observed = False
+
+    def __iter__(self):
+        content = iter(self.content)
+        while True:
+            token = current_stats.set(self.stats)
+            try:
+                chunk = next(content)
+            except StopIteration:
+                return
+            finally:
+                current_stats.reset(token)
+            yield chunk
+
+    def close(self):
+        if not self.observed:
+            self.observed = True
+            self.observe()
+
+
+class AsyncObservedStream:
+    __init__ = ObservedStream.__init__
+    close = ObservedStream.close
+
+    async def __aiter__(self):
+        content = aiter(self.content)
+        while True:
+            token = current_stats.set(self.stats)
+            try:
+                chunk = await anext(content)
+            except StopAsyncIteration:
+                return
+            finally:
+                current_stats.reset(token)
+            yield chunk
+
+
+# GET para las métricas en formato de texto de Prometheus
+@require_http_methods(["GET"])
+def metrics_view(request):
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
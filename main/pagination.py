@@ -0,0 +1,134 @@
+import base64
+import json
+
+from django.conf import settings
+
+
+DEFAULT_PAGE_SIZE = getattr(settings, 'API_DEFAULT_PAGE_SIZE', 50)
+MAX_PAGE_SIZE = getattr(settings, 'API_MAX_PAGE_SIZE', 200)
+
+
+class InvalidQueryParam(ValueError):
+    """Parámetro de consulta inválido; las vistas lo convierten en un 400."""
+
+
+# Lee el parámetro `limit` acotándolo al máximo permitido
+def get_limit(request):
+    raw = request.GET.get('limit')
+    if raw in (None, ''):
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise InvalidQueryParam('El parámetro limit debe ser un número entero')
+    if limit < 1:
+        raise InvalidQueryParam('El parámetro limit debe ser mayor que 0')
+    return min(limit, MAX_PAGE_SIZE)
+
+
+# Los cursores son opacos para el cliente: una lista de valores en JSON codificada en base64
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidQueryParam('El cursor no es válido')
+    if not isinstance(values, list):
+        raise InvalidQueryParam('El cursor no es válido')
+    return values
+
+
+def get_cursor(request, size):
+    """Devuelve los valores del cursor `cursor` (o None) validando su largo."""
+    token = request.GET.get('cursor')
+    if not token:
+        return None
+    values = decode_cursor(token)
+    if len(values) != size:
+        raise InvalidQueryParam('El cursor no es válido')
+    return values
+
+
+def split_page(rows, limit, cursor_values):
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(cursor_values(rows[-1]))
+    return rows, next_cursor
+
+
+def paginate(queryset, limit, cursor_values):
+    """
+    Evalúa una página de `queryset` (ya filtrado por cursor) pidiendo una fila
+    extra para saber si existe una página siguiente sin hacer un COUNT.
+    `cursor_values` recibe el último objeto de la página y devuelve su cursor.
+    """
+    return split_page(list(queryset[:limit + 1]), limit, cursor_values)
+
+
+async def apaginate(queryset, limit, cursor_values):
+    """Versión asíncrona de ``paginate`` para las vistas ASGI."""
+    return split_page([row async for row in queryset[:limit + 1]], limit, cursor_values)
+
+
+# Interpreta valores booleanos de la query string
+def parse_bool(value, name):
+    lowered = value.lower()
+    if lowered in ('1', 'true', 'yes'):
+        return True
+    if lowered in ('0', 'false', 'no'):
+        return False
+    raise InvalidQueryParam(f'El parámetro {name} debe ser true o false')
+
+
+def get_fields(request, allowed, name='fields'):
+    """
+    Lee una lista separada por comas (p. ej. ``?fields=id,name``) validando que
+    cada elemento esté en ``allowed``. Devuelve None si el parámetro no viene.
+    """
+    raw = request.GET.get(name)
+    if not raw:
+        return None
+    fields = {field.strip() for field in raw.split(',') if field.strip()}
+    unknown = sorted(fields - set(allowed))
+    if unknown:
+        raise InvalidQueryParam(f"Valores desconocidos en {name}: {', '.join(unknown)}")
+    return fields
+
+
+def get_ids(request, name='ids'):
+    """
+    Lee ``?ids=1,2,3`` como lista de enteros sin repetidos (en el orden pedido).
+    Devuelve None si el parámetro no viene; admite hasta MAX_PAGE_SIZE ids.
+    """
+    raw = request.GET.get(name)
+    if raw is None:
+        return None
+    ids = []
+    for value in raw.split(','):
+        value = value.strip()
+        if not value.isdigit():
+            raise InvalidQueryParam(f'El parámetro {name} debe ser una lista de ids numéricos')
+        ids.append(int(value))
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        raise InvalidQueryParam(f'El parámetro {name} debe ser una lista de ids numéricos')
+    if len(ids) > MAX_PAGE_SIZE:
+        raise InvalidQueryParam(f'Se pueden pedir hasta {MAX_PAGE_SIZE} ids')
+    return ids
+
+
+def multi_get(name, ids, found, serialize):
+    """
+    Cuerpo de un multi-get (``?ids=``): los objetos de ``found`` (el resultado
+    de ``in_bulk``) en el orden pedido, y en ``missing`` los ids que no existen.
+    """
+    return {
+        name: [serialize(found[pk]) for pk in ids if pk in found],
+        'missing': [pk for pk in ids if pk not in found],
+    }
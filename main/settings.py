@@ -28,6 +28,9 @@ DEBUG = True
 
 ALLOWED_HOSTS = []
 
+# Las vistas con @query_budget lanzan QueryBudgetExceeded si superan su presupuesto de consultas
+QUERY_BUDGET_ENFORCED = DEBUG
+
 
 # Application definition
 
@@ -43,9 +46,12 @@ INSTALLED_APPS = [
     'accounts',
     'products',
     'orders',
+    'analytics',
 ]
 
 MIDDLEWARE = [
+    # Primero, para que Server-Timing y /metrics incluyan el tiempo de los demás middlewares
+    'main.metrics.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -105,6 +111,71 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# En producción con varios workers conviene un backend compartido (Redis o Memcached)
+# para que la invalidación del catálogo llegue a todos los procesos.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'laveguita',
+    }
+}
+
+# El hash de la contraseña se calcula en un pool acotado (accounts/hashing.py). ModelBackend
+# queda después solo para que las sesiones abiertas con él sigan siendo válidas
+AUTHENTICATION_BACKENDS = [
+    'accounts.backends.PooledHashBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+# Hilos que calculan hashes de contraseñas (None = un hilo por núcleo) y logins que pueden
+# esperar uno libre; con todo ocupado el login responde 429 sin hashear
+LOGIN_HASH_WORKERS = None
+LOGIN_HASH_QUEUE = 8
+
+# Intentos de login por IP y por email: (intentos, segundos). Los buckets viven en la memoria
+# del proceso; con LOGIN_THROTTLE_CACHE = 'default' (y un backend compartido) valen para todos
+LOGIN_THROTTLE_RATES = {
+    'ip': (20, 60),
+    'email': (5, 300),
+}
+LOGIN_THROTTLE_CACHE = None
+
+# Procesos que hashean contraseñas en la importación de usuarios (None = uno por núcleo)
+USER_IMPORT_WORKERS = None
+
+# Filas que acepta una importación de usuarios por request; los archivos más grandes se
+# importan con manage.py import_users, fuera del proceso web
+USER_IMPORT_MAX_ROWS = 1000
+
+# Sesiones en la caché con respaldo en la base de datos: leer la sesión no hace consultas
+# mientras esté en caché, y un reinicio de la caché no cierra las sesiones
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+# Segundos durante los que se confía en el perfil cacheado de cada usuario (accounts/cache.py).
+# Guardar el usuario solo descarta el perfil en la caché de este proceso (LocMemCache) y los
+# .update() no lo descartan: una desactivación o un cambio de contraseña tarda a lo sumo esto
+PROFILE_CACHE_TIMEOUT = 60
+
+# Segundos que se conserva cada snapshot del catálogo (products, categories, suppliers)
+CATALOGUE_CACHE_TIMEOUT = 300
+
+# Segundos durante los que se repite la respuesta guardada de un POST con Idempotency-Key
+IDEMPOTENCY_KEY_TTL = 60 * 60 * 24
+
+# Capacidad de cada tipo de vehículo para el despacho automático (unidades de producto)
+DISPATCH_CAPACITY = {
+    'Camioneta': 200,
+    'Moto': 20,
+    'Bicicleta': 10,
+}
+
+# Punto de partida (latitud, longitud) de las rutas de reparto: La Vega Central, Santiago
+DISPATCH_DEPOT = (-33.4297, -70.6496)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -141,6 +212,13 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Archivos subidos (imágenes de productos y sus variantes)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Procesos del pool que genera las variantes de imágenes de productos
+IMAGE_VARIANT_WORKERS = 2
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
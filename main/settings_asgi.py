@@ -0,0 +1,13 @@
+"""
+Perfil de despliegue ASGI: las mismas settings con las vistas de lectura
+asíncronas de main.asgi_urls. Se usa desde main/asgi.py, por ejemplo:
+
+    uvicorn main.asgi:application --workers 4
+
+Mientras una consulta lenta o un cliente lento esperan, el proceso sigue
+atendiendo otras conexiones en el event loop en lugar de bloquear un hilo.
+"""
+from .settings import *  # noqa: F401,F403
+
+
+ROOT_URLCONF = 'main.asgi_urls'
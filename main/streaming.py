@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+from .metrics import TimedJSONEncoder
+from .pagination import parse_bool
+
+
+STREAM_CHUNK_SIZE = getattr(settings, 'API_STREAM_CHUNK_SIZE', 500)
+
+
+# Indica si el cliente pidió la lista completa en modo streaming (?stream=true)
+def wants_stream(request):
+    value = request.GET.get('stream')
+    return bool(value) and parse_bool(value, 'stream')
+
+
+def stream_json(key, queryset, serializer, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Responde ``{"<key>": [...]}`` como StreamingHttpResponse. Las filas se leen
+    con ``queryset.iterator(chunk_size)`` y se codifican por bloques, así la
+    memoria del worker depende del tamaño del bloque y no del de la tabla.
+    """
+    encoder = TimedJSONEncoder()
+
+    def chunks():
+        yield '{%s: [' % encoder.encode(key)
+        buffer = []
+        separator = ''
+        for obj in queryset.iterator(chunk_size=chunk_size):
+            buffer.append(separator + encoder.encode(serializer(obj)))
+            separator = ','
+            if len(buffer) >= chunk_size:
+                yield ''.join(buffer)
+                buffer = []
+        yield ''.join(buffer) + ']}'
+
+    return StreamingHttpResponse(chunks(), content_type='application/json')
+
+
+def astream_json(key, queryset, serializer, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Igual que ``stream_json`` pero con un generador asíncrono sobre
+    ``queryset.aiterator``, para que el servidor ASGI envíe cada bloque sin
+    ocupar un hilo mientras el cliente lo recibe.
+    """
+    encoder = TimedJSONEncoder()
+
+    async def chunks():
+        yield '{%s: [' % encoder.encode(key)
+        buffer = []
+        separator = ''
+        async for obj in queryset.aiterator(chunk_size=chunk_size):
+            buffer.append(separator + encoder.encode(serializer(obj)))
+            separator = ','
+            if len(buffer) >= chunk_size:
+                yield ''.join(buffer)
+                buffer = []
+        yield ''.join(buffer) + ']}'
+
+    return StreamingHttpResponse(chunks(), content_type='application/json')
@@ -0,0 +1,81 @@
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import resolve
+
+
+# Tamaños con los que se compara la cantidad de consultas de cada vista
+SMALL = 10
+LARGE = 1000
+
+
+@override_settings(QUERY_BUDGET_ENFORCED=True)
+class QueryCountTestCase(TestCase):
+    """
+    Base de los tests de cantidad de consultas. Cada test declara cuántas
+    consultas hace una vista y lo comprueba con SMALL y con LARGE filas, así
+    una consulta por fila (N+1) hace fallar el test aunque el número fijado
+    se haya actualizado con pocas filas. Los presupuestos de query_budget
+    también quedan activos.
+    """
+
+    def assertStableQueries(self, expected, seed, request, sizes=(SMALL, LARGE)):
+        """
+        ``seed(rows)`` completa los datos hasta ``rows`` filas y devuelve lo que
+        necesite ``request(context)``, que hace el request medido. Solo se
+        cuentan las consultas del request, incluido el cuerpo en streaming.
+        ``sizes`` se achica cuando las filas son líneas de una misma consulta:
+        SQLite parte los INSERT e IN de más de 999 parámetros en varios lotes.
+        """
+        for rows in sizes:
+            context = seed(rows)
+            cache.clear()
+            with self.subTest(rows=rows), self.assertNumQueries(expected):
+                response = request(context)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            self.assertLess(response.status_code, 400, response.content if not response.streaming else '')
+
+
+def walk_pages(client, path, name):
+    """Recorre una lista paginada siguiendo ``next_cursor`` y devuelve los ids en el orden recibido."""
+    ids = []
+    separator = '&' if '?' in path else '?'
+    url = path
+    while True:
+        response = client.get(url)
+        assert response.status_code == 200, response.content
+        data = response.json()
+        ids += [row['id'] for row in data[name]]
+        if data['next_cursor'] is None:
+            return ids
+        url = f"{path}{separator}cursor={data['next_cursor']}"
+
+
+def response_body(response):
+    if not response.streaming:
+        return response.content
+    if response.is_async:
+        async def read():
+            return b''.join([chunk async for chunk in response.streaming_content])
+        return async_to_sync(read)()
+    return b''.join(response.streaming_content)
+
+
+class AsyncParityTestCase(TestCase):
+    """
+    Base de los tests de las vistas asíncronas de main.asgi_urls: cada GET se
+    hace con el cliente síncrono (main.urls) y con AsyncClient (main.asgi_urls)
+    y ambas respuestas deben tener el mismo código y el mismo cuerpo.
+    """
+
+    def assertSameResponse(self, path, **extra):
+        cache.clear()
+        expected = self.client.get(path, **extra)
+        cache.clear()
+        with override_settings(ROOT_URLCONF='main.asgi_urls'):
+            self.assertTrue(iscoroutinefunction(resolve(path.split('?')[0]).func), path)
+            response = async_to_sync(self.async_client.get)(path, **extra)
+        self.assertEqual(response.status_code, expected.status_code, path)
+        self.assertEqual(response_body(response), response_body(expected), path)
+        return response
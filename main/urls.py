@@ -13,12 +13,20 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
+from main.metrics import metrics_view
 
 urlpatterns = [
     path('admin1/', admin.site.urls),
     path('', include('products.urls')),
     path('', include('orders.urls')),
+    path('', include('analytics.urls')),
     path('accounts/', include('accounts.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
+
+# En desarrollo Django sirve las imágenes subidas y sus variantes
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,78 @@
+from asgiref.sync import sync_to_async
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from main.conditional import acollection_stamp, async_conditional
+from main.metrics import JsonResponse
+from main.pagination import InvalidQueryParam, apaginate, multi_get
+from main.streaming import astream_json, wants_stream
+from .models import Driver, Order, Product, Vehicle
+from .serializers import serialize_driver, serialize_order, serialize_vehicle
+from . import views
+from .views import driver_list, order_cursor, order_list, vehicle_list
+
+
+# Vistas de lectura para el perfil ASGI (main.settings_asgi). Los GET usan el ORM
+# asíncrono con la misma lectura de parámetros y relaciones precargadas que views.py; los POST se
+# delegan a las vistas síncronas (con su transacción e Idempotency-Key).
+
+async def orders_stamp(request):
+    return await acollection_stamp(Order.objects.all(), Vehicle.objects.all(), Driver.objects.all(), Product.objects.all())
+
+async def vehicles_stamp(request):
+    return await acollection_stamp(Vehicle.objects.all(), Driver.objects.all())
+
+async def drivers_stamp(request):
+    return await acollection_stamp(Driver.objects.all())
+
+
+# GET y POST para la lista de órdenes
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+@async_conditional(orders_stamp)
+async def orders(request):
+    if request.method == 'POST':
+        return await sync_to_async(views.orders)(request)
+
+    try:
+        orders, ids, expand, limit, stream = order_list(request)
+    except InvalidQueryParam as error:
+        return JsonResponse({'status': 'error', 'message': str(error)}, status=400)
+
+    if ids is not None:
+        return JsonResponse(multi_get('orders', ids, await orders.ain_bulk(ids), lambda order: serialize_order(order, expand)))
+    if stream:
+        return astream_json('orders', orders, lambda order: serialize_order(order, expand))
+    orders, next_cursor = await apaginate(orders, limit, order_cursor)
+    return JsonResponse({'orders': [serialize_order(order, expand) for order in orders], 'next_cursor': next_cursor})
+
+# GET y POST para los vehículos
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+@async_conditional(vehicles_stamp)
+async def vehicles(request):
+    if request.method == 'POST':
+        return await sync_to_async(views.vehicles)(request)
+
+    try:
+        vehicles, expand = vehicle_list(request)
+        if wants_stream(request):
+            return astream_json('vehicles', vehicles, lambda vehicle: serialize_vehicle(vehicle, expand))
+    except InvalidQueryParam as error:
+        return JsonResponse({'status': 'error', 'message': str(error)}, status=400)
+    return JsonResponse({'vehicles': [serialize_vehicle(vehicle, expand) async for vehicle in vehicles]})
+
+# GET y POST para los conductores
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+@async_conditional(drivers_stamp)
+async def drivers(request):
+    if request.method == 'POST':
+        return await sync_to_async(views.drivers)(request)
+
+    try:
+        drivers, expand = driver_list(request)
+        if wants_stream(request):
+            return astream_json('drivers', drivers, lambda driver: serialize_driver(driver, expand))
+    except InvalidQueryParam as error:
+        return JsonResponse({'status': 'error', 'message': str(error)}, status=400)
+    return JsonResponse({'drivers': [serialize_driver(driver, expand) async for driver in drivers]})
@@ -0,0 +1,101 @@
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce, Now
+
+from .models import Order, Vehicle
+
+
+# Capacidad de cada tipo de vehículo, en unidades de producto (suma de cantidades de los ítems)
+def vehicle_capacity():
+    return settings.DISPATCH_CAPACITY
+
+
+def plan_dispatch(orders, vehicles):
+    """
+    Asigna órdenes a vehículos con best-fit decreasing.
+
+    ``orders`` es una lista de ``(order_id, carga)`` y ``vehicles`` una lista de
+    ``(vehicle_id, capacidad libre)``. Las órdenes se recorren de mayor a menor
+    carga y cada una va al vehículo con menos capacidad libre donde todavía
+    cabe, así los vehículos grandes quedan para las órdenes grandes. Los
+    vehículos se mantienen ordenados por capacidad libre, por lo que cada
+    asignación es una búsqueda binaria.
+
+    Devuelve ``({vehicle_id: [order_id, ...]}, [order_id sin asignar, ...])``.
+    """
+    free = sorted((capacity, vehicle_id) for vehicle_id, capacity in vehicles if capacity > 0)
+    assignments = {}
+    unassigned = []
+    for order_id, load in sorted(orders, key=lambda order: (-order[1], order[0])):
+        index = bisect_left(free, (load, -1))
+        if index == len(free):
+            unassigned.append(order_id)
+            continue
+        capacity, vehicle_id = free.pop(index)
+        assignments.setdefault(vehicle_id, []).append(order_id)
+        insort(free, (capacity - load, vehicle_id))
+    return assignments, sorted(unassigned)
+
+
+def dispatch_pending(dry_run=False):
+    """
+    Reparte las órdenes 'Pendiente' sin vehículo entre los vehículos con
+    conductor, descontando la carga de las órdenes pendientes que ya tienen.
+    Las asignaciones se aplican con un UPDATE por vehículo que solo toca
+    órdenes que siguen pendientes y sin vehículo; si otra solicitud tomó
+    alguna en el medio, el reporte muestra solo las que se asignaron aquí.
+    """
+    capacity = vehicle_capacity()
+    orders = list(
+        Order.objects.filter(status='Pendiente', vehicle__isnull=True)
+        .annotate(load=Coalesce(Sum('items__quantity'), 0))
+        .values_list('id', 'load')
+    )
+    vehicles = {
+        vehicle_id: (vehicle_type, capacity.get(vehicle_type, 0) - load)
+        for vehicle_id, vehicle_type, load in Vehicle.objects.filter(driver__isnull=False)
+        .annotate(load=Coalesce(Sum('orders__items__quantity', filter=Q(orders__status='Pendiente')), 0))
+        .values_list('id', 'vehicle_type', 'load')
+    }
+    assignments, unassigned = plan_dispatch(orders, [(vehicle_id, free) for vehicle_id, (vehicle_type, free) in vehicles.items()])
+
+    planned = sum(len(order_ids) for order_ids in assignments.values())
+    assigned = planned
+    if not dry_run:
+        with transaction.atomic():
+            assigned = 0
+            for vehicle_id, order_ids in assignments.items():
+                assigned += Order.objects.filter(
+                    id__in=order_ids, status='Pendiente', vehicle__isnull=True
+                ).update(vehicle_id=vehicle_id, updated_at=Now())
+            if assigned < planned:
+                # Alguna orden cambió entre el plan y el UPDATE: se releen las que quedaron en cada vehículo
+                planned_vehicle = {
+                    order_id: vehicle_id for vehicle_id, order_ids in assignments.items() for order_id in order_ids
+                }
+                current = Order.objects.filter(id__in=list(planned_vehicle), status='Pendiente').values_list('id', 'vehicle_id')
+                applied = {}
+                for order_id, vehicle_id in current:
+                    if planned_vehicle[order_id] == vehicle_id:
+                        applied.setdefault(vehicle_id, []).append(order_id)
+                assignments = applied
+
+    loads = dict(orders)
+    return {
+        'dry_run': dry_run,
+        'pending': len(orders),
+        'assigned': assigned,
+        'unassigned': unassigned,
+        'vehicles': [
+            {
+                'vehicle': vehicle_id,
+                'vehicle_type': vehicles[vehicle_id][0],
+                'load': sum(loads[order_id] for order_id in order_ids),
+                'orders': sorted(order_ids),
+            }
+            for vehicle_id, order_ids in sorted(assignments.items())
+        ],
+    }
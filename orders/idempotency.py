@@ -0,0 +1,90 @@
+import hashlib
+from functools import wraps
+
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, JsonResponse
+
+from .models import IdempotencyKey
+
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def digest(value):
+    return hashlib.sha256(value).hexdigest()
+
+
+# Dueño de la clave: el usuario autenticado o, si no hay, la sesión. Sin ninguno
+# de los dos la clave queda compartida por los clientes anónimos sin sesión
+def owner(request):
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    if request.session.session_key:
+        return f'session:{request.session.session_key}'
+    return ''
+
+
+# Devuelve la respuesta guardada, o un error si la clave se usó con otro cuerpo
+def replay(record, fingerprint):
+    if record.fingerprint != fingerprint:
+        return JsonResponse({'status': 'error', 'message': 'La clave Idempotency-Key ya se usó con otra solicitud'}, status=422)
+    if record.status_code is None:
+        return JsonResponse({'status': 'error', 'message': 'La solicitud original aún se está procesando'}, status=409)
+    response = HttpResponse(bytes(record.body), status=record.status_code, content_type='application/json')
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+# Inserta la clave dentro de un savepoint; False si otra solicitud ya la tiene
+def claim(key, fingerprint):
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.expired().filter(key=key).delete()
+            IdempotencyKey.objects.create(key=key, fingerprint=fingerprint)
+    except IntegrityError:
+        return False
+    return True
+
+
+def idempotent(view):
+    """
+    Hace seguro reintentar un POST que trae la cabecera Idempotency-Key. La
+    clave vale por usuario (o sesión) y ruta: dos clientes que eligen el mismo
+    valor no ven la respuesta del otro.
+
+    La primera solicitud inserta la clave, ejecuta la vista y guarda su
+    respuesta en la misma transacción, así un reintento concurrente espera en
+    el índice único y luego repite la respuesta. Un reintento posterior la
+    repite con una sola consulta, sin tocar Product ni OrderItem. Las
+    respuestas 5xx no se guardan y se pueden reintentar.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        header = request.headers.get(IDEMPOTENCY_HEADER)
+        if request.method != 'POST' or header is None:
+            return view(request, *args, **kwargs)
+        if not header or len(header) > MAX_KEY_LENGTH:
+            return JsonResponse({'status': 'error', 'message': f'La cabecera {IDEMPOTENCY_HEADER} debe tener entre 1 y {MAX_KEY_LENGTH} caracteres'}, status=400)
+
+        key = digest(f'{owner(request)}\n{request.path}\n{header}'.encode())
+        fingerprint = digest(request.body)
+        record = IdempotencyKey.objects.live().filter(key=key).first()
+        if record is not None:
+            return replay(record, fingerprint)
+
+        with transaction.atomic():
+            if not claim(key, fingerprint):
+                record = IdempotencyKey.objects.filter(key=key).first()
+            else:
+                response = view(request, *args, **kwargs)
+                if response.status_code >= 500 or response.streaming:
+                    transaction.set_rollback(True)
+                    return response
+                IdempotencyKey.objects.filter(key=key).update(status_code=response.status_code, body=response.content)
+                return response
+
+        if record is None:
+            return JsonResponse({'status': 'error', 'message': 'La solicitud original aún se está procesando'}, status=409)
+        return replay(record, fingerprint)
+    return wrapper
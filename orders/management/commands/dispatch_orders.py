@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from orders.dispatch import dispatch_pending
+
+
+class Command(BaseCommand):
+    help = "Asigna las órdenes pendientes sin vehículo a los vehículos con conductor según su capacidad"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Muestra el plan sin aplicarlo")
+
+    def handle(self, *args, **options):
+        report = dispatch_pending(dry_run=options['dry_run'])
+        for vehicle in report['vehicles']:
+            self.stdout.write(f"Vehículo {vehicle['vehicle']} ({vehicle['vehicle_type']}): {len(vehicle['orders'])} órdenes, carga {vehicle['load']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Órdenes pendientes: {report['pending']}, asignadas: {report['assigned']}, sin asignar: {len(report['unassigned'])}"
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from orders.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Elimina las claves Idempotency-Key vencidas (más antiguas que IDEMPOTENCY_KEY_TTL)"
+
+    def handle(self, *args, **options):
+        deleted, _ = IdempotencyKey.objects.expired().delete()
+        self.stdout.write(self.style.SUCCESS(f"Claves eliminadas: {deleted}"))
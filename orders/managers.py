@@ -0,0 +1,72 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
+from products.models import Product
+from .signals import order_items_bulk_created
+
+
+class OrderManager(models.Manager):
+    """
+    Manager de órdenes con un ingreso por lotes que hace una cantidad fija de
+    consultas, sin importar cuántas líneas tenga la orden.
+    """
+    def create_with_items(self, user, items, vehicle=None, **fields):
+        """
+        Crea una orden con sus ítems en una sola transacción.
+
+        ``items`` es un iterable de pares ``(product_id, quantity)``. Los
+        productos se cargan con una consulta, el stock se reserva con un UPDATE
+        condicional, la orden se inserta con el total ya calculado en memoria y
+        los OrderItem se insertan con ``bulk_create`` (que evita recalcular el
+        total por ítem en ``OrderItem.save``).
+
+        Los ``fields`` extra (por ejemplo, las coordenadas de entrega) se pasan
+        a la Order.
+
+        Lanza Product.DoesNotExist si un producto no existe e
+        InsufficientStock si alguna línea no se puede reservar.
+        """
+        items = list(items)
+        quantities = {}
+        for product_id, quantity in items:
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+
+        products = Product.objects.in_bulk(list(quantities))
+        missing = [product_id for product_id in quantities if product_id not in products]
+        if missing:
+            raise Product.DoesNotExist(f"El producto {missing[0]} no existe")
+
+        OrderItem = self.model.items.field.model
+        with transaction.atomic():
+            Product.objects.reserve_stock_bulk({
+                products[product_id]: quantity for product_id, quantity in quantities.items()
+            })
+            order_items = [
+                OrderItem(product=products[product_id], quantity=quantity, price=int(products[product_id].price))
+                for product_id, quantity in items
+            ]
+            order = self.create(
+                user=user,
+                vehicle=vehicle,
+                **fields,
+                total_price=sum(item.get_total_price() for item in order_items),
+            )
+            for item in order_items:
+                item.order = order
+            OrderItem.objects.bulk_create(order_items)
+            order_items_bulk_created.send(sender=OrderItem, order=order, items=order_items)
+        return order
+
+
+class IdempotencyKeyQuerySet(models.QuerySet):
+    """Claves vigentes y vencidas según ``IDEMPOTENCY_KEY_TTL`` (segundos)."""
+    def cutoff(self):
+        return timezone.now() - timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 86400))
+
+    def live(self):
+        return self.filter(created_at__gte=self.cutoff())
+
+    def expired(self):
+        return self.filter(created_at__lt=self.cutoff())
@@ -1,12 +1,15 @@
 from django.db import models
 from django.conf import settings
+from django.db.models import F, Sum
 from products.models import Product
+from .managers import IdempotencyKeyQuerySet, OrderManager
 
 class Driver(models.Model):
     readonly_fields = ('id',)
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     phone_number = models.CharField(max_length=15)
     license_number = models.CharField(max_length=20, unique=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
 
 
@@ -21,6 +24,7 @@ class Vehicle(models.Model):
     vehicle_type = models.CharField(max_length=20, choices=VEHICLE_TYPE_CHOICES)
     model = models.CharField(max_length=50, null=True, blank=True)
     driver = models.ForeignKey(Driver, on_delete=models.SET_NULL, null=True, blank=True, related_name='vehicles')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"{self.vehicle_type} - {self.license_plate} ({self.driver})"
@@ -39,10 +43,25 @@ class Order(models.Model):
     total_price = models.IntegerField(default=0) 
     vehicle = models.ForeignKey(Vehicle, on_delete=models.SET_NULL, null=True, blank=True, related_name='orders')
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Coordenadas de entrega, usadas para ordenar las paradas de cada vehículo
+    delivery_latitude = models.FloatField(null=True, blank=True)
+    delivery_longitude = models.FloatField(null=True, blank=True)
+
+    objects = OrderManager()
+
+    class Meta:
+        # Índices para la paginación por cursor sobre (status, created_at, id) con y sin filtros
+        indexes = [
+            models.Index(fields=['status', 'created_at', 'id'], name='order_status_created_idx'),
+            models.Index(fields=['user', 'status', 'created_at', 'id'], name='order_user_status_idx'),
+            models.Index(fields=['vehicle', 'status', 'created_at', 'id'], name='order_vehicle_status_idx'),
+            models.Index(fields=['created_at'], name='order_created_idx'),
+        ]
 
     def calculate_total_price(self):
-        total = sum(item.get_total_price() for item in self.items.all())
+        # El total se calcula en SQL para no cargar todas las líneas de la orden
+        total = self.items.aggregate(total=Sum(F('quantity') * F('price')))['total'] or 0
         self.total_price = total
         return total
 
@@ -69,6 +88,25 @@ class OrderItem(models.Model):
     def save(self, *args, **kwargs):
         if not self.price:  
             self.price = self.product.price
-        super().save(*args, **kwargs)  
-        self.order.calculate_total_price() 
-        self.order.save() 
+        super().save(*args, **kwargs)
+        # Order.save recalcula el total; para órdenes con muchas líneas usar Order.objects.create_with_items
+        self.order.save()
+
+
+class IdempotencyKey(models.Model):
+    """
+    Respuesta guardada de un POST con cabecera Idempotency-Key. La clave es el
+    sha256 de (usuario o sesión, ruta, cabecera) para que la tabla tenga filas
+    de tamaño fijo; ``fingerprint`` es el sha256 del cuerpo de la solicitud
+    original.
+    """
+    key = models.CharField(max_length=64, primary_key=True)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    body = models.BinaryField(default=b'')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    objects = IdempotencyKeyQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.key[:12]} ({self.status_code})"
@@ -0,0 +1,94 @@
+from math import asin, cos, radians, sin, sqrt
+
+from django.conf import settings
+
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def depot():
+    return settings.DISPATCH_DEPOT
+
+
+def distance_matrix(points):
+    """
+    Distancias haversine (km) entre todos los pares de ``points`` [(lat, lon), ...].
+    Los senos y cosenos se calculan una vez por punto y la matriz es simétrica,
+    así que cada par se evalúa una sola vez.
+    """
+    coords = [(radians(lat), radians(lon)) for lat, lon in points]
+    cos_lat = [cos(lat) for lat, lon in coords]
+    size = len(coords)
+    matrix = [[0.0] * size for _ in range(size)]
+    for i in range(size):
+        lat_i, lon_i = coords[i]
+        row = matrix[i]
+        for j in range(i + 1, size):
+            lat_j, lon_j = coords[j]
+            h = sin((lat_j - lat_i) / 2) ** 2 + cos_lat[i] * cos_lat[j] * sin((lon_j - lon_i) / 2) ** 2
+            row[j] = matrix[j][i] = 2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(h)))
+    return matrix
+
+
+def nearest_neighbour(matrix):
+    """Recorrido inicial desde el nodo 0 yendo siempre a la parada más cercana sin visitar."""
+    route = [0]
+    pending = set(range(1, len(matrix)))
+    while pending:
+        row = matrix[route[-1]]
+        closest = min(pending, key=row.__getitem__)
+        pending.remove(closest)
+        route.append(closest)
+    return route
+
+
+def two_opt(route, matrix):
+    """
+    Mejora un recorrido abierto que parte en ``route[0]`` invirtiendo tramos
+    mientras alguna inversión lo acorte. Invertir route[i..j] cambia solo dos
+    aristas, así que cada intento cuesta O(1) con la matriz precalculada.
+    """
+    route = list(route)
+    last = len(route) - 1
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, last):
+            a, b = route[i - 1], route[i]
+            row_a, row_b = matrix[a], matrix[b]
+            base = row_a[b]
+            for j in range(i + 1, last + 1):
+                c = route[j]
+                if j == last:
+                    delta = row_a[c] - base
+                else:
+                    e = route[j + 1]
+                    delta = row_a[c] + row_b[e] - base - matrix[c][e]
+                if delta < -1e-9:
+                    route[i:j + 1] = reversed(route[i:j + 1])
+                    b = route[i]
+                    row_b = matrix[b]
+                    base = row_a[b]
+                    improved = True
+    return route
+
+
+def plan_route(stops, start=None):
+    """
+    Ordena las paradas ``stops`` [(order_id, lat, lon), ...] partiendo desde
+    ``start`` (por defecto el depósito) con vecino más cercano + 2-opt.
+    Devuelve la lista de paradas con la distancia desde la anterior y el total.
+    """
+    start = start or depot()
+    points = [start] + [(lat, lon) for order_id, lat, lon in stops]
+    matrix = distance_matrix(points)
+    route = two_opt(nearest_neighbour(matrix), matrix)
+
+    sequence = []
+    total = 0.0
+    for previous, current in zip(route, route[1:]):
+        order_id, lat, lon = stops[current - 1]
+        distance = matrix[previous][current]
+        total += distance
+        sequence.append({'order': order_id, 'latitude': lat, 'longitude': lon, 'distance_km': round(distance, 3)})
+    return {'start': {'latitude': start[0], 'longitude': start[1]}, 'stops': sequence, 'total_distance_km': round(total, 3)}
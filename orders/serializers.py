@@ -0,0 +1,211 @@
+from functools import wraps
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from main.metrics import timed_serialization
+from main.pagination import get_fields
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Una vista ejecutó más consultas de las declaradas en su presupuesto."""
+
+
+class Relation:
+    """Relación que un serializador puede expandir (con select_related o prefetch_related)."""
+    def __init__(self, lookup, serializer=None, prefetch=False):
+        self.lookup = lookup
+        self.serializer = serializer
+        self.prefetch = prefetch
+
+
+def select(lookup, serializer=None):
+    return Relation(lookup, serializer)
+
+
+def prefetch(lookup, serializer=None):
+    return Relation(lookup, serializer, prefetch=True)
+
+
+# Expansiones anidadas bajo `name`: {'vehicle.driver', 'vehicle.driver.user'} -> {'driver', 'driver.user'}
+def sub_expand(expand, name):
+    if expand is None:
+        return None
+    return {path[len(name) + 1:] for path in expand if path.startswith(name + '.')}
+
+
+def expanded(expand, name):
+    return expand is None or name in expand
+
+
+def relations(**declared):
+    """
+    Declara las relaciones que recorre un serializador y que se pueden expandir
+    con ``?expand=``. El serializador queda con:
+
+    - ``expansions``: las rutas válidas para expand (p. ej. ``vehicle.driver``).
+    - ``prepare(queryset, expand=None)``: aplica el select_related/prefetch_related
+      que necesitan las relaciones expandidas (todas si expand es None), así las
+      vistas no dependen de recordar qué joins necesita cada representación.
+    """
+    def lookups(expand, prefix='', inside_prefetch=False):
+        selected, prefetched = [], []
+        for name, relation in declared.items():
+            if not expanded(expand, name):
+                continue
+            path = prefix + relation.lookup
+            is_prefetch = inside_prefetch or relation.prefetch
+            (prefetched if is_prefetch else selected).append(path)
+            if relation.serializer is not None:
+                child_selected, child_prefetched = relation.serializer.lookups(sub_expand(expand, name), path + '__', is_prefetch)
+                selected += child_selected
+                prefetched += child_prefetched
+        return selected, prefetched
+
+    def decorator(serializer):
+        serializer = timed_serialization(serializer)
+        serializer.relations = declared
+        serializer.expansions = set()
+        for name, relation in declared.items():
+            serializer.expansions.add(name)
+            if relation.serializer is not None:
+                serializer.expansions.update(f'{name}.{path}' for path in relation.serializer.expansions)
+        serializer.lookups = lookups
+
+        def prepare(queryset, expand=None):
+            selected, prefetched = lookups(expand)
+            return queryset.select_related(*selected).prefetch_related(*prefetched)
+
+        serializer.prepare = prepare
+        return serializer
+    return decorator
+
+
+def get_expand(request, serializer):
+    """
+    Lee ``?expand=items,vehicle.driver`` validando las rutas contra las del
+    serializador. Expandir una ruta anidada expande también sus padres.
+    Devuelve None (representación completa) si el parámetro no viene.
+    """
+    expand = get_fields(request, serializer.expansions, name='expand')
+    if expand is None:
+        return None
+    for path in list(expand):
+        parts = path.split('.')
+        expand.update('.'.join(parts[:i]) for i in range(1, len(parts)))
+    return expand
+
+
+def budgeted_chunks(chunks, name, max_queries):
+    """
+    Recorre el cuerpo de una respuesta en streaming controlando las consultas
+    de cada bloque: se ejecutan mientras el servidor consume el cuerpo, después
+    de que la vista ya devolvió. Cada bloque trae sus filas y relaciones por
+    separado, así que el presupuesto se aplica por bloque y no al total.
+    """
+    chunks = iter(chunks)
+    while True:
+        with CaptureQueriesContext(connection) as queries:
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                return
+        if len(queries) > max_queries:
+            raise QueryBudgetExceeded(
+                f'{name} ejecutó {len(queries)} consultas en un bloque del streaming (presupuesto: {max_queries})'
+            )
+        yield chunk
+
+
+def query_budget(max_queries, methods=('GET',)):
+    """
+    Limita la cantidad de consultas que puede ejecutar una vista para los
+    métodos indicados. Solo se controla con QUERY_BUDGET_ENFORCED activo
+    (por defecto en DEBUG); si se excede se lanza QueryBudgetExceeded. En las
+    respuestas en streaming también se controla cada bloque del cuerpo.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in methods or not getattr(settings, 'QUERY_BUDGET_ENFORCED', settings.DEBUG):
+                return view(request, *args, **kwargs)
+            with CaptureQueriesContext(connection) as queries:
+                response = view(request, *args, **kwargs)
+            if len(queries) > max_queries:
+                raise QueryBudgetExceeded(
+                    f'{view.__name__} ejecutó {len(queries)} consultas (presupuesto: {max_queries})'
+                )
+            if response.streaming and not response.is_async:
+                response.streaming_content = budgeted_chunks(response.streaming_content, view.__name__, max_queries)
+            return response
+        return wrapper
+    return decorator
+
+
+# Serializadores. Sin ?expand= se devuelve la representación completa; con expand,
+# las relaciones no expandidas se devuelven como id (y los ítems de la orden se omiten)
+@relations(user=select('user'))
+def serialize_driver(driver, expand=None):
+    return {
+        'id': driver.id,
+        'user': { 
+            'email': driver.user.email,
+            'first_name': driver.user.first_name,
+            'last_name': driver.user.last_name,
+            } if expanded(expand, 'user') else driver.user_id,
+        'phone_number': driver.phone_number,
+        'license_number': driver.license_number,
+    }
+
+@relations(driver=select('driver', serialize_driver))
+def serialize_vehicle(vehicle, expand=None):
+    if expanded(expand, 'driver'):
+        driver = serialize_driver(vehicle.driver, sub_expand(expand, 'driver')) if vehicle.driver else None
+    else:
+        driver = vehicle.driver_id
+    return {
+        'id': vehicle.id,
+        'license_plate': vehicle.license_plate,
+        'vehicle_type': vehicle.vehicle_type,
+        'model': vehicle.model,
+        'driver': driver,
+    }
+
+@relations(product=select('product'))
+def serialize_order_item(order_item, expand=None):
+    return {
+        'id': order_item.id,
+        'product': order_item.product.name if expanded(expand, 'product') else order_item.product_id,
+        'quantity': order_item.quantity,
+        'price': float(order_item.price),
+        'total_price': float(order_item.get_total_price()),
+    }
+
+@relations(
+    user=select('user'),
+    vehicle=select('vehicle', serialize_vehicle),
+    items=prefetch('items', serialize_order_item),
+)
+def serialize_order(order, expand=None):
+    if expanded(expand, 'vehicle'):
+        vehicle = serialize_vehicle(order.vehicle, sub_expand(expand, 'vehicle')) if order.vehicle else None
+    else:
+        vehicle = order.vehicle_id
+    data = {
+        'id': order.id,
+        'user': order.user.email if expanded(expand, 'user') else order.user_id,
+        'status': order.status,
+        'total_price': float(order.total_price),
+        'vehicle': vehicle,
+        'delivery_location': (
+            {'latitude': order.delivery_latitude, 'longitude': order.delivery_longitude}
+            if order.delivery_latitude is not None else None
+        ),
+        'created_at': order.created_at.date().isoformat(),
+        'updated_at': order.updated_at.date().isoformat(),
+    }
+    if expanded(expand, 'items'):
+        item_expand = sub_expand(expand, 'items')
+        data['items'] = [serialize_order_item(item, item_expand) for item in order.items.all()]
+    return data
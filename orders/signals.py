@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+
+# Se envía después de insertar ítems con bulk_create (que no dispara post_save).
+# Argumentos: order, items
+order_items_bulk_created = Signal()
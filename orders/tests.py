@@ -1,3 +1,605 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from math import radians
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from analytics.rollups import rebuild as rebuild_rollups
+from main.metrics import JsonResponse, RequestStats, current_stats, registry
+from main.pagination import encode_cursor
+from main.streaming import STREAM_CHUNK_SIZE
+from main.testing import SMALL, AsyncParityTestCase, QueryCountTestCase, walk_pages
+from products.managers import InsufficientStock
+from products.models import Category, Product
+
+from .dispatch import plan_dispatch
+from .models import Driver, IdempotencyKey, Order, OrderItem, Vehicle
+from .routing import EARTH_RADIUS_KM, distance_matrix, nearest_neighbour, plan_route
+from .serializers import QueryBudgetExceeded, budgeted_chunks
+
+
+def seed_products(rows):
+    category = Category.objects.first() or Category.objects.create(name='Frutas')
+    start = Product.objects.count()
+    Product.objects.bulk_create([
+        Product(name=f'Producto {i}', price=1000, description='-', stock=100000, category=category)
+        for i in range(start, rows)
+    ])
+    return list(Product.objects.order_by('id').values_list('id', flat=True)[:rows])
+
+
+def seed_vehicles(rows):
+    """Completa hasta ``rows`` vehículos, cada uno con su conductor, y devuelve el primero."""
+    User = get_user_model()
+    start = Vehicle.objects.count()
+    users = User.objects.bulk_create([
+        User(email=f'conductor{rows}-{i}@example.com', first_name='Conductor', last_name=str(i), rol='conductor')
+        for i in range(start, rows)
+    ])
+    drivers = Driver.objects.bulk_create([
+        Driver(user=user, phone_number='912345678', license_number=f'LIC{rows}-{i}') for i, user in enumerate(users)
+    ])
+    Vehicle.objects.bulk_create([
+        Vehicle(license_plate=f'AB{rows}-{i}', vehicle_type='Camioneta', driver=driver) for i, driver in enumerate(drivers)
+    ])
+    return Vehicle.objects.order_by('id').first()
+
+
+def seed_drivers(rows):
+    seed_vehicles(rows)
+    return Driver.objects.order_by('id').first()
+
+
+def customer():
+    User = get_user_model()
+    return User.objects.filter(email='cliente@example.com').first() or User.objects.create(
+        email='cliente@example.com', first_name='Cliente', last_name='Prueba'
+    )
+
+
+def seed_orders(rows, **fields):
+    """Completa hasta ``rows`` órdenes con dos ítems cada una, asignadas al primer vehículo."""
+    vehicle = seed_vehicles(1)
+    products = seed_products(2)
+    user = customer()
+    orders = Order.objects.bulk_create([
+        Order(user=user, vehicle=vehicle, total_price=3000, **fields) for _ in range(rows - Order.objects.count())
+    ])
+    OrderItem.objects.bulk_create([
+        OrderItem(order=order, product_id=product_id, quantity=quantity, price=1000)
+        for order in orders
+        for product_id, quantity in zip(products, (1, 2))
+    ])
+    return Order.objects.order_by('id').first()
+
+
+def seed_order_items(rows):
+    """Una sola orden con ``rows`` ítems, cada uno de un producto distinto."""
+    products = seed_products(rows)
+    order = Order.objects.first() or Order.objects.create(user=customer(), vehicle=seed_vehicles(1))
+    existing = set(order.items.values_list('product_id', flat=True))
+    OrderItem.objects.bulk_create([
+        OrderItem(order=order, product_id=product_id, quantity=1, price=1000)
+        for product_id in products if product_id not in existing
+    ])
+    return order
+
+
+def post_json(client, url, data, method='post'):
+    return getattr(client, method)(url, json.dumps(data), content_type='application/json')
+
+
+class OrderQueryCountTests(QueryCountTestCase):
+    def test_list(self):
+        self.assertStableQueries(4, seed_orders, lambda order: self.client.get('/api/orders/?limit=200'))
+
+    def test_list_filtered(self):
+        self.assertStableQueries(4, seed_orders, lambda order: self.client.get(
+            f'/api/orders/?status=Pendiente&vehicle={order.vehicle_id}&user_email=cliente@example.com&limit=200'
+        ))
+
+    def test_list_expanded(self):
+        self.assertStableQueries(4, seed_orders, lambda order: self.client.get('/api/orders/?limit=200&expand=user,items.product,vehicle.driver.user'))
+
+    def test_list_stream(self):
+        # Cada bloque de STREAM_CHUNK_SIZE órdenes trae sus relaciones por separado
+        self.assertStableQueries(4, seed_orders, lambda order: self.client.get('/api/orders/?stream=true'),
+                                 sizes=(SMALL, STREAM_CHUNK_SIZE))
+
+    def test_multi_get(self):
+        def seed(rows):
+            seed_orders(rows)
+            return ','.join(str(order_id) for order_id in Order.objects.values_list('id', flat=True)[:200])
+        self.assertStableQueries(4, seed, lambda ids: self.client.get(f'/api/orders/?ids={ids}'))
+
+    def test_create(self):
+        # Las filas son las líneas de la orden; todos los productos ya tienen ventas hoy
+        def seed(rows):
+            seed_order_items(rows)
+            rebuild_rollups()
+            return seed_products(rows)
+        self.assertStableQueries(15, seed, lambda products: post_json(self.client, '/api/orders/', {
+            'user_email': 'cliente@example.com',
+            'items': [{'product_id': product_id, 'quantity': 1} for product_id in products],
+        }), sizes=(SMALL, 200))
+
+    def test_detail(self):
+        self.assertStableQueries(4, seed_order_items, lambda order: self.client.get(f'/api/orders/{order.id}/'))
+
+    def test_detail_expanded(self):
+        self.assertStableQueries(4, seed_order_items, lambda order: self.client.get(f'/api/orders/{order.id}/?expand=items.product,vehicle.driver'))
+
+    def test_update(self):
+        # Cancelar descuenta todos los ítems de la orden del resumen de ventas por producto
+        def seed(rows):
+            order = seed_order_items(rows)
+            Order.objects.filter(pk=order.pk).update(status='Pendiente')
+            Order.objects.create(user=customer(), status='Cancelado')
+            rebuild_rollups()
+            return order
+        self.assertStableQueries(12, seed, lambda order: post_json(self.client, f'/api/orders/{order.id}/', {
+            'status': 'Cancelado', 'vehicle': order.vehicle_id,
+        }, 'put'), sizes=(SMALL, 200))
+
+    def test_delete(self):
+        # Las filas son las demás órdenes de la tabla; la orden eliminada tiene dos ítems
+        def seed(rows):
+            seed_orders(rows)
+            order = Order.objects.create(user=customer())
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product_id=product_id, quantity=1, price=1000) for product_id in seed_products(2)
+            ])
+            rebuild_rollups()
+            return order
+        self.assertStableQueries(10, seed, lambda order: self.client.delete(f'/api/orders/{order.id}/'))
+
+    def test_dispatch(self):
+        # Las filas son órdenes pendientes sin vehículo; hay un solo vehículo disponible
+        def seed(rows):
+            seed_orders(rows)
+            Order.objects.update(vehicle=None)
+        self.assertStableQueries(5, seed, lambda context: post_json(self.client, '/api/orders/dispatch/', {}))
+
+
+class OrderItemQueryCountTests(QueryCountTestCase):
+    def test_list(self):
+        self.assertStableQueries(2, seed_order_items, lambda order: self.client.get(f'/api/orders/{order.id}/items/'))
+
+    def test_list_expanded(self):
+        self.assertStableQueries(2, seed_order_items, lambda order: self.client.get(f'/api/orders/{order.id}/items/?expand=product'))
+
+    def test_create(self):
+        def seed(rows):
+            order = seed_order_items(rows)
+            return order, Product.objects.create(name='Nuevo', price=500, description='-', stock=10, category=Category.objects.first())
+        self.assertStableQueries(15, seed, lambda context: post_json(self.client, f'/api/orders/{context[0].id}/items/', {
+            'product_id': context[1].id, 'quantity': 1,
+        }))
+
+
+class VehicleQueryCountTests(QueryCountTestCase):
+    def test_list(self):
+        self.assertStableQueries(2, seed_vehicles, lambda vehicle: self.client.get('/api/vehicles/'))
+
+    def test_list_expanded(self):
+        self.assertStableQueries(2, seed_vehicles, lambda vehicle: self.client.get('/api/vehicles/?expand=driver.user'))
+
+    def test_list_stream(self):
+        self.assertStableQueries(2, seed_vehicles, lambda vehicle: self.client.get('/api/vehicles/?stream=true'))
+
+    def test_create(self):
+        def seed(rows):
+            seed_vehicles(rows)
+            return f'ZZ{rows:04d}'
+        self.assertStableQueries(2, seed, lambda license_plate: post_json(self.client, '/api/vehicles/', {
+            'license_plate': license_plate, 'vehicle_type': 'Moto', 'model': 'Honda',
+        }))
+
+    def test_detail(self):
+        self.assertStableQueries(2, seed_vehicles, lambda vehicle: self.client.get(f'/api/vehicles/{vehicle.id}/'))
+
+    def test_update(self):
+        self.assertStableQueries(3, seed_vehicles, lambda vehicle: post_json(self.client, f'/api/vehicles/{vehicle.id}/', {'model': 'Ford'}, 'put'))
+
+    def test_delete(self):
+        self.assertStableQueries(3, seed_vehicles, lambda vehicle: self.client.delete(f'/api/vehicles/{vehicle.id}/'))
+
+    def test_route(self):
+        # Las filas son las paradas del vehículo (todas en el mismo punto para que 2-opt termine rápido)
+        def seed(rows):
+            order = seed_orders(rows, delivery_latitude=-33.44, delivery_longitude=-70.65)
+            return order.vehicle_id
+        self.assertStableQueries(3, seed, lambda vehicle_id: self.client.get(f'/api/vehicles/{vehicle_id}/route/'))
+
+
+class DriverQueryCountTests(QueryCountTestCase):
+    def test_list(self):
+        self.assertStableQueries(2, seed_drivers, lambda driver: self.client.get('/api/drivers/'))
+
+    def test_list_expanded(self):
+        self.assertStableQueries(2, seed_drivers, lambda driver: self.client.get('/api/drivers/?expand=user'))
+
+    def test_list_stream(self):
+        self.assertStableQueries(2, seed_drivers, lambda driver: self.client.get('/api/drivers/?stream=true'))
+
+    def test_create(self):
+        def seed(rows):
+            seed_drivers(rows)
+            return get_user_model().objects.create(email=f'nuevo{rows}@example.com', first_name='Nuevo', last_name='Conductor')
+        self.assertStableQueries(3, seed, lambda user: post_json(self.client, '/api/drivers/', {
+            'phone_number': '987654321', 'license_number': f'NUEVO{user.id}', 'user_email': user.email,
+        }))
+
+    def test_detail(self):
+        self.assertStableQueries(2, seed_drivers, lambda driver: self.client.get(f'/api/drivers/{driver.id}/'))
+
+    def test_update(self):
+        self.assertStableQueries(3, seed_drivers, lambda driver: post_json(self.client, f'/api/drivers/{driver.id}/', {'phone_number': '911111111'}, 'put'))
+
+    def test_delete(self):
+        self.assertStableQueries(3, seed_drivers, lambda driver: self.client.delete(f'/api/drivers/{driver.id}/'))
+
+
+@override_settings(QUERY_BUDGET_ENFORCED=True)
+class StreamingQueryBudgetTests(TestCase):
+    def test_streamed_list_within_budget(self):
+        seed_orders(STREAM_CHUNK_SIZE * 2)
+        response = self.client.get('/api/orders/?stream=true')
+        self.assertEqual(len(json.loads(b''.join(response.streaming_content))['orders']), STREAM_CHUNK_SIZE * 2)
+
+    def test_chunk_over_budget(self):
+        # Un bloque que consulta una vez por fila excede el presupuesto aunque la vista ya haya devuelto
+        seed_orders(5)
+        body = (','.join(order.user.email for order in Order.objects.all()) for _ in range(1))
+        chunks = budgeted_chunks(body, 'orders', 3)
+        with self.assertRaises(QueryBudgetExceeded):
+            list(chunks)
+
+
+class CollectionStampTests(TestCase):
+    def test_list_not_modified(self):
+        seed_vehicles(3)
+        etag = self.client.get('/api/vehicles/')['ETag']
+        # El sello de la lista es una sola consulta (vehículos y conductores en un UNION ALL)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/vehicles/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Vehicle.objects.create(license_plate='ZZ-99', vehicle_type='Camioneta')
+        response = self.client.get('/api/vehicles/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_changes_on_delete(self):
+        seed_vehicles(3)
+        etag = self.client.get('/api/vehicles/')['ETag']
+        # Borrar la fila más antigua no cambia el último updated_at, pero sí la cantidad
+        Vehicle.objects.order_by('id').first().delete()
+        self.assertEqual(self.client.get('/api/vehicles/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_order_changes_with_items_and_products(self):
+        order = seed_orders(1)
+        url = f'/api/orders/{order.id}/'
+
+        def changed(etag):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            return response.status_code == 200, response['ETag']
+
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(changed(etag), (False, etag))
+
+        product = Product.objects.get(pk=order.items.first().product_id)
+        product.name = 'Manzana verde'
+        product.save()
+        is_changed, etag = changed(etag)
+        self.assertTrue(is_changed)
+
+        OrderItem.objects.filter(order=order).update(quantity=5)
+        is_changed, etag = changed(etag)
+        self.assertTrue(is_changed)
+
+        order.items.last().delete()
+        is_changed, etag = changed(etag)
+        self.assertTrue(is_changed)
+
+        get_user_model().objects.filter(pk=order.user_id).update(email='otro@example.com')
+        self.assertTrue(changed(etag)[0])
+
+
+class OrderStockTests(TestCase):
+    def setUp(self):
+        self.apple, self.pear = seed_products(2)
+        Product.objects.filter(pk=self.apple).update(stock=5)
+        Product.objects.filter(pk=self.pear).update(stock=2)
+        self.user = customer()
+
+    def stocks(self):
+        return list(Product.objects.order_by('id').values_list('stock', flat=True))
+
+    def test_duplicate_lines_are_summed(self):
+        # Cada línea cabe por separado (3 <= 5), pero juntas piden 6
+        with self.assertRaises(InsufficientStock):
+            Order.objects.create_with_items(self.user, [(self.apple, 3), (self.apple, 3)])
+        self.assertEqual(self.stocks(), [5, 2])
+
+        order = Order.objects.create_with_items(self.user, [(self.apple, 2), (self.apple, 3)])
+        self.assertEqual(self.stocks(), [0, 2])
+        self.assertEqual(sorted(order.items.values_list('quantity', flat=True)), [2, 3])
+
+    def test_post_oversell_rolls_back(self):
+        response = post_json(self.client, '/api/orders/', {
+            'user_email': self.user.email,
+            'items': [{'product_id': self.apple, 'quantity': 1}, {'product_id': self.pear, 'quantity': 3}],
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['status'], 'error')
+        self.assertEqual(self.stocks(), [5, 2])
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderItem.objects.exists())
+
+
+class IdempotencyTests(TestCase):
+    def setUp(self):
+        self.products = seed_products(2)
+        self.body = {'user_email': customer().email, 'items': [{'product_id': self.products[0], 'quantity': 1}]}
+
+    def post(self, body=None, key='pedido-1'):
+        return self.client.post('/api/orders/', json.dumps(body or self.body), content_type='application/json',
+                                HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_replay(self):
+        first = self.post()
+        with self.assertNumQueries(1):
+            second = self.post()
+        self.assertEqual(second.status_code, first.status_code)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_other_body(self):
+        self.post()
+        body = {**self.body, 'items': [{'product_id': self.products[1], 'quantity': 1}]}
+        self.assertEqual(self.post(body).status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_in_flight(self):
+        self.post()
+        # La solicitud original todavía no guardó su respuesta
+        IdempotencyKey.objects.update(status_code=None, body=b'')
+        self.assertEqual(self.post().status_code, 409)
+
+    def test_server_error_not_stored(self):
+        self.client.raise_request_exception = False
+        with mock.patch.object(Order.objects, 'create_with_items', side_effect=DatabaseError):
+            self.assertEqual(self.post().status_code, 500)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self.post().status_code, 200)
+        self.assertEqual(Order.objects.count(), 1)
+
+    @override_settings(IDEMPOTENCY_KEY_TTL=60)
+    def test_expired_key(self):
+        self.post()
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(seconds=61))
+        response = self.post()
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_scoped_by_user(self):
+        User = get_user_model()
+        for email in ('uno@example.com', 'dos@example.com'):
+            self.client.force_login(User.objects.create(email=email, first_name='A', last_name='B'))
+            response = self.post()
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(Order.objects.count(), 2)
+        self.assertEqual(self.post()['Idempotent-Replayed'], 'true')
+
+
+class DispatchTests(TestCase):
+    def test_best_fit(self):
+        # Cada orden va al vehículo con menos capacidad libre donde cabe
+        assignments, unassigned = plan_dispatch([(1, 8), (2, 15), (3, 5)], [(10, 20), (11, 10), (12, 200)])
+        self.assertEqual(assignments, {10: [2, 3], 11: [1]})
+        self.assertEqual(unassigned, [])
+
+    def test_capacity_overflow(self):
+        assignments, unassigned = plan_dispatch([(1, 6), (2, 6), (3, 6)], [(10, 10), (11, 7)])
+        self.assertEqual(assignments, {11: [1], 10: [2]})
+        self.assertEqual(unassigned, [3])
+
+    def test_oversized_orders(self):
+        assignments, unassigned = plan_dispatch([(1, 300), (2, 5)], [(10, 200), (11, 0)])
+        self.assertEqual(assignments, {10: [2]})
+        self.assertEqual(unassigned, [1])
+
+    def test_invalid_body(self):
+        for body in ([1], 'x', 3):
+            with self.subTest(body=body):
+                self.assertEqual(post_json(self.client, '/api/orders/dispatch/', body).status_code, 400)
+
+    def test_reports_applied_orders(self):
+        seed_orders(3)
+        Order.objects.update(vehicle=None)
+        taken, *pending = Order.objects.order_by('id')
+        other = Vehicle.objects.create(license_plate='ZZ-99', vehicle_type='Moto')
+
+        def plan_then_take(orders, vehicles):
+            # Otra solicitud asigna una de las órdenes entre el plan y el UPDATE
+            Order.objects.filter(pk=taken.pk).update(vehicle=other)
+            return plan_dispatch(orders, vehicles)
+
+        with mock.patch('orders.dispatch.plan_dispatch', side_effect=plan_then_take):
+            report = post_json(self.client, '/api/orders/dispatch/', {}).json()['data']
+        self.assertEqual(report['assigned'], 2)
+        self.assertEqual([vehicle['orders'] for vehicle in report['vehicles']], [[order.pk for order in pending]])
+        self.assertEqual(report['vehicles'][0]['load'], 6)
+
+
+class RoutingTests(TestCase):
+    def test_two_opt_shortens_route(self):
+        # Sobre el ecuador las distancias son proporcionales a la longitud: el vecino
+        # más cercano va a 0.01, vuelve a -0.02 y cruza hasta 0.05
+        stops = [(1, 0.0, 0.01), (2, 0.0, -0.02), (3, 0.0, 0.05)]
+        matrix = distance_matrix([(0.0, 0.0)] + [(lat, lon) for order_id, lat, lon in stops])
+        self.assertEqual(nearest_neighbour(matrix), [0, 1, 2, 3])
+
+        route = plan_route(stops, start=(0.0, 0.0))
+        self.assertEqual([stop['order'] for stop in route['stops']], [2, 1, 3])
+        self.assertAlmostEqual(route['total_distance_km'], EARTH_RADIUS_KM * radians(0.09), places=2)
+
+
+class MetricsTests(TestCase):
+    labels = (('view', 'orders'), ('method', 'GET'))
+
+    def observed(self):
+        counts, total = registry.db_queries.series.get(self.labels, ([0], 0))
+        serialize_counts, serialize_total = registry.serialize.series.get(self.labels, ([0], 0))
+        return sum(counts), total, serialize_total
+
+    def test_streamed_body_observed_on_close(self):
+        seed_orders(STREAM_CHUNK_SIZE + 1)
+        count, queries, serialize = self.observed()
+        response = self.client.get('/api/orders/?stream=true')
+        self.assertEqual(self.observed()[0], count)
+
+        b''.join(response.streaming_content)
+        response.close()
+        response.close()
+        # Dos bloques con sus prefetch: las consultas del cuerpo cuentan en el mismo request
+        new_count, new_queries, new_serialize = self.observed()
+        self.assertEqual(new_count, count + 1)
+        self.assertGreaterEqual(new_queries - queries, 4)
+        self.assertGreater(new_serialize, serialize)
+
+    def test_json_encoding_is_serialization(self):
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        try:
+            JsonResponse({'orders': list(range(1000))})
+        finally:
+            current_stats.reset(token)
+        self.assertGreater(stats.serialize, 0)
+
+
+class OrderFilterTests(TestCase):
+    def test_impossible_dates(self):
+        for query in ('created_from=2024-13-45', 'created_to=2024-02-30', 'created_to=9999-12-31', 'created_from=ayer'):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f'/api/orders/?{query}').status_code, 400)
+
+    def test_impossible_cursor_date(self):
+        cursor = encode_cursor(['Pendiente', '2024-02-30T10:00:00', 1])
+        self.assertEqual(self.client.get(f'/api/orders/?cursor={cursor}').status_code, 400)
+
+
+class OrderPaginationTests(TestCase):
+    def test_walk_pages(self):
+        seed_orders(10)
+        # Todas con la misma fecha: el orden entre ellas lo decide el id
+        Order.objects.update(created_at=timezone.now())
+        Order.objects.filter(id__in=Order.objects.order_by('id').values('id')[:4]).update(status='Enviado')
+        expected = list(Order.objects.order_by('-status', '-created_at', '-id').values_list('id', flat=True))
+
+        for limit in (1, 3, 10, 11):
+            with self.subTest(limit=limit):
+                self.assertEqual(walk_pages(self.client, f'/api/orders/?limit={limit}', 'orders'), expected)
+        pending = [order_id for order_id in expected if Order.objects.get(id=order_id).status == 'Pendiente']
+        self.assertEqual(walk_pages(self.client, '/api/orders/?limit=4&status=Pendiente', 'orders'), pending)
+
+    def test_malformed_cursor(self):
+        for cursor in ('no-es-un-cursor', encode_cursor({'status': 'Pendiente'}), encode_cursor(['Pendiente', 1]),
+                       encode_cursor([1, '2024-01-01T10:00:00', 1]), encode_cursor(['Pendiente', '2024-01-01T10:00:00', 'x'])):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(f'/api/orders/?cursor={cursor}')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()['status'], 'error')
+
+
+class ExpandTests(TestCase):
+    def setUp(self):
+        self.order = seed_orders(1)
+        self.vehicle = self.order.vehicle
+        self.item = self.order.items.order_by('id').first()
+
+    def get(self, path):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_ids_unless_expanded(self):
+        # Con ?expand= las relaciones que no se piden vuelven como id
+        order = self.get(f'/api/orders/{self.order.id}/?expand=items')['order']
+        self.assertEqual(order['user'], self.order.user_id)
+        self.assertEqual(order['vehicle'], self.vehicle.id)
+        self.assertEqual(order['items'][0]['product'], self.item.product_id)
+
+        order = self.get(f'/api/orders/{self.order.id}/?expand=user')['order']
+        self.assertNotIn('items', order)
+
+        vehicle = self.get('/api/vehicles/?expand=driver')['vehicles'][0]
+        self.assertEqual(vehicle['driver']['user'], self.vehicle.driver.user_id)
+
+    def test_nested_when_expanded(self):
+        order = self.get(f'/api/orders/?ids={self.order.id}&expand=user,vehicle.driver.user,items.product')['orders'][0]
+        self.assertEqual(order['user'], self.order.user.email)
+        self.assertEqual(order['vehicle']['license_plate'], self.vehicle.license_plate)
+        self.assertEqual(order['vehicle']['driver']['user']['email'], self.vehicle.driver.user.email)
+        self.assertEqual(order['items'][0]['product'], self.item.product.name)
+
+        # Expandir una ruta anidada expande sus padres, pero no las ramas hermanas
+        order = self.get(f'/api/orders/{self.order.id}/?expand=vehicle.driver')['order']
+        self.assertEqual(order['vehicle']['driver']['license_number'], self.vehicle.driver.license_number)
+        self.assertEqual(order['vehicle']['driver']['user'], self.vehicle.driver.user_id)
+        self.assertEqual(order['user'], self.order.user_id)
+
+        item = self.get(f'/api/orders/{self.order.id}/items/?expand=product')['data'][0]
+        self.assertEqual(item['product'], self.item.product.name)
+
+    def test_full_without_expand(self):
+        order = self.get(f'/api/orders/{self.order.id}/')['order']
+        self.assertEqual(order['user'], self.order.user.email)
+        self.assertEqual(order['vehicle']['driver']['user']['email'], self.vehicle.driver.user.email)
+        self.assertEqual(order['items'][0]['product'], self.item.product.name)
+
+    def test_unknown_expansion(self):
+        for path in (
+            '/api/orders/?expand=vehiculo',
+            f'/api/orders/{self.order.id}/?expand=items.precio',
+            f'/api/orders/{self.order.id}/items/?expand=order',
+            '/api/vehicles/?expand=driver.auto',
+            f'/api/vehicles/{self.vehicle.id}/?expand=orders',
+            '/api/drivers/?expand=vehicle',
+        ):
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()['status'], 'error')
+
+
+class OrderAsyncViewTests(AsyncParityTestCase):
+    def test_same_responses(self):
+        order = seed_orders(5)
+        seed_vehicles(3)
+        first_page = self.client.get('/api/orders/?limit=2').json()
+        for path in (
+            '/api/orders/?limit=2',
+            f'/api/orders/?limit=2&cursor={first_page["next_cursor"]}',
+            '/api/orders/?status=Pendiente&expand=items.product,vehicle',
+            f'/api/orders/?ids={order.id + 1},{order.id},999999&expand=user',
+            '/api/orders/?stream=true',
+            '/api/orders/?cursor=no-es-un-cursor',
+            '/api/orders/?status=Perdida',
+            '/api/orders/?expand=vehiculo',
+            '/api/vehicles/',
+            '/api/vehicles/?expand=driver.user',
+            '/api/vehicles/?stream=true',
+            '/api/drivers/?expand=user',
+            '/api/drivers/?expand=auto',
+        ):
+            with self.subTest(path=path):
+                self.assertSameResponse(path)
 
-# Create your tests here.
@@ -3,10 +3,12 @@ from . import views
 
 urlpatterns = [
     path('api/orders/', views.orders, name='orders'), 
+    path('api/orders/dispatch/', views.dispatch_orders, name='dispatch_orders'),
     path('api/orders/<int:order_id>/', views.order_detail, name='order_detail'),
     path('api/orders/<int:order_id>/items/', views.order_items, name='order_items'),  
     path('api/vehicles/', views.vehicles, name='vehicles'),
     path('api/vehicles/<int:vehicle_id>/', views.vehicle_detail, name='vehicle_detail'),
+    path('api/vehicles/<int:vehicle_id>/route/', views.vehicle_route, name='vehicle_route'),
     path('api/drivers/', views.drivers, name='drivers'),
     path('api/drivers/<int:driver_id>/', views.driver_detail, name='driver_detail'),
 ]
@@ -1,66 +1,203 @@
 from django.shortcuts import get_object_or_404
-from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from .models import Driver, Order, OrderItem, Vehicle, Product
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, time, timedelta
+from main.pagination import InvalidQueryParam, get_cursor, get_ids, get_limit, multi_get, paginate
+from main.conditional import collection_stamp, conditional, object_stamp
+from main.metrics import JsonResponse
+from main.streaming import stream_json, wants_stream
+from products.managers import InsufficientStock
+from .dispatch import dispatch_pending
+from .idempotency import idempotent
+from .routing import plan_route
+from .serializers import (
+    get_expand,
+    query_budget,
+    serialize_driver,
+    serialize_order,
+    serialize_order_item,
+    serialize_vehicle,
+)
 import json
 
-# Serializadores
-def serialize_order(order):
-    return {
-        'id': order.id,
-        'user': order.user.email,
-        'status': order.status,
-        'total_price': float(order.total_price),
-        'vehicle': serialize_vehicle(order.vehicle) if order.vehicle else None,   
-        'created_at': order.created_at.date().isoformat(),
-        'updated_at': order.updated_at.date().isoformat(),
-        'items': [serialize_order_item(item) for item in order.items.all()],
-    }
-
-def serialize_order_item(order_item):
-    return {
-        'id': order_item.id,
-        'product': order_item.product.name,
-        'quantity': order_item.quantity,
-        'price': float(order_item.price),
-        'total_price': float(order_item.get_total_price()),
-    }
-
-def serialize_vehicle(vehicle):
-    return {
-        'id': vehicle.id,
-        'license_plate': vehicle.license_plate,
-        'vehicle_type': vehicle.vehicle_type,
-        'model': vehicle.model,
-        'driver': serialize_driver(vehicle.driver) if vehicle.driver else None,
-    }
-    
-def serialize_driver(driver):
-    return {
-        'id': driver.id,
-        'user': { 
-            'email': driver.user.email,
-            'first_name': driver.user.first_name,
-            'last_name': driver.user.last_name,
-            },
-        'phone_number': driver.phone_number,
-        'license_number': driver.license_number,
-    }
+# Valida cantidades e ids recibidos en el JSON (enteros positivos)
+def is_positive_integer(quantity):
+    return isinstance(quantity, int) and not isinstance(quantity, bool) and quantity > 0
+
+
+# Lee las coordenadas de entrega opcionales (latitude y longitude, ambas o ninguna).
+# Devuelve None si no vienen y lanza ValueError si no son válidas
+def parse_location(data):
+    latitude, longitude = data.get('latitude'), data.get('longitude')
+    if latitude is None and longitude is None:
+        return None
+    for value in (latitude, longitude):
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            raise ValueError('Las coordenadas de entrega no son válidas')
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError('Las coordenadas de entrega no son válidas')
+    return {'delivery_latitude': float(latitude), 'delivery_longitude': float(longitude)}
+
+
+# Sellos de versión para responder 304 a If-None-Match / If-Modified-Since.
+# Incluyen las relaciones que se serializan anidadas (vehículo, conductor, productos)
+def orders_stamp(request):
+    return collection_stamp(Order.objects.all(), Vehicle.objects.all(), Driver.objects.all(), Product.objects.all())
+
+# Los ítems no tienen updated_at: se usan su cantidad, la suma de unidades y el último
+# cambio de sus productos (el nombre se serializa). El usuario se incluye por su email
+def order_stamp(request, order_id):
+    return object_stamp(
+        Order.objects, order_id, 'vehicle__updated_at', 'vehicle__driver__updated_at', 'user__email',
+        items_latest=Max('items__product__updated_at'), items_total=Count('items'), items_quantity=Sum('items__quantity'),
+    )
+
+def vehicles_stamp(request):
+    return collection_stamp(Vehicle.objects.all(), Driver.objects.all())
+
+def vehicle_stamp(request, vehicle_id):
+    return object_stamp(Vehicle.objects, vehicle_id, 'driver__updated_at')
+
+def drivers_stamp(request):
+    return collection_stamp(Driver.objects.all())
+
+def driver_stamp(request, driver_id):
+    return object_stamp(Driver.objects, driver_id)
+
+# La ruta de un vehículo solo depende de sus órdenes
+def route_stamp(request, vehicle_id):
+    return collection_stamp(Order.objects.filter(vehicle_id=vehicle_id))
+
+
+# Convierte un parámetro YYYY-MM-DD en el inicio de ese día (con zona horaria)
+def parse_day(value, name):
+    try:
+        # parse_date lanza ValueError con fechas bien formadas pero imposibles (2024-02-30)
+        day = parse_date(value) if value else None
+    except ValueError:
+        day = None
+    if day is None:
+        raise InvalidQueryParam(f'El parámetro {name} debe tener el formato AAAA-MM-DD')
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+# Filtros de la lista de órdenes; cada uno tiene un índice compuesto que termina en (status, created_at, id)
+def filter_orders(request, orders):
+    params = request.GET
+
+    status = params.get('status')
+    if status:
+        if status not in dict(Order.STATUS_CHOICES):
+            raise InvalidQueryParam('El estado no es válido')
+        orders = orders.filter(status=status)
+
+    if params.get('created_from'):
+        orders = orders.filter(created_at__gte=parse_day(params['created_from'], 'created_from'))
+    if params.get('created_to'):
+        # created_to es inclusivo: se compara contra el inicio del día siguiente
+        created_to = parse_day(params['created_to'], 'created_to')
+        try:
+            orders = orders.filter(created_at__lt=created_to + timedelta(days=1))
+        except OverflowError:
+            raise InvalidQueryParam('El parámetro created_to está fuera de rango')
+
+    user_email = params.get('user_email')
+    if user_email:
+        orders = orders.filter(user__email=user_email)
+
+    vehicle_id = params.get('vehicle')
+    if vehicle_id:
+        if not vehicle_id.isdigit():
+            raise InvalidQueryParam('El parámetro vehicle debe ser un id numérico')
+        orders = orders.filter(vehicle_id=int(vehicle_id))
+
+    return orders
+
+
+# Aplica el cursor (status, created_at, id) para el orden descendente de la lista
+def orders_after(orders, cursor):
+    status, created_at, order_id = cursor
+    try:
+        created_at = parse_datetime(created_at) if isinstance(created_at, str) else None
+    except ValueError:
+        raise InvalidQueryParam('El cursor no es válido')
+    if not isinstance(status, str) or created_at is None or not isinstance(order_id, int):
+        raise InvalidQueryParam('El cursor no es válido')
+    return orders.filter(
+        Q(status__lt=status)
+        | Q(status=status, created_at__lt=created_at)
+        | Q(status=status, created_at=created_at, id__lt=order_id)
+    )
+
+
+def order_cursor(order):
+    return [order.status, order.created_at.isoformat(), order.id]
+
+
+# Los GET de las listas leen sus parámetros con estas funciones, que comparten con async_views.py.
+# Lanzan InvalidQueryParam si algún parámetro no es válido
+def order_list(request):
+    """
+    Lee limit, cursor, stream, expand, ids y los filtros de la lista de órdenes.
+    Devuelve ``(orders, ids, expand, limit, stream)`` con las relaciones de
+    ``expand`` precargadas: con ``?ids=`` el queryset no se filtra (la vista
+    busca esos ids); si no, viene filtrado, acotado por el cursor y ordenado
+    por (status, created_at, id) descendente.
+    """
+    limit = get_limit(request)
+    cursor = get_cursor(request, 3)
+    stream = wants_stream(request)
+    expand = get_expand(request, serialize_order)
+    ids = get_ids(request)
+    orders = Order.objects.all()
+    if ids is None:
+        orders = filter_orders(request, orders)
+        if cursor:
+            orders = orders_after(orders, cursor)
+        orders = orders.order_by('-status', '-created_at', '-id')
+    return serialize_order.prepare(orders, expand), ids, expand, limit, stream
+
+
+def vehicle_list(request):
+    expand = get_expand(request, serialize_vehicle)
+    return serialize_vehicle.prepare(Vehicle.objects.all(), expand).order_by('-id'), expand
+
+
+def driver_list(request):
+    expand = get_expand(request, serialize_driver)
+    return serialize_driver.prepare(Driver.objects.all(), expand).order_by('id'), expand
 
 
 # GET y POST para la lista de órdenes
 @csrf_exempt
 @require_http_methods(["GET", "POST"])
+@idempotent
+@conditional(orders_stamp)
+@query_budget(3)
 def orders(request):
     User = get_user_model()
 
     if request.method == 'GET':
-        # Ordenar según estado y fecha de creación
-        orders = Order.objects.select_related('user').prefetch_related('items__product').all().order_by('-status', '-created_at')
-        # orders = Order.objects.select_related('user').prefetch_related('items__product').all().order_by('-id')
-        return JsonResponse({'orders': [serialize_order(order) for order in orders]})
+        # Ordenar según estado y fecha de creación, paginando por cursor sobre (status, created_at, id)
+        try:
+            orders, ids, expand, limit, stream = order_list(request)
+        except InvalidQueryParam as error:
+            return JsonResponse({'status': 'error', 'message': str(error)}, status=400)
+
+        if ids is not None:
+            # Multi-get (?ids=1,2,3): las órdenes pedidas con sus relaciones precargadas, informando los ids inexistentes
+            return JsonResponse(multi_get('orders', ids, orders.in_bulk(ids), lambda order: serialize_order(order, expand)))
+        # En modo streaming se envía toda la lista filtrada, sin límite de página
+        if stream:
+            return stream_json('orders', orders, lambda order: serialize_order(order, expand))
+        orders, next_cursor = paginate(orders, limit, order_cursor)
+        return JsonResponse({'orders': [serialize_order(order, expand) for order in orders], 'next_cursor': next_cursor})
 
     if request.method == 'POST':
         try:
@@ -92,37 +229,69 @@ def orders(request):
                     return JsonResponse({'status': 'error', 'message': 'El vehículo no existe'}, status=400)
             
 
-            # Crear la orden
-            order = Order.objects.create(user=user, vehicle=vehicle)
-            for item_data in items_data:
-                product = get_object_or_404(Product, id=item_data['product_id'])
-                if product.stock < item_data['quantity']:
-                    return JsonResponse({'status': 'error', 'message': f'Stock insuficiente para {product.name}'}, status=400)
-
-                OrderItem.objects.create(
-                    order=order,
-                    product=product,
-                    quantity=item_data['quantity'],
-                    price=product.price
+            if not all(is_positive_integer(item_data['quantity']) for item_data in items_data):
+                return JsonResponse({'status': 'error', 'message': 'La cantidad debe ser un número entero positivo'}, status=400)
+            if not all(is_positive_integer(item_data['product_id']) for item_data in items_data):
+                return JsonResponse({'status': 'error', 'message': 'Datos inválidos'}, status=400)
+
+            try:
+                location = parse_location(data) or {}
+            except ValueError as error:
+                return JsonResponse({'status': 'error', 'message': str(error)}, status=400)
+
+            # Crear la orden con todas sus líneas en una sola transacción y un número
+            # constante de consultas: si alguna línea no tiene stock se revierte la orden completa
+            try:
+                order = Order.objects.create_with_items(
+                    user=user,
+                    vehicle=vehicle,
+                    items=[(item_data['product_id'], item_data['quantity']) for item_data in items_data],
+                    **location,
                 )
-                product.stock -= item_data['quantity']
-                product.save()
+            except Product.DoesNotExist as error:
+                return JsonResponse({'status': 'error', 'message': str(error)}, status=404)
+            except InsufficientStock as error:
+                return JsonResponse({'status': 'error', 'message': str(error)}, status=400)
 
-            order.calculate_total_price()
+            order = serialize_order.prepare(Order.objects).get(id=order.id)
             return JsonResponse({'status': 'success', 'message':'Venta creada correctamente.'  ,'data': serialize_order(order)})
 
         except (json.JSONDecodeError, KeyError):
             return JsonResponse({'status': 'error', 'message': 'Datos inválidos'}, status=400)
 
+# POST para asignar en lote las órdenes pendientes sin vehículo a los vehículos con conductor.
+# Con {"dry_run": true} solo devuelve el plan sin aplicarlo
+@csrf_exempt
+@require_http_methods(["POST"])
+def dispatch_orders(request):
+    try:
+        data = json.loads(request.body) if request.body else {}
+    except json.JSONDecodeError:
+        return JsonResponse({'status': 'error', 'message': 'Datos inválidos'}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({'status': 'error', 'message': 'Datos inválidos'}, status=400)
+    dry_run = data.get('dry_run', False)
+    if not isinstance(dry_run, bool):
+        return JsonResponse({'status': 'error', 'message': 'El campo dry_run debe ser true o false'}, status=400)
+
+    report = dispatch_pending(dry_run=dry_run)
+    return JsonResponse({'status': 'success', 'message': 'Despacho calculado' if dry_run else 'Despacho aplicado', 'data': report})
+
 # GET, PUT y DELETE para una orden específica
 @csrf_exempt
 @require_http_methods(["GET", "PUT", "DELETE"])
+@conditional(order_stamp)
+@query_budget(3)
 def order_detail(request, order_id):
-    order = get_object_or_404(Order, id=order_id)
+    try:
+        expand = get_expand(request, serialize_order) if request.method == 'GET' else None
+    except InvalidQueryParam as error:
+        return JsonResponse({'status': 'error', 'message': str(error)}, status=400)
+    order = get_object_or_404(serialize_order.prepare(Order.objects, expand), id=order_id)
 
     # GET para obtener una orden específica
     if request.method == 'GET':
-        return JsonResponse({'order': serialize_order(order)})
+        return JsonResponse({'order': serialize_order(order, expand)})
 
     # PUT para actualizar una orden
     elif request.method == 'PUT':
@@ -134,8 +303,16 @@ def order_detail(request, order_id):
             if vehicle_id is None or vehicle_id == "null":
                 order.vehicle = None
             else:
-                vehicle = get_object_or_404(Vehicle, id=vehicle_id)
+                vehicle = get_object_or_404(serialize_vehicle.prepare(Vehicle.objects), id=vehicle_id)
                 order.vehicle = vehicle
+
+            try:
+                location = parse_location(data)
+            except ValueError as error:
+                return JsonResponse({'status': 'error', 'message': str(error)}, status=400)
+            if location:
+                order.delivery_latitude = location['delivery_latitude']
+                order.delivery_longitude = location['delivery_longitude']
             
             order.save()
             return JsonResponse({
@@ -157,29 +334,37 @@ def order_detail(request, order_id):
 # GET y POST para los ítems de una orden
 @csrf_exempt
 @require_http_methods(["GET", "POST"])
+@idempotent
+@query_budget(2)
 def order_items(request, order_id):
     order = get_object_or_404(Order, id=order_id)
 
     if request.method == 'GET':
-        items = [serialize_order_item(item) for item in order.items.all()]
+        try:
+            expand = get_expand(request, serialize_order_item)
+        except InvalidQueryParam as error:
+            return JsonResponse({'status': 'error', 'message': str(error)}, status=400)
+        items = [serialize_order_item(item, expand) for item in serialize_order_item.prepare(order.items.all(), expand)]
         return JsonResponse({'status': 'success', 'data': items})
 
     if request.method == 'POST':
         try:
             data = json.loads(request.body)
+            if not is_positive_integer(data['quantity']):
+                return JsonResponse({'status': 'error', 'message': 'La cantidad debe ser un número entero positivo'}, status=400)
+
             product = get_object_or_404(Product, id=data['product_id'])
-            if product.stock < data['quantity']:
-                return JsonResponse({'status': 'error', 'message': f'Stock insuficiente para {product.name}'}, status=400)
-
-            order_item = OrderItem.objects.create(
-                order=order,
-                product=product,
-                quantity=data['quantity'],
-                price=product.price
-            )
-            product.stock -= data['quantity']
-            product.save()
-            order.calculate_total_price()
+            try:
+                with transaction.atomic():
+                    Product.objects.reserve_stock(product, data['quantity'])
+                    order_item = OrderItem.objects.create(
+                        order=order,
+                        product=product,
+                        quantity=data['quantity'],
+                        price=product.price
+                    )
+            except InsufficientStock as error:
+                return JsonResponse({'status': 'error', 'message': str(error)}, status=400)
 
             return JsonResponse({'status': 'success', 'data': serialize_order_item(order_item)})
         except (json.JSONDecodeError, KeyError):
@@ -189,12 +374,19 @@ def order_items(request, order_id):
 # GET y POST para los vehículos
 @csrf_exempt
 @require_http_methods(["GET", "POST"])
+@conditional(vehicles_stamp)
+@query_budget(1)
 def vehicles(request):
 
     if request.method == 'GET':
         # Ordenar por id de creación
-        vehicles = Vehicle.objects.all().order_by('-id')
-        return JsonResponse({'vehicles': [serialize_vehicle(vehicle) for vehicle in vehicles]})
+        try:
+            vehicles, expand = vehicle_list(request)
+            if wants_stream(request):
+                return stream_json('vehicles', vehicles, lambda vehicle: serialize_vehicle(vehicle, expand))
+        except InvalidQueryParam as error:
+            return JsonResponse({'status': 'error', 'message': str(error)}, status=400)
+        return JsonResponse({'vehicles': [serialize_vehicle(vehicle, expand) for vehicle in vehicles]})
     
     elif request.method == 'POST':
         
@@ -221,12 +413,18 @@ def vehicles(request):
 # GET, PUT y DELETE para un vehículo específico
 @csrf_exempt
 @require_http_methods(["GET", "PUT", "DELETE"])
+@conditional(vehicle_stamp)
+@query_budget(1)
 def vehicle_detail(request, vehicle_id):
-    vehicle = get_object_or_404(Vehicle, id=vehicle_id) 
+    try:
+        expand = get_expand(request, serialize_vehicle) if request.method == 'GET' else None
+    except InvalidQueryParam as error:
+        return JsonResponse({'status': 'error', 'message': str(error)}, status=400)
+    vehicle = get_object_or_404(serialize_vehicle.prepare(Vehicle.objects, expand), id=vehicle_id)
     
     # GET para obtener un vehículo específico
     if request.method == 'GET':
-        return JsonResponse({'vehicle': serialize_vehicle(vehicle)})
+        return JsonResponse({'vehicle': serialize_vehicle(vehicle, expand)})
 
     # PUT para actualizar un vehículo
     elif request.method == 'PUT':
@@ -242,7 +440,7 @@ def vehicle_detail(request, vehicle_id):
             if driver_id is None or driver_id == "null":
                 vehicle.driver = None
             else:
-                driver = get_object_or_404(Driver, id=driver_id)
+                driver = get_object_or_404(serialize_driver.prepare(Driver.objects), id=driver_id)
                 vehicle.driver = driver
                 
             vehicle.license_plate = new_license_plate
@@ -267,14 +465,40 @@ def vehicle_detail(request, vehicle_id):
         return JsonResponse({'status': 'success', 'message': 'Vehículo eliminado correctamente'})
     
 
+# GET para la secuencia de paradas de un vehículo: sus órdenes pendientes o enviadas con
+# coordenadas, ordenadas con vecino más cercano + 2-opt desde el depósito
+@require_http_methods(["GET"])
+@conditional(route_stamp)
+@query_budget(2)
+def vehicle_route(request, vehicle_id):
+    vehicle = get_object_or_404(Vehicle.objects.only('id'), id=vehicle_id)
+    stops = []
+    unlocated = []
+    orders = Order.objects.filter(vehicle=vehicle, status__in=['Pendiente', 'Enviado']).order_by('id')
+    for order_id, latitude, longitude in orders.values_list('id', 'delivery_latitude', 'delivery_longitude'):
+        if latitude is None or longitude is None:
+            unlocated.append(order_id)
+        else:
+            stops.append((order_id, latitude, longitude))
+
+    route = plan_route(stops)
+    return JsonResponse({'vehicle': vehicle.id, **route, 'unlocated': unlocated})
+
 # GET y POST para los conductores
 @csrf_exempt
 @require_http_methods(["GET", "POST"])
+@conditional(drivers_stamp)
+@query_budget(1)
 def drivers(request):
 
     if request.method == 'GET':
-        drivers = Driver.objects.all().order_by('id')
-        return JsonResponse({'drivers': [serialize_driver(driver) for driver in drivers]})
+        try:
+            drivers, expand = driver_list(request)
+            if wants_stream(request):
+                return stream_json('drivers', drivers, lambda driver: serialize_driver(driver, expand))
+        except InvalidQueryParam as error:
+            return JsonResponse({'status': 'error', 'message': str(error)}, status=400)
+        return JsonResponse({'drivers': [serialize_driver(driver, expand) for driver in drivers]})
 
     if request.method == 'POST':
         try:
@@ -306,12 +530,18 @@ def drivers(request):
 # GET, PUT y DELETE para un conductor específico
 @csrf_exempt
 @require_http_methods(["GET", "PUT", "DELETE"])
+@conditional(driver_stamp)
+@query_budget(1)
 def driver_detail(request, driver_id):
-    driver = get_object_or_404(Driver, id=driver_id) 
+    try:
+        expand = get_expand(request, serialize_driver) if request.method == 'GET' else None
+    except InvalidQueryParam as error:
+        return JsonResponse({'status': 'error', 'message': str(error)}, status=400)
+    driver = get_object_or_404(serialize_driver.prepare(Driver.objects, expand), id=driver_id)
     
     # GET para obtener un conductor específico
     if request.method == 'GET':
-        return JsonResponse({'driver': serialize_driver(driver)})
+        return JsonResponse({'driver': serialize_driver(driver, expand)})
 
    # PUT para actualizar un conductor
     elif request.method == 'PUT':
@@ -0,0 +1,64 @@
+from asgiref.sync import sync_to_async
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from main.conditional import acollection_stamp, async_conditional
+from main.metrics import JsonResponse
+from main.pagination import InvalidQueryParam, apaginate, multi_get
+from main.streaming import astream_json, wants_stream
+from .cache import cache_catalogue
+from .models import Category, Product
+from . import views
+from .views import category_list, product_cursor, product_list, serialize_category, serialize_product
+
+
+# Vistas de lectura para el perfil ASGI (main.settings_asgi). Los GET usan el ORM
+# asíncrono con la misma lectura de parámetros y serializadores que views.py; los POST se
+# delegan a las vistas síncronas.
+
+async def products_stamp(request):
+    return await acollection_stamp(Product.objects.all(), Category.objects.all())
+
+async def categories_stamp(request):
+    return await acollection_stamp(Category.objects.all())
+
+
+# GET y POST para la lista de categorías
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+@async_conditional(categories_stamp)
+@cache_catalogue
+async def categories(request):
+    if request.method == 'POST':
+        return await sync_to_async(views.categories)(request)
+
+    try:
+        categories, fields = category_list(request)
+        if wants_stream(request):
+            return astream_json('categories', categories, lambda category: serialize_category(category, fields))
+    except InvalidQueryParam as error:
+        return JsonResponse({'status': 'error', 'message': str(error)}, status=400)
+    categories_data = [serialize_category(category, fields) async for category in categories]
+    return JsonResponse({'categories': categories_data})
+
+# GET y POST para la lista de productos
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+@async_conditional(products_stamp)
+@cache_catalogue
+async def products(request):
+    if request.method == 'POST':
+        return await sync_to_async(views.products)(request)
+
+    try:
+        products, ids, fields, limit, stream = product_list(request)
+    except InvalidQueryParam as error:
+        return JsonResponse({'status': 'error', 'message': str(error)}, status=400)
+
+    if ids is not None:
+        return JsonResponse(multi_get('products', ids, await products.ain_bulk(ids), lambda product: serialize_product(product, fields)))
+    if stream:
+        return astream_json('products', products, lambda product: serialize_product(product, fields))
+
+    products, next_cursor = await apaginate(products, limit, product_cursor)
+    products_data = [serialize_product(product, fields) for product in products]
+    return JsonResponse({'products': products_data, 'next_cursor': next_cursor})
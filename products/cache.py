@@ -0,0 +1,127 @@
+import gzip
+import hashlib
+import time
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+
+CATALOGUE_VERSION_KEY = 'catalogue:version'
+CATALOGUE_CACHE_TIMEOUT = getattr(settings, 'CATALOGUE_CACHE_TIMEOUT', 300)
+
+
+def catalogue_version():
+    """
+    Versión actual del catálogo. Forma parte de la clave de cada snapshot, así
+    invalidar es un solo incremento y funciona igual con LocMemCache o con un
+    backend compartido. Si la clave se pierde se reinicia con un valor nuevo
+    para no reutilizar snapshots de una versión anterior.
+    """
+    version = cache.get(CATALOGUE_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOGUE_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(CATALOGUE_VERSION_KEY)
+    return version
+
+
+async def acatalogue_version():
+    version = await cache.aget(CATALOGUE_VERSION_KEY)
+    if version is None:
+        await cache.aadd(CATALOGUE_VERSION_KEY, time.time_ns(), None)
+        version = await cache.aget(CATALOGUE_VERSION_KEY)
+    return version
+
+
+def invalidate_catalogue():
+    try:
+        cache.incr(CATALOGUE_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOGUE_VERSION_KEY, time.time_ns(), None)
+
+
+def accepts_gzip(request):
+    """
+    gzip es aceptable si Accept-Encoding lo nombra (o trae ``*``) con q mayor
+    que 0; ``gzip;q=0`` lo rechaza explícitamente.
+    """
+    weights = {}
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        coding, *params = part.split(';')
+        weight = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding.strip().lower()] = weight
+    return weights.get('gzip', weights.get('*', 0.0)) > 0
+
+
+def snapshot_response(snapshot, request):
+    if accepts_gzip(request):
+        response = HttpResponse(snapshot['gzip'], content_type=snapshot['content_type'])
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(snapshot['body'], content_type=snapshot['content_type'])
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def snapshot_key(request, version):
+    path = hashlib.sha1(request.get_full_path().encode()).hexdigest()
+    return f'catalogue:{version}:{path}'
+
+
+def make_snapshot(response):
+    return {
+        'body': response.content,
+        'gzip': gzip.compress(response.content),
+        'content_type': response['Content-Type'],
+    }
+
+
+def cache_catalogue(view):
+    """
+    Guarda los bytes ya codificados (y su variante gzip) de las respuestas GET
+    del catálogo, por URL completa. Las señales de Product, Category y Supplier
+    invalidan todos los snapshots. Las respuestas en streaming no se guardan.
+    Acepta vistas síncronas y asíncronas.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or 'stream' in request.GET:
+                return await view(request, *args, **kwargs)
+
+            key = snapshot_key(request, await acatalogue_version())
+            snapshot = await cache.aget(key)
+            if snapshot is None:
+                response = await view(request, *args, **kwargs)
+                if response.status_code != 200 or response.streaming:
+                    return response
+                snapshot = make_snapshot(response)
+                await cache.aset(key, snapshot, CATALOGUE_CACHE_TIMEOUT)
+            return snapshot_response(snapshot, request)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method != 'GET' or 'stream' in request.GET:
+            return view(request, *args, **kwargs)
+
+        key = snapshot_key(request, catalogue_version())
+        snapshot = cache.get(key)
+        if snapshot is None:
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200 or response.streaming:
+                return response
+            snapshot = make_snapshot(response)
+            cache.set(key, snapshot, CATALOGUE_CACHE_TIMEOUT)
+        return snapshot_response(snapshot, request)
+    return wrapper
@@ -0,0 +1,125 @@
+"""
+Variantes redimensionadas de las imágenes de productos.
+
+Las variantes se generan fuera del request en un pool de procesos y se guardan
+bajo ``MEDIA_ROOT/products/variants/<sha256 del original>/``: como la ruta
+depende solo del contenido, una imagen ya procesada nunca se vuelve a generar.
+Este módulo no importa modelos a nivel de módulo para que los procesos del
+pool (iniciados con spawn) puedan importarlo sin configurar Django.
+"""
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+
+# nombre de la variante -> (lado máximo en píxeles, formato de Pillow, extensión)
+VARIANTS = {
+    'thumb': (200, 'WEBP', 'webp'),
+    'thumb_jpeg': (200, 'JPEG', 'jpg'),
+    'medium': (600, 'WEBP', 'webp'),
+    'medium_jpeg': (600, 'JPEG', 'jpg'),
+}
+VARIANT_QUALITY = 80
+VARIANTS_DIR = 'products/variants'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+def variant_name(digest, name):
+    size, format, extension = VARIANTS[name]
+    return f'{VARIANTS_DIR}/{digest}/{name}.{extension}'
+
+
+def render_variants(media_root, image_name):
+    """
+    Genera las variantes de ``MEDIA_ROOT/image_name`` que todavía no existan y
+    devuelve el sha256 del original. Se ejecuta dentro del pool de procesos.
+    """
+    with open(os.path.join(media_root, image_name), 'rb') as original:
+        content = original.read()
+    digest = hashlib.sha256(content).hexdigest()
+
+    pending = [name for name in VARIANTS if not os.path.exists(os.path.join(media_root, variant_name(digest, name)))]
+    if not pending:
+        return digest
+
+    with Image.open(original.name) as image:
+        image.load()
+        for name in pending:
+            size, format, extension = VARIANTS[name]
+            variant = image.copy()
+            variant.thumbnail((size, size), Image.Resampling.LANCZOS)
+            if format == 'JPEG' and variant.mode not in ('RGB', 'L'):
+                variant = variant.convert('RGB')
+            path = os.path.join(media_root, variant_name(digest, name))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Se escribe en un archivo temporal y se renombra para no exponer variantes a medio escribir
+            temporary = f'{path}.{os.getpid()}.tmp'
+            variant.save(temporary, format=format, quality=VARIANT_QUALITY, optimize=True)
+            os.replace(temporary, path)
+    return digest
+
+
+def get_executor():
+    global _executor
+    from django.conf import settings
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=getattr(settings, 'IMAGE_VARIANT_WORKERS', 2),
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+    return _executor
+
+
+def store_digest(product_id, image_name, digest):
+    from django.db import connection
+    from django.db.models.functions import Now
+    from .cache import invalidate_catalogue
+    from .models import Product
+
+    try:
+        # Solo si la imagen no cambió mientras se procesaba
+        if Product.objects.filter(pk=product_id, image=image_name).update(image_hash=digest, updated_at=Now()):
+            invalidate_catalogue()
+    finally:
+        connection.close()
+
+
+def schedule_variants(product):
+    """Encola la generación de variantes de ``product`` sin bloquear el request."""
+    from django.conf import settings
+
+    product_id = product.pk
+    image_name = product.image.name
+    future = get_executor().submit(render_variants, str(settings.MEDIA_ROOT), image_name)
+
+    def done(future):
+        exception = future.exception()
+        if exception is not None:
+            # Sin hash las variantes se reintentan en el próximo guardado del producto
+            logger.error('No se pudieron generar las variantes de %s (producto %s)', image_name, product_id,
+                         exc_info=exception)
+            return
+        store_digest(product_id, image_name, future.result())
+
+    future.add_done_callback(done)
+    return future
+
+
+def variant_urls(product):
+    """URLs de las variantes, o None si todavía no se generaron."""
+    from django.core.files.storage import default_storage
+
+    if not product.image or not product.image_hash:
+        return None
+    return {name: default_storage.url(variant_name(product.image_hash, name)) for name in VARIANTS}
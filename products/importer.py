@@ -0,0 +1,262 @@
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.core.validators import DecimalValidator
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .cache import invalidate_catalogue
+from .models import Category, Product
+from .search import index_products
+
+
+IMPORT_BATCH_SIZE = 1000
+# Máximo de errores detallados en el reporte (el total se informa siempre)
+MAX_REPORTED_ERRORS = 1000
+
+REQUIRED_FOR_CREATE = ('name', 'price', 'description', 'stock', 'category')
+UPDATABLE_FIELDS = ('name', 'price', 'description', 'stock', 'category', 'is_featured')
+# Campos que forman parte del índice de búsqueda
+SEARCH_FIELDS = {'name', 'description', 'category'}
+NAME_MAX_LENGTH = Product._meta.get_field('name').max_length
+PRICE_FIELD = Product._meta.get_field('price')
+# Rango de IntegerField, el mismo en los backends soportados
+STOCK_MAX = 2147483647
+# Tipos que puede traer un campo; en JSONL un valor también podría ser una lista o un objeto
+SCALAR_TYPES = (str, int, float)
+
+
+class RowError(ValueError):
+    pass
+
+
+# Lectores de filas: reciben líneas de texto y entregan (número de fila, dict o RowError)
+def read_csv(lines):
+    for number, row in enumerate(csv.DictReader(lines), start=1):
+        yield number, {key.strip(): value.strip() for key, value in row.items() if key and value not in (None, '')}
+
+
+def read_jsonl(lines):
+    number = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError:
+            yield number, RowError('JSON inválido')
+            continue
+        if not isinstance(row, dict):
+            yield number, RowError('Cada línea debe ser un objeto JSON')
+            continue
+        yield number, {key: value for key, value in row.items() if value not in (None, '')}
+
+
+READERS = {
+    'csv': read_csv,
+    'jsonl': read_jsonl,
+}
+
+
+class ProductImporter:
+    """
+    Crea o actualiza productos por lotes. Las categorías se resuelven desde un
+    único mapa en memoria (por id o por nombre) y cada lote se escribe con un
+    bulk_create y un UPDATE por conjunto de campos modificados. Las filas se
+    identifican por ``id`` o, si no lo traen, por ``name``; las que no existen
+    se crean.
+    """
+    def __init__(self, batch_size=IMPORT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.categories = {}
+        for category in Category.objects.all():
+            self.categories[str(category.id)] = category
+            self.categories[category.name.strip().lower()] = category
+        self.created = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors = []
+
+    def run(self, rows):
+        batch = []
+        for number, row in rows:
+            if isinstance(row, RowError):
+                self.add_error(number, row)
+                continue
+            batch.append((number, row))
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = []
+        if batch:
+            self.flush(batch)
+        if self.created or self.updated:
+            invalidate_catalogue()
+        return self.report()
+
+    def report(self):
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'error_count': self.error_count,
+            'errors': sorted(self.errors, key=lambda error: error['row']),
+        }
+
+    def add_error(self, number, error):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': number, 'error': str(error)})
+
+    def clean(self, row):
+        """
+        Valida y convierte los campos de la fila. Devuelve ``(product_id, values)``:
+        el id de la fila (o None si no lo trae) y los campos a escribir.
+        """
+        for field in ('id',) + UPDATABLE_FIELDS:
+            if field in row and not isinstance(row[field], SCALAR_TYPES):
+                raise RowError(f'El campo {field} debe ser un texto o un número')
+        product_id = None
+        if 'id' in row:
+            if not str(row['id']).isdigit():
+                raise RowError(f"El producto {row['id']} no existe")
+            product_id = int(row['id'])
+
+        values = {}
+        for field in UPDATABLE_FIELDS:
+            if field not in row:
+                continue
+            value = row[field]
+            if field == 'name':
+                value = str(value)
+                if len(value) > NAME_MAX_LENGTH:
+                    raise RowError(f'El nombre admite hasta {NAME_MAX_LENGTH} caracteres')
+            elif field == 'price':
+                try:
+                    value = Decimal(str(value))
+                except InvalidOperation:
+                    raise RowError('El precio debe ser numérico')
+                # Decimal acepta NaN, Infinity y exponentes que la columna no puede guardar
+                if not value.is_finite():
+                    raise RowError('El precio debe ser numérico')
+                if value < 0:
+                    raise RowError('El precio no puede ser negativo')
+                try:
+                    DecimalValidator(PRICE_FIELD.max_digits, PRICE_FIELD.decimal_places)(value)
+                except ValidationError:
+                    raise RowError(
+                        f'El precio admite hasta {PRICE_FIELD.max_digits} dígitos, '
+                        f'{PRICE_FIELD.decimal_places} de ellos decimales'
+                    )
+            elif field == 'stock':
+                try:
+                    value = int(value)
+                except (TypeError, ValueError):
+                    raise RowError('El stock debe ser un número entero')
+                if value < 0:
+                    raise RowError('El stock no puede ser negativo')
+                if value > STOCK_MAX:
+                    raise RowError(f'El stock no puede superar {STOCK_MAX}')
+            elif field == 'category':
+                category = self.categories.get(str(value).strip().lower())
+                if category is None:
+                    raise RowError(f'La categoría {value} no existe')
+                value = category
+            elif field == 'is_featured' and isinstance(value, str):
+                value = value.strip().lower() in ('1', 'true', 'yes', 'si', 'sí')
+            values[field] = value
+        return product_id, values
+
+    def write_updates(self, updates):
+        """
+        Escribe las actualizaciones agrupadas por conjunto de campos. bulk_update
+        arma un solo ``UPDATE ... SET campo = CASE id ... END WHERE id IN (...)``
+        por grupo, en lugar de una sentencia por fila.
+        """
+        groups = {}
+        for product, fields in updates:
+            groups.setdefault(tuple(sorted(fields)) + ('updated_at',), []).append(product)
+        for names, products in groups.items():
+            Product.objects.bulk_update(products, names, batch_size=self.batch_size)
+
+    def flush(self, batch):
+        # Las filas se validan antes de buscar sus productos, así la búsqueda solo ve ids y nombres válidos
+        rows = []
+        ids = []
+        names = []
+        for number, row in batch:
+            try:
+                product_id, values = self.clean(row)
+            except RowError as error:
+                self.add_error(number, error)
+                continue
+            rows.append((number, product_id, values))
+            if product_id is not None:
+                ids.append(product_id)
+            elif 'name' in values:
+                names.append(values['name'])
+        products = Product.objects.select_related('category')
+        by_id = products.in_bulk(ids)
+        by_name = {}
+        for product in products.filter(name__in=names).order_by('id'):
+            by_name.setdefault(product.name, product)
+
+        now = timezone.now()
+        to_create = []
+        to_update = {}
+        reindex = []
+        for number, product_id, values in rows:
+            if product_id is not None:
+                product = by_id.get(product_id)
+                if product is None:
+                    self.add_error(number, RowError(f'El producto {product_id} no existe'))
+                    continue
+            else:
+                product = by_name.get(values.get('name'))
+
+            if product is None:
+                missing = [field for field in REQUIRED_FOR_CREATE if field not in values]
+                if missing:
+                    self.add_error(number, RowError(f"Faltan campos requeridos: {', '.join(missing)}"))
+                    continue
+                product = Product(**values)
+                to_create.append(product)
+                # Filas repetidas con el mismo nombre actualizan el producto recién creado
+                by_name[product.name] = product
+                continue
+
+            for field, value in values.items():
+                setattr(product, field, value)
+            product.updated_at = now
+            if product.pk:
+                fields = to_update.get(product.pk, (product, set()))[1]
+                fields.update(values)
+                to_update[product.pk] = (product, fields)
+                if SEARCH_FIELDS & set(values):
+                    reindex.append(product)
+
+        with transaction.atomic():
+            returns_ids = connection.features.can_return_rows_from_bulk_insert
+            if to_create and not returns_ids:
+                last_id = Product.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+            Product.objects.bulk_create(to_create, batch_size=self.batch_size)
+            self.write_updates(to_update.values())
+            # bulk_create y bulk_update no envían señales: el índice de búsqueda se actualiza aquí
+            created = to_create
+            if to_create and not returns_ids:
+                # El backend no devuelve los ids (MySQL): se recuperan los creados después del último id
+                # previo, así no se incluyen productos existentes con el mismo nombre
+                created = list(Product.objects.filter(
+                    id__gt=last_id, name__in=[product.name for product in to_create]
+                ).select_related('category'))
+            index_products(created + reindex)
+
+        self.created += len(to_create)
+        self.updated += len(to_update)
+
+
+def import_products(lines, format, batch_size=IMPORT_BATCH_SIZE):
+    """Importa productos desde líneas de texto en formato ``csv`` o ``jsonl``."""
+    return ProductImporter(batch_size=batch_size).run(READERS[format](lines))
@@ -0,0 +1,36 @@
+from concurrent.futures import as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from products.images import get_executor, render_variants, store_digest
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = "Genera las variantes redimensionadas de las imágenes de productos que aún no las tienen"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Reprocesa también los productos que ya tienen variantes")
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image='').exclude(image__isnull=True)
+        if not options['all']:
+            products = products.filter(image_hash='')
+
+        executor = get_executor()
+        futures = {
+            executor.submit(render_variants, str(settings.MEDIA_ROOT), image_name): (product_id, image_name)
+            for product_id, image_name in products.values_list('id', 'image').iterator()
+        }
+        done = failed = 0
+        for future in as_completed(futures):
+            product_id, image_name = futures[future]
+            if future.exception() is not None:
+                failed += 1
+                self.stderr.write(f"Producto {product_id}: {future.exception()}")
+                continue
+            store_digest(product_id, image_name, future.result())
+            done += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Variantes generadas: {done}, con errores: {failed}"))
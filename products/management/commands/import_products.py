@@ -0,0 +1,34 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.importer import IMPORT_BATCH_SIZE, READERS, import_products
+
+
+class Command(BaseCommand):
+    help = "Importa o actualiza productos desde un archivo CSV o JSONL (usar - para stdin)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=sorted(READERS), help="Por defecto se deduce de la extensión")
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = options['format'] or ('csv' if path.endswith('.csv') else 'jsonl' if path.endswith(('.jsonl', '.ndjson')) else None)
+        if format is None:
+            raise CommandError("No se pudo deducir el formato, use --format")
+
+        if path == '-':
+            report = import_products(sys.stdin, format, options['batch_size'])
+        else:
+            with open(path, newline='', encoding='utf-8') as lines:
+                report = import_products(lines, format, options['batch_size'])
+
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+        if report['error_count']:
+            self.stderr.write(self.style.WARNING(f"{report['error_count']} filas con errores"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Productos creados: {report['created']}, actualizados: {report['updated']}"
+        ))
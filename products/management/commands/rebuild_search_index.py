@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from products.models import SearchTrigram
+from products.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el índice de trigramas usado por /api/products/search/"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Índice reconstruido: {SearchTrigram.objects.count()} trigramas"
+        ))
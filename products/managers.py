@@ -0,0 +1,68 @@
+from django.db import models, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Now
+
+from .cache import invalidate_catalogue
+
+
+class InsufficientStock(Exception):
+    """
+    No hay stock suficiente para una reserva. Lanzada dentro de
+    ``transaction.atomic()`` revierte todas las reservas hechas antes.
+    """
+    def __init__(self, product):
+        self.product = product
+        super().__init__(f"Stock insuficiente para {product.name}")
+
+
+class _StockShortfall(Exception):
+    pass
+
+
+class ProductManager(models.Manager):
+    """
+    Manager de productos cuyas operaciones de stock son UPDATE condicionales:
+    las compras concurrentes nunca leen, comparan y escriben el stock en Python.
+    ``update()`` no envía señales ni aplica ``auto_now``, así que cada reserva
+    actualiza ``updated_at`` e invalida la caché del catálogo al confirmarse
+    la transacción.
+    """
+    def reserve_stock(self, product, quantity):
+        """
+        Descuenta ``quantity`` del stock de ``product`` con un solo
+        ``UPDATE ... SET stock = stock - n WHERE stock >= n``.
+        Lanza InsufficientStock si la fila no cumplió la condición.
+        """
+        updated = self.filter(pk=product.pk, stock__gte=quantity).update(stock=F('stock') - quantity, updated_at=Now())
+        if not updated:
+            raise InsufficientStock(product)
+        transaction.on_commit(invalidate_catalogue)
+
+    def reserve_stock_bulk(self, quantities):
+        """
+        Reserva stock de varios productos con un solo UPDATE condicional:
+        ``SET stock = stock - CASE id ... END WHERE id IN (...) AND stock >= CASE id ... END``.
+        ``quantities`` asocia cada producto con la cantidad a reservar. Se
+        descuentan todos o ninguno; InsufficientStock indica el primer
+        producto sin stock suficiente.
+        """
+        if not quantities:
+            return
+        requested = Case(
+            *[When(pk=product.pk, then=Value(quantity)) for product, quantity in quantities.items()],
+            output_field=IntegerField(),
+        )
+        pks = [product.pk for product in quantities]
+        try:
+            with transaction.atomic():
+                updated = self.filter(pk__in=pks, stock__gte=requested).update(stock=F('stock') - requested, updated_at=Now())
+                if updated != len(quantities):
+                    raise _StockShortfall
+        except _StockShortfall:
+            stocks = dict(self.filter(pk__in=pks).values_list('pk', 'stock'))
+            for product, quantity in quantities.items():
+                if stocks.get(product.pk, 0) < quantity:
+                    raise InsufficientStock(product)
+            # El stock cambió entre el UPDATE y la lectura: se informa el primer producto
+            raise InsufficientStock(next(iter(quantities)))
+        transaction.on_commit(invalidate_catalogue)
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.2 on 2026-10-18 11:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3)),
+                ('weight', models.PositiveSmallIntegerField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_trigrams', to='products.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['trigram', 'product'], name='search_trigram_idx')],
+            },
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from .managers import ProductManager
 
 class Product(models.Model):
     name = models.CharField(max_length=200)
@@ -7,13 +8,41 @@ class Product(models.Model):
     stock = models.IntegerField()
     category = models.ForeignKey('Category', on_delete=models.CASCADE)
     image = models.ImageField(upload_to='products/', null=True, blank=True)
+    # sha256 del archivo original; identifica sus variantes en products/variants/ (ver products/images.py)
+    image_hash = models.CharField(max_length=64, blank=True, default='')
     is_featured = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = ProductManager()
+
+    class Meta:
+        # Índices para la paginación por cursor (id descendente) combinada con los filtros de la lista
+        indexes = [
+            models.Index(fields=['category', '-id'], name='product_category_id_idx'),
+            models.Index(fields=['is_featured', '-id'], name='product_featured_id_idx'),
+            models.Index(fields=['price'], name='product_price_idx'),
+            models.Index(fields=['stock'], name='product_stock_idx'),
+        ]
     
 class Category(models.Model):
     name = models.CharField(max_length=200)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
 class Supplier(models.Model):
     name = models.CharField(max_length=200)
     email = models.CharField(max_length=200)
     phone = models.IntegerField()
     address = models.CharField(max_length=200)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+
+# Índice invertido de trigramas para la búsqueda de productos (ver products/search.py)
+class SearchTrigram(models.Model):
+    trigram = models.CharField(max_length=3)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='search_trigrams')
+    weight = models.PositiveSmallIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['trigram', 'product'], name='search_trigram_idx'),
+        ]
@@ -0,0 +1,107 @@
+import math
+import re
+import unicodedata
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+
+from .models import Product, SearchTrigram
+
+
+# Peso de cada campo en el ranking: coincidir en el nombre vale más que en la descripción
+FIELD_WEIGHTS = {
+    'name': 3,
+    'category': 2,
+    'description': 1,
+}
+
+# Fracción mínima de los trigramas de la consulta que debe tener un producto.
+# Con 0.3 una palabra con una letra cambiada sigue encontrando el producto.
+MIN_SIMILARITY = 0.3
+
+NON_ALPHANUMERIC = re.compile(r'[^a-z0-9]+')
+
+
+# Minúsculas, sin tildes y solo letras y números, para que "Pimentón" y "pimenton" coincidan
+def normalize(text):
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return NON_ALPHANUMERIC.sub(' ', text.lower()).strip()
+
+
+def trigrams(text):
+    """Trigramas de cada palabra con el mismo relleno que pg_trgm ('  pal', ' pa', ... 'bra ')."""
+    grams = set()
+    for word in normalize(text).split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def product_trigrams(product):
+    weights = {}
+    fields = {
+        'name': product.name,
+        'category': product.category.name,
+        'description': product.description,
+    }
+    for field, text in fields.items():
+        for gram in trigrams(text):
+            weights[gram] = weights.get(gram, 0) + FIELD_WEIGHTS[field]
+    return weights
+
+
+def index_products(products):
+    """Reemplaza las entradas del índice de los productos dados (con su categoría cargada)."""
+    products = list(products)
+    rows = [
+        (gram, product.pk, weight)
+        for product in products
+        for gram, weight in product_trigrams(product).items()
+    ]
+    # Un catálogo genera decenas de trigramas por producto: se insertan con executemany
+    # en lugar de instanciar un modelo por fila como haría bulk_create
+    meta = SearchTrigram._meta
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(meta.get_field(name).column) for name in ('trigram', 'product', 'weight'))
+    sql = f'INSERT INTO {quote(meta.db_table)} ({columns}) VALUES (%s, %s, %s)'
+    with transaction.atomic():
+        SearchTrigram.objects.filter(product__in=[product.pk for product in products]).delete()
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, rows)
+
+
+def index_in_batches(products, batch_size=500):
+    """Indexa el queryset ``products`` por lotes, sin cargarlo entero en memoria."""
+    batch = []
+    for product in products.select_related('category').order_by('id').iterator(chunk_size=batch_size):
+        batch.append(product)
+        if len(batch) >= batch_size:
+            index_products(batch)
+            batch = []
+    if batch:
+        index_products(batch)
+
+
+def rebuild_index(batch_size=500):
+    SearchTrigram.objects.all().delete()
+    index_in_batches(Product.objects.all(), batch_size)
+
+
+def search_products(query, limit):
+    """
+    Devuelve ``(product_id, score)`` ordenados por relevancia. Solo se leen las
+    entradas del índice para los trigramas de la consulta (índice trigram, product).
+    """
+    grams = trigrams(query)
+    if not grams:
+        return []
+    min_matches = max(1, math.ceil(len(grams) * MIN_SIMILARITY))
+    return list(
+        SearchTrigram.objects.filter(trigram__in=grams)
+        .values('product')
+        .annotate(score=Sum('weight'), matches=Count('id'))
+        .filter(matches__gte=min_matches)
+        .order_by('-score', '-product')
+        .values_list('product', 'score')[:limit]
+    )
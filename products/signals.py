@@ -0,0 +1,106 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import invalidate_catalogue
+from .images import schedule_variants
+from .models import Category, Product, Supplier
+from .search import index_in_batches, index_products
+
+
+# Cualquier cambio en el catálogo invalida los snapshots cacheados. Se invalida al confirmar
+# la transacción: antes, un request concurrente podría cachear datos viejos con la versión nueva
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Supplier)
+def catalogue_changed(sender, **kwargs):
+    transaction.on_commit(invalidate_catalogue)
+
+
+# Campos que entran en el índice de búsqueda (products/search.py)
+SEARCH_FIELDS = {
+    Product: ('name', 'description', 'category_id'),
+    Category: ('name',),
+}
+
+
+def search_values(instance, update_fields=None):
+    """Valores cargados de SEARCH_FIELDS; de __dict__, para no leer campos diferidos."""
+    fields = SEARCH_FIELDS[type(instance)]
+    if update_fields is not None:
+        update_fields = {instance._meta.get_field(name).attname for name in update_fields}
+        fields = [field for field in fields if field in update_fields]
+    return {field: instance.__dict__[field] for field in fields if field in instance.__dict__}
+
+
+@receiver(post_init, sender=Product)
+@receiver(post_init, sender=Category)
+def remember_search_values(sender, instance, **kwargs):
+    instance._loaded_search_values = search_values(instance)
+
+
+def search_values_changed(instance, created, update_fields):
+    """
+    Compara los campos guardados con los que se cargaron y los deja como
+    nuevos valores cargados, así un segundo save() sin cambios no reindexa.
+    """
+    current = search_values(instance, update_fields)
+    loaded = getattr(instance, '_loaded_search_values', {})
+    instance._loaded_search_values = {**loaded, **current}
+    return created or any(loaded.get(field) != value for field, value in current.items())
+
+
+# Mantiene el índice de búsqueda al día; las filas de un producto eliminado se borran en cascada.
+# Solo se reindexa si cambió un campo del índice (no al descontar stock o cambiar el precio)
+@receiver(post_save, sender=Product)
+def reindex_product(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    if not raw and search_values_changed(instance, created, update_fields):
+        index_products([instance])
+
+
+# Renombrar una categoría reindexa todos sus productos: se hace por lotes y al confirmar la
+# transacción, para no alargar la del request ni indexar un nombre que se revierta
+@receiver(post_save, sender=Category)
+def reindex_category(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    if not raw and search_values_changed(instance, created, update_fields) and not created:
+        category_id = instance.pk
+        transaction.on_commit(lambda: index_in_batches(Product.objects.filter(category_id=category_id)))
+
+
+def image_name(value):
+    return getattr(value, 'name', value) or ''
+
+
+# Recuerda la imagen con que se cargó el producto. Se lee de __dict__ para no
+# disparar una consulta si el campo quedó diferido (only/defer)
+@receiver(post_init, sender=Product)
+def remember_image(sender, instance, **kwargs):
+    if 'image' in instance.__dict__:
+        instance._loaded_image = image_name(instance.__dict__['image'])
+
+
+# Si cambia la imagen, el hash anterior ya no corresponde a sus variantes
+@receiver(pre_save, sender=Product)
+def reset_image_hash(sender, instance, raw=False, **kwargs):
+    # Con el campo diferido y sin asignar, la imagen no cambió
+    if raw or not instance.pk or not instance.image_hash or 'image' not in instance.__dict__:
+        return
+    current = getattr(instance, '_loaded_image', None)
+    if current is None:
+        # Se asignó una imagen a un campo que se había diferido
+        current = image_name(Product.objects.filter(pk=instance.pk).values_list('image', flat=True).first())
+    if current != image_name(instance.image):
+        instance.image_hash = ''
+
+
+@receiver(post_save, sender=Product)
+def update_loaded_image(sender, instance, raw=False, **kwargs):
+    if not raw and 'image' in instance.__dict__:
+        instance._loaded_image = image_name(instance.__dict__['image'])
+
+
+# Las variantes se generan en el pool de procesos una vez confirmada la transacción
+@receiver(post_save, sender=Product)
+def generate_image_variants(sender, instance, raw=False, **kwargs):
+    if not raw and instance.image and not instance.image_hash:
+        transaction.on_commit(lambda: schedule_variants(instance))
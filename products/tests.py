@@ -1,3 +1,456 @@
-from django.test import TestCase
+import json
+from concurrent.futures import Future
+from unittest import mock
+
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from main.pagination import MAX_PAGE_SIZE, encode_cursor
+from main.testing import AsyncParityTestCase, QueryCountTestCase, walk_pages
+
+from .cache import accepts_gzip, catalogue_version
+from .images import schedule_variants
+from .managers import InsufficientStock
+from .models import Category, Product, Supplier
+from .search import FIELD_WEIGHTS, index_in_batches, index_products, search_products, trigrams
+
+
+def seed_categories(rows):
+    missing = rows - Category.objects.count()
+    Category.objects.bulk_create([Category(name=f'Categoría {i}') for i in range(missing)])
+    return Category.objects.order_by('id').first()
+
+
+def seed_products(rows):
+    """Completa hasta ``rows`` productos (indexados para la búsqueda) y devuelve el primero."""
+    category = seed_categories(1)
+    start = Product.objects.count()
+    products = Product.objects.bulk_create([
+        Product(name=f'Manzana roja {i}', price=1000 + i, description='Manzana de temporada', stock=100, category=category)
+        for i in range(start, rows)
+    ])
+    index_products(products)
+    return Product.objects.order_by('id').first()
+
+
+def seed_suppliers(rows):
+    missing = rows - Supplier.objects.count()
+    Supplier.objects.bulk_create([
+        Supplier(name=f'Proveedor {i}', email=f'proveedor{i}@example.com', phone=900000000 + i, address=f'Calle {i}')
+        for i in range(missing)
+    ])
+    return Supplier.objects.order_by('id').first()
+
+
+def post_json(client, url, data, method='post'):
+    return getattr(client, method)(url, json.dumps(data), content_type='application/json')
+
+
+class CategoryQueryCountTests(QueryCountTestCase):
+    def test_list(self):
+        self.assertStableQueries(2, seed_categories, lambda category: self.client.get('/api/categories/'))
+
+    def test_list_stream(self):
+        self.assertStableQueries(2, seed_categories, lambda category: self.client.get('/api/categories/?stream=true'))
+
+    def test_create(self):
+        self.assertStableQueries(1, seed_categories, lambda category: post_json(self.client, '/api/categories/', {'name': 'Verduras'}))
+
+    def test_detail(self):
+        self.assertStableQueries(2, seed_categories, lambda category: self.client.get(f'/api/categories/{category.id}/'))
+
+    def test_update(self):
+        # El reindex de sus productos corre al confirmar la transacción, fuera del request medido
+        self.assertStableQueries(2, seed_categories, lambda category: post_json(self.client, f'/api/categories/{category.id}/', {'name': 'Frutas'}, 'put'))
+
+    def test_delete(self):
+        def seed(rows):
+            seed_categories(rows)
+            return Category.objects.create(name='Vacía')
+        self.assertStableQueries(4, seed, lambda category: self.client.delete(f'/api/categories/{category.id}/'))
+
+
+class ProductQueryCountTests(QueryCountTestCase):
+    def test_list(self):
+        self.assertStableQueries(2, seed_products, lambda product: self.client.get('/api/products/?limit=200'))
+
+    def test_list_filtered(self):
+        self.assertStableQueries(2, seed_products, lambda product: self.client.get(f'/api/products/?category={product.category_id}&in_stock=true&min_price=1000'))
+
+    def test_list_sparse_fields(self):
+        self.assertStableQueries(2, seed_products, lambda product: self.client.get('/api/products/?fields=id,name,category'))
+
+    def test_list_stream(self):
+        self.assertStableQueries(2, seed_products, lambda product: self.client.get('/api/products/?stream=true'))
+
+    def test_multi_get(self):
+        def seed(rows):
+            seed_products(rows)
+            return ','.join(str(product_id) for product_id in Product.objects.values_list('id', flat=True)[:200])
+        self.assertStableQueries(2, seed, lambda ids: self.client.get(f'/api/products/?ids={ids}'))
+
+    def test_create(self):
+        self.assertStableQueries(6, seed_products, lambda product: post_json(self.client, '/api/products/', {
+            'name': 'Pera', 'price': 1200, 'description': 'Pera de agua', 'stock': 10, 'category': product.category_id,
+        }))
+
+    def test_search(self):
+        self.assertStableQueries(3, seed_products, lambda product: self.client.get('/api/products/search/?q=manzana&limit=200'))
+
+    def test_import(self):
+        def seed(rows):
+            product = seed_products(rows)
+            lines = ['id,name,price,description,stock,category']
+            lines += [f'{product.id},Manzana verde,1500,Manzana ácida,20,{product.category_id}']
+            lines += [f',Pera {rows}-{i},1200,Pera de agua,10,{product.category_id}' for i in range(9)]
+            return '\n'.join(lines)
+        self.assertStableQueries(11, seed, lambda csv: self.client.post('/api/products/import/?format=csv', csv, content_type='text/csv'))
+
+    def test_detail(self):
+        self.assertStableQueries(2, seed_products, lambda product: self.client.get(f'/api/products/{product.id}/'))
+
+    def test_update(self):
+        self.assertStableQueries(2, seed_products, lambda product: post_json(self.client, f'/api/products/{product.id}/', {'stock': 50}, 'put'))
+
+    def test_delete(self):
+        def seed(rows):
+            product = seed_products(rows)
+            return Product.objects.create(name='Temporal', price=1, description='-', stock=0, category=product.category)
+        self.assertStableQueries(6, seed, lambda product: self.client.delete(f'/api/products/{product.id}/'))
+
+
+class ProductFilterTests(TestCase):
+    def test_non_finite_price(self):
+        for value in ('NaN', 'Infinity', '-inf', 'abc'):
+            with self.subTest(value=value):
+                self.assertEqual(self.client.get(f'/api/products/?min_price={value}').status_code, 400)
+                self.assertEqual(self.client.get(f'/api/products/?max_price={value}').status_code, 400)
+
+
+class ProductPaginationTests(TestCase):
+    def test_walk_pages(self):
+        seed_products(10)
+        # Mismo precio en todas: el cursor avanza por id y no depende de los filtros
+        Product.objects.update(price=1000)
+        expected = list(Product.objects.order_by('-id').values_list('id', flat=True))
+
+        for limit in (1, 3, 10, 11):
+            with self.subTest(limit=limit):
+                self.assertEqual(walk_pages(self.client, f'/api/products/?limit={limit}', 'products'), expected)
+        self.assertEqual(walk_pages(self.client, '/api/products/?limit=3&min_price=1000&fields=id', 'products'), expected)
+
+    def test_malformed_cursor(self):
+        for cursor in ('no-es-un-cursor', encode_cursor({'id': 1}), encode_cursor([1, 2]), encode_cursor(['1'])):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(f'/api/products/?cursor={cursor}')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()['status'], 'error')
+
+
+class SparseFieldsTests(TestCase):
+    def setUp(self):
+        self.product = seed_products(3)
+        self.supplier = seed_suppliers(2)
+
+    def test_requested_keys(self):
+        for path, key, expected in (
+            ('/api/products/?fields=id,name', 'products', {'id', 'name'}),
+            ('/api/products/?fields=price,category,images', 'products', {'price', 'category', 'images'}),
+            (f'/api/products/?ids={self.product.id}&fields=stock', 'products', {'stock'}),
+            ('/api/products/search/?q=manzana&fields=name', 'products', {'name', 'score'}),
+            (f'/api/products/{self.product.id}/?fields=id,is_featured', 'product', {'id', 'is_featured'}),
+            ('/api/categories/?fields=name', 'categories', {'name'}),
+            (f'/api/categories/{self.product.category_id}/?fields=id', 'category', {'id'}),
+            ('/api/suppliers/?fields=email,phone', 'suppliers', {'email', 'phone'}),
+            (f'/api/suppliers/{self.supplier.id}/?fields=address', 'supplier', {'address'}),
+        ):
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                self.assertEqual(response.status_code, 200)
+                data = response.json()[key]
+                for row in data if isinstance(data, list) else [data]:
+                    self.assertEqual(set(row), expected)
+
+    def test_values_match_full_representation(self):
+        full = self.client.get(f'/api/products/{self.product.id}/').json()['product']
+        sparse_row = self.client.get(f'/api/products/{self.product.id}/?fields=name,category').json()['product']
+        self.assertEqual(sparse_row, {'name': full['name'], 'category': full['category']})
+
+    def test_unknown_field(self):
+        for path in (
+            '/api/products/?fields=id,precio',
+            '/api/products/search/?q=manzana&fields=color',
+            f'/api/products/{self.product.id}/?fields=costo',
+            '/api/categories/?fields=color',
+            f'/api/categories/{self.product.category_id}/?fields=color',
+            '/api/suppliers/?fields=rut',
+            f'/api/suppliers/{self.supplier.id}/?fields=rut',
+        ):
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()['status'], 'error')
+
+
+class MultiGetTests(TestCase):
+    def setUp(self):
+        seed_products(3)
+        self.ids = list(Product.objects.order_by('id').values_list('id', flat=True))
+
+    def test_requested_order_and_missing(self):
+        missing = self.ids[-1] + 100
+        response = self.client.get(f'/api/products/?ids={self.ids[2]},{missing},{self.ids[0]},{self.ids[2]},0')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([product['id'] for product in data['products']], [self.ids[2], self.ids[0]])
+        self.assertEqual(data['missing'], [missing, 0])
+
+    def test_max_page_size(self):
+        ids = ','.join(str(product_id) for product_id in range(1, MAX_PAGE_SIZE + 1))
+        response = self.client.get(f'/api/products/?ids={ids}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['products']) + len(response.json()['missing']), MAX_PAGE_SIZE)
+
+        response = self.client.get(f'/api/products/?ids={ids},{MAX_PAGE_SIZE + 1}')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['status'], 'error')
+
+    def test_invalid_ids(self):
+        for ids in ('1,a', '1.5', '-1', '1,,2', ''):
+            with self.subTest(ids=ids):
+                response = self.client.get(f'/api/products/?ids={ids}')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()['status'], 'error')
+
+
+class ProductImportTests(TestCase):
+    def test_invalid_rows(self):
+        category = Category.objects.create(name='Frutas')
+        lines = ['name,price,description,stock,category']
+        lines += [f'Pera,{price},Pera de agua,10,{category.id}' for price in ('NaN', 'Infinity', '1e20', '-5', '1.234', '12345678901')]
+        lines += [f'{"x" * 201},1000,Largo,10,{category.id}', f'Pera,1000,Pera de agua,9999999999,{category.id}']
+        lines += [f'Manzana,1990.50,Manzana roja,10,{category.id}']
+        response = self.client.post('/api/products/import/?format=csv', '\n'.join(lines), content_type='text/csv')
+
+        self.assertEqual(response.status_code, 200)
+        report = response.json()['data']
+        self.assertEqual(report['created'], 1)
+        self.assertEqual([error['row'] for error in report['errors']], list(range(1, 9)))
+        self.assertEqual(Product.objects.get().name, 'Manzana')
+
+    def test_non_scalar_values(self):
+        category = Category.objects.create(name='Frutas')
+        product = Product.objects.create(name='Pera', price=1000, description='-', stock=1, category=category)
+        base = {'price': 1000, 'description': 'Fruta', 'stock': 10, 'category': category.id}
+        rows = [
+            {**base, 'name': ['Pera']},
+            {**base, 'name': {'es': 'Pera'}},
+            {'id': [product.id], 'stock': 5},
+            {'id': product.id, 'stock': {'valor': 5}},
+            {**base, 'name': 'Manzana', 'category': [category.id]},
+            {**base, 'name': 'Manzana'},
+        ]
+        body = '\n'.join(json.dumps(row) for row in rows)
+        response = self.client.post('/api/products/import/?format=jsonl', body, content_type='application/jsonl')
+
+        self.assertEqual(response.status_code, 200)
+        report = response.json()['data']
+        self.assertEqual([error['row'] for error in report['errors']], [1, 2, 3, 4, 5])
+        self.assertEqual(report['created'], 1)
+        self.assertEqual(Product.objects.get(pk=product.pk).stock, 1)
+
+
+class StockReservationTests(TestCase):
+    def setUp(self):
+        category = seed_categories(1)
+        self.apple, self.pear = Product.objects.bulk_create([
+            Product(name='Manzana', price=1000, description='-', stock=5, category=category),
+            Product(name='Pera', price=1000, description='-', stock=2, category=category),
+        ])
+
+    def stocks(self):
+        return dict(Product.objects.values_list('name', 'stock'))
+
+    def test_reserve(self):
+        Product.objects.reserve_stock(self.apple, 5)
+        self.assertEqual(self.stocks(), {'Manzana': 0, 'Pera': 2})
+
+    def test_oversell(self):
+        with self.assertRaises(InsufficientStock) as raised:
+            Product.objects.reserve_stock(self.apple, 6)
+        self.assertEqual(raised.exception.product, self.apple)
+        self.assertEqual(self.stocks(), {'Manzana': 5, 'Pera': 2})
+
+    def test_reserve_bulk(self):
+        with CaptureQueriesContext(connection) as queries:
+            Product.objects.reserve_stock_bulk({self.apple: 4, self.pear: 2})
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('UPDATE')]), 1)
+        self.assertEqual(self.stocks(), {'Manzana': 1, 'Pera': 0})
+
+    def test_bulk_oversell_leaves_rows_untouched(self):
+        # La manzana alcanza, la pera no: no se descuenta ninguna de las dos
+        with self.assertRaises(InsufficientStock) as raised:
+            Product.objects.reserve_stock_bulk({self.apple: 1, self.pear: 3})
+        self.assertEqual(raised.exception.product, self.pear)
+        self.assertEqual(self.stocks(), {'Manzana': 5, 'Pera': 2})
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name='Frutas')
+        self.apple = self.create('Manzana', 'Fruta roja')
+        self.juice = self.create('Jugo natural', 'Jugo de manzana')
+        self.pear = self.create('Pera', 'Fruta de agua')
+
+    def create(self, name, description):
+        return Product.objects.create(name=name, price=1000, description=description, stock=10, category=self.category)
+
+    def search(self, query):
+        return [product_id for product_id, score in search_products(query, 10)]
+
+    def test_ranking(self):
+        # Coincidir en el nombre pesa más que en la descripción
+        grams = len(trigrams('manzana'))
+        self.assertEqual(search_products('manzana', 10), [
+            (self.apple.id, grams * FIELD_WEIGHTS['name']),
+            (self.juice.id, grams * FIELD_WEIGHTS['description']),
+        ])
+
+    def test_min_similarity(self):
+        # "mango" comparte 3 de los 8 trigramas de "manzana" (0.375)
+        mango = self.create('Mango', 'Fruta tropical')
+        self.assertIn(mango.id, self.search('manzana'))
+        with mock.patch('products.search.MIN_SIMILARITY', 0.5):
+            self.assertNotIn(mango.id, self.search('manzana'))
+        self.assertNotIn(self.pear.id, self.search('manzana'))
+
+    def test_typo(self):
+        response = self.client.get('/api/products/search/?q=manzna')
+        self.assertEqual(response.json()['products'][0]['name'], 'Manzana')
+
+    def test_reindex_only_search_fields(self):
+        self.apple.stock = 5
+        self.apple.price = 1200
+        with CaptureQueriesContext(connection) as queries:
+            self.apple.save()
+        self.assertFalse([query for query in queries if 'products_searchtrigram' in query['sql']])
+
+        self.apple.name = 'Frutilla'
+        self.apple.save()
+        self.assertEqual(self.search('frutilla')[0], self.apple.id)
+
+    def test_category_rename_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.category.name = 'Verduras'
+            self.category.save()
+        self.assertEqual(self.search('verduras'), [])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(set(self.search('verduras')), {self.apple.id, self.juice.id, self.pear.id})
+
+    def test_index_in_batches(self):
+        with mock.patch('products.search.index_products', wraps=index_products) as index:
+            index_in_batches(Product.objects.all(), batch_size=2)
+        self.assertEqual([len(call.args[0]) for call in index.call_args_list], [2, 1])
+
+
+class ImageHashTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Frutas')
+        Product.objects.create(name='Pera', price=1000, description='-', stock=1, category=category, image='products/pera.jpg')
+        Product.objects.update(image_hash='abc')
+
+    def test_unchanged_image_keeps_hash(self):
+        product = Product.objects.get()
+        product.stock = 5
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks():
+            product.save()
+        # La imagen se compara con la cargada, sin volver a leer el producto
+        self.assertFalse([query for query in queries if query['sql'].startswith('SELECT') and 'products_product' in query['sql']])
+        self.assertEqual(Product.objects.get().image_hash, 'abc')
+
+    def test_changed_image_resets_hash(self):
+        product = Product.objects.get()
+        product.image = 'products/pera2.jpg'
+        with self.captureOnCommitCallbacks():
+            product.save()
+        self.assertEqual(Product.objects.get().image_hash, '')
+
+    def test_deferred_image(self):
+        product = Product.objects.only('id', 'stock', 'image_hash').get()
+        product.image = 'products/pera2.jpg'
+        with self.captureOnCommitCallbacks():
+            product.save()
+        self.assertEqual(Product.objects.get().image_hash, '')
+
+    def test_failed_variants_are_logged(self):
+        future = Future()
+        with mock.patch('products.images.get_executor') as executor, self.assertLogs('products.images', 'ERROR'):
+            executor.return_value.submit.return_value = future
+            schedule_variants(Product.objects.get())
+            future.set_exception(OSError('imagen dañada'))
+        self.assertEqual(Product.objects.get().image_hash, 'abc')
+
+
+class CatalogueCacheTests(TestCase):
+    def test_invalidated_on_commit(self):
+        version = catalogue_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name='Frutas')
+            self.assertEqual(catalogue_version(), version)
+        self.assertNotEqual(catalogue_version(), version)
+
+    def test_accepts_gzip(self):
+        factory = RequestFactory()
+        for header, expected in (
+            ('gzip, deflate', True), ('br;q=1.0, gzip;q=0.5', True), ('*', True),
+            ('gzip;q=0', False), ('deflate, gzip;q=0.0', False), ('*;q=0', False), ('', False),
+        ):
+            with self.subTest(header=header):
+                self.assertIs(accepts_gzip(factory.get('/', HTTP_ACCEPT_ENCODING=header)), expected)
+
+
+class SupplierQueryCountTests(QueryCountTestCase):
+    def test_list(self):
+        self.assertStableQueries(2, seed_suppliers, lambda supplier: self.client.get('/api/suppliers/'))
+
+    def test_list_stream(self):
+        self.assertStableQueries(2, seed_suppliers, lambda supplier: self.client.get('/api/suppliers/?stream=true'))
+
+    def test_create(self):
+        self.assertStableQueries(1, seed_suppliers, lambda supplier: post_json(self.client, '/api/suppliers/', {
+            'name': 'Agrícola Sur', 'email': 'sur@example.com', 'phone': 912345678, 'address': 'Camino Real 1',
+        }))
+
+    def test_detail(self):
+        self.assertStableQueries(2, seed_suppliers, lambda supplier: self.client.get(f'/api/suppliers/{supplier.id}/'))
+
+    def test_update(self):
+        self.assertStableQueries(2, seed_suppliers, lambda supplier: post_json(self.client, f'/api/suppliers/{supplier.id}/', {'phone': 911111111}, 'put'))
+
+    def test_delete(self):
+        self.assertStableQueries(2, seed_suppliers, lambda supplier: self.client.delete(f'/api/suppliers/{supplier.id}/'))
+
+
+class ProductAsyncViewTests(AsyncParityTestCase):
+    def test_same_responses(self):
+        product = seed_products(5)
+        seed_categories(3)
+        for path in (
+            '/api/products/?limit=2',
+            f'/api/products/?limit=2&cursor={encode_cursor([product.id + 3])}',
+            f'/api/products/?category={product.category_id}&min_price=1002&fields=id,name',
+            f'/api/products/?ids={product.id + 1},{product.id},999999',
+            '/api/products/?stream=true',
+            '/api/products/?cursor=no-es-un-cursor',
+            '/api/products/?fields=id,precio',
+            '/api/products/?ids=1,a',
+            '/api/categories/',
+            '/api/categories/?fields=name',
+            '/api/categories/?stream=true',
+            '/api/categories/?fields=color',
+        ):
+            with self.subTest(path=path):
+                self.assertSameResponse(path)
 
-# Create your tests here.
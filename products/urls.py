@@ -5,6 +5,8 @@ urlpatterns = [
     path('api/products/', views.products, name='products'),
     path('api/products/<int:product_id>/', views.product_detail, name='product_detail'),
     path('api/products/add/', views.products, name='add_product'),
+    path('api/products/search/', views.product_search, name='product_search'),
+    path('api/products/import/', views.product_import, name='product_import'),
     path('api/suppliers/', views.suppliers, name='suppliers'),
     path('api/suppliers/<int:supplier_id>/', views.supplier_detail, name='supplier_detail'),
     path('api/categories/', views.categories, name='categories'),
@@ -1,51 +1,171 @@
 from django.shortcuts import render, get_object_or_404
-from django.http import JsonResponse
 from .models import Product, Category, Supplier
 from django.views.decorators.http import require_http_methods 
 from django.views.decorators.csrf import csrf_exempt
+from decimal import Decimal, InvalidOperation
+from main.pagination import InvalidQueryParam, get_cursor, get_fields, get_ids, get_limit, multi_get, paginate, parse_bool
+from main.conditional import collection_stamp, conditional, object_stamp
+from main.streaming import stream_json, wants_stream
+from main.metrics import JsonResponse, timed_serialization
+from .cache import cache_catalogue
+from .images import variant_urls
+from .search import search_products
+from .importer import READERS, import_products
 import json
 
 
 
+# Campos de cada representación: nombre en el JSON -> (columnas que necesita, cómo obtener el valor).
+# Con ?fields= se serializan solo los campos pedidos y el SELECT se reduce a sus columnas
+PRODUCT_FIELDS = {
+    'id': (('id',), lambda product: product.id),
+    'name': (('name',), lambda product: product.name),
+    'price': (('price',), lambda product: product.price),
+    'description': (('description',), lambda product: product.description),
+    'stock': (('stock',), lambda product: product.stock),
+    'category': (('category__name',), lambda product: product.category.name),
+    'image': (('image',), lambda product: product.image.url if product.image else None),
+    'images': (('image', 'image_hash'), variant_urls),
+    'is_featured': (('is_featured',), lambda product: product.is_featured),
+}
+
+SUPPLIER_FIELDS = {
+    'id': (('id',), lambda supplier: supplier.id),
+    'name': (('name',), lambda supplier: supplier.name),
+    'email': (('email',), lambda supplier: supplier.email),
+    'phone': (('phone',), lambda supplier: supplier.phone),
+    'address': (('address',), lambda supplier: supplier.address),
+}
+
+CATEGORY_FIELDS = {
+    'id': (('id',), lambda category: category.id),
+    'name': (('name',), lambda category: category.name),
+}
+
+@timed_serialization
+def serialize_fields(instance, spec, fields=None):
+    return {name: value(instance) for name, (columns, value) in spec.items() if fields is None or name in fields}
+
+# Aplica al queryset solo las columnas y joins que necesitan los campos pedidos
+def sparse(queryset, spec, fields=None):
+    names = spec if fields is None else fields
+    columns = {'id'} | {column for name in names for column in spec[name][0]}
+    relations = {column.split('__')[0] for column in columns if '__' in column}
+    if relations:
+        queryset = queryset.select_related(*relations)
+    if fields is None:
+        return queryset
+    return queryset.only(*columns)
+
 # Función para serializar la instancia de un producto
-def serialize_product(product):
-    return {
-        'id': product.id,
-        'name': product.name,
-        'price': product.price,
-        'description': product.description,
-        'stock': product.stock,
-        'category': product.category.name,
-        'image': product.image.url if product.image else None,
-        'is_featured': product.is_featured
-    }
+def serialize_product(product, fields=None):
+    return serialize_fields(product, PRODUCT_FIELDS, fields)
     
 # Función para serializar la instancia de un proveedor
-def serialize_supplier(supplier):
-    return {
-        'id': supplier.id,
-        'name': supplier.name,
-        'email': supplier.email,
-        'phone': supplier.phone,
-        'address': supplier.address
-    }
+def serialize_supplier(supplier, fields=None):
+    return serialize_fields(supplier, SUPPLIER_FIELDS, fields)
     
 # Funciòn para serializar la instancia de una categoría
-def serialize_category(category):
-    return {
-        'id': category.id,
-        'name': category.name
-    }
+def serialize_category(category, fields=None):
+    return serialize_fields(category, CATEGORY_FIELDS, fields)
     
+# Sellos de versión para responder 304 a If-None-Match / If-Modified-Since
+def products_stamp(request):
+    return collection_stamp(Product.objects.all(), Category.objects.all())
+
+def product_stamp(request, product_id):
+    return object_stamp(Product.objects, product_id, 'category__updated_at')
+
+def categories_stamp(request):
+    return collection_stamp(Category.objects.all())
+
+def category_stamp(request, category_id):
+    return object_stamp(Category.objects, category_id)
+
+def suppliers_stamp(request):
+    return collection_stamp(Supplier.objects.all())
+
+def supplier_stamp(request, supplier_id):
+    return object_stamp(Supplier.objects, supplier_id)
+
+# Filtros de la lista de productos; todos se traducen a cláusulas WHERE indexadas
+def filter_products(request, products):
+    params = request.GET
+
+    category_id = params.get('category')
+    if category_id:
+        if not category_id.isdigit():
+            raise InvalidQueryParam('El parámetro category debe ser un id numérico')
+        products = products.filter(category_id=int(category_id))
+
+    is_featured = params.get('is_featured')
+    if is_featured:
+        products = products.filter(is_featured=parse_bool(is_featured, 'is_featured'))
+
+    for param, lookup in (('min_price', 'price__gte'), ('max_price', 'price__lte')):
+        value = params.get(param)
+        if value:
+            try:
+                value = Decimal(value)
+            except InvalidOperation:
+                raise InvalidQueryParam(f'El parámetro {param} debe ser numérico')
+            if not value.is_finite():
+                raise InvalidQueryParam(f'El parámetro {param} debe ser numérico')
+            products = products.filter(**{lookup: value})
+
+    in_stock = params.get('in_stock')
+    if in_stock and parse_bool(in_stock, 'in_stock'):
+        products = products.filter(stock__gt=0)
+
+    return products
+
+# Los GET de las listas leen sus parámetros con estas funciones, que comparten con async_views.py.
+# Lanzan InvalidQueryParam si algún parámetro no es válido
+def category_list(request):
+    fields = get_fields(request, CATEGORY_FIELDS)
+    return sparse(Category.objects.all(), CATEGORY_FIELDS, fields).order_by('-id'), fields
+
+def product_list(request):
+    """
+    Lee limit, cursor, stream, fields, ids y los filtros de la lista de productos.
+    Devuelve ``(products, ids, fields, limit, stream)``: con ``?ids=`` el queryset
+    no se filtra (la vista busca esos ids); si no, viene filtrado, acotado por el
+    cursor y ordenado por id descendente.
+    """
+    limit = get_limit(request)
+    cursor = get_cursor(request, 1)
+    stream = wants_stream(request)
+    fields = get_fields(request, PRODUCT_FIELDS)
+    ids = get_ids(request)
+    products = sparse(Product.objects.all(), PRODUCT_FIELDS, fields)
+    if ids is None:
+        products = filter_products(request, products)
+        if cursor:
+            if not isinstance(cursor[0], int):
+                raise InvalidQueryParam('El cursor no es válido')
+            products = products.filter(id__lt=cursor[0])
+        products = products.order_by('-id')
+    return products, ids, fields, limit, stream
+
+def product_cursor(product):
+    return [product.id]
+
 # GET y POST para la lista de categorías
 @csrf_exempt
 @require_http_methods(["GET", "POST"])
+@conditional(categories_stamp)
+@cache_catalogue
 def categories(request):
     
     # GET para obtener todas las categorías en orden de creación
     if request.method == 'GET':
-        categories = Category.objects.all().order_by('-id')
-        categories_data = [serialize_category(category) for category in categories]
+        try:
+            categories, fields = category_list(request)
+            if wants_stream(request):
+                return stream_json('categories', categories, lambda category: serialize_category(category, fields))
+        except InvalidQueryParam as error:
+            return JsonResponse({'status': 'error', 'message': str(error)}, status=400)
+        categories_data = [serialize_category(category, fields) for category in categories]
         return JsonResponse({'categories': categories_data})
     
     # POST para añadir una nueva categoría
@@ -77,12 +197,17 @@ def categories(request):
 # GET, PUT y DELETE para una categoría específica
 @csrf_exempt
 @require_http_methods(["GET", "PUT", "DELETE"])
+@conditional(category_stamp)
 def category_detail(request, category_id):
-    category = get_object_or_404(Category, id=category_id)
+    try:
+        fields = get_fields(request, CATEGORY_FIELDS) if request.method == 'GET' else None
+    except InvalidQueryParam as error:
+        return JsonResponse({'status': 'error', 'message': str(error)}, status=400)
+    category = get_object_or_404(sparse(Category.objects, CATEGORY_FIELDS, fields), id=category_id)
 
     # GET para obtener una categoría específica
     if request.method == 'GET':
-        return JsonResponse({'category': serialize_category(category)})
+        return JsonResponse({'category': serialize_category(category, fields)})
 
     # PUT para actualizar una categoría
     elif request.method == 'PUT':
@@ -118,13 +243,28 @@ def category_detail(request, category_id):
 # GET y POST para la lista de productos
 @csrf_exempt
 @require_http_methods(["GET", "POST"])
+@conditional(products_stamp)
+@cache_catalogue
 def products(request):
     
-    # GET para obtener todos los productos en orden de creación
+    # GET para obtener los productos paginados por cursor (id descendente)
     if request.method == 'GET':
-        products = Product.objects.select_related('category').all().order_by('-id')
-        products_data = [serialize_product(product) for product in products]
-        return JsonResponse({'products': products_data})
+        try:
+            products, ids, fields, limit, stream = product_list(request)
+        except InvalidQueryParam as error:
+            return JsonResponse({'status': 'error', 'message': str(error)}, status=400)
+
+        if ids is not None:
+            # Multi-get (?ids=1,2,3): una sola consulta, en el orden pedido e informando los ids inexistentes
+            return JsonResponse(multi_get('products', ids, products.in_bulk(ids), lambda product: serialize_product(product, fields)))
+
+        # En modo streaming se envía toda la lista filtrada, sin límite de página
+        if stream:
+            return stream_json('products', products, lambda product: serialize_product(product, fields))
+
+        products, next_cursor = paginate(products, limit, product_cursor)
+        products_data = [serialize_product(product, fields) for product in products]
+        return JsonResponse({'products': products_data, 'next_cursor': next_cursor})
     
     # POST para añadir un nuevo producto
     elif request.method == 'POST':
@@ -174,15 +314,77 @@ def products(request):
                 'message': 'Los datos enviados no son válidos'
             }, status=400)
 
+# GET para buscar productos por nombre, descripción y categoría, ordenados por relevancia
+@require_http_methods(["GET"])
+@conditional(products_stamp)
+@cache_catalogue
+def product_search(request):
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({
+            'status': 'alert',
+            'message': 'Por favor ingrese un término de búsqueda'
+        }, status=400)
+
+    try:
+        limit = get_limit(request)
+        fields = get_fields(request, PRODUCT_FIELDS)
+    except InvalidQueryParam as error:
+        return JsonResponse({'status': 'error', 'message': str(error)}, status=400)
+
+    results = search_products(query, limit)
+    products = sparse(Product.objects.all(), PRODUCT_FIELDS, fields).in_bulk([product_id for product_id, score in results])
+    products_data = [
+        dict(serialize_product(products[product_id], fields), score=score)
+        for product_id, score in results
+        if product_id in products
+    ]
+    return JsonResponse({'products': products_data})
+
+# POST para importar o actualizar productos en lote desde CSV o JSONL.
+# El cuerpo se lee línea a línea sin cargarlo completo en memoria
+@csrf_exempt
+@require_http_methods(["POST"])
+def product_import(request):
+    format = request.GET.get('format')
+    if not format:
+        content_type = request.content_type or ''
+        format = 'csv' if content_type == 'text/csv' else 'jsonl' if content_type in ('application/jsonl', 'application/x-ndjson') else None
+    if format not in READERS:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Formato no soportado, use format=csv o format=jsonl'
+        }, status=400)
+
+    try:
+        lines = (line.decode('utf-8') for line in request)
+        report = import_products(lines, format)
+    except UnicodeDecodeError:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'El archivo debe estar codificado en UTF-8'
+        }, status=400)
+
+    return JsonResponse({
+        'status': 'success' if not report['error_count'] else 'alert',
+        'message': 'Importación finalizada',
+        'data': report
+    })
+
 # GET, PUT y DELETE para un producto específico
 @csrf_exempt
 @require_http_methods(["GET", "PUT", "DELETE"])
+@conditional(product_stamp)
 def product_detail(request, product_id):
-    product = get_object_or_404(Product, id=product_id)
+    try:
+        fields = get_fields(request, PRODUCT_FIELDS) if request.method == 'GET' else None
+    except InvalidQueryParam as error:
+        return JsonResponse({'status': 'error', 'message': str(error)}, status=400)
+    product = get_object_or_404(sparse(Product.objects, PRODUCT_FIELDS, fields), id=product_id)
 
     # GET para obtener un producto específico
     if request.method == 'GET':
-        return JsonResponse({'product': serialize_product(product)})
+        return JsonResponse({'product': serialize_product(product, fields)})
 
     # PUT para actualizar un producto
     elif request.method == 'PUT':
@@ -229,12 +431,20 @@ def product_detail(request, product_id):
 # GET y POST para la lista de proveedores
 @csrf_exempt
 @require_http_methods(["GET", "POST"])
+@conditional(suppliers_stamp)
+@cache_catalogue
 def suppliers(request):
         
         # GET para obtener todos los proveedores en orden de creación
         if request.method == 'GET':
-            suppliers = Supplier.objects.all().order_by('-id')
-            suppliers_data = [serialize_supplier(supplier) for supplier in suppliers]
+            try:
+                fields = get_fields(request, SUPPLIER_FIELDS)
+                suppliers = sparse(Supplier.objects.all(), SUPPLIER_FIELDS, fields).order_by('-id')
+                if wants_stream(request):
+                    return stream_json('suppliers', suppliers, lambda supplier: serialize_supplier(supplier, fields))
+            except InvalidQueryParam as error:
+                return JsonResponse({'status': 'error', 'message': str(error)}, status=400)
+            suppliers_data = [serialize_supplier(supplier, fields) for supplier in suppliers]
             return JsonResponse({'suppliers': suppliers_data})
         
         # POST para añadir un nuevo proveedor
@@ -273,12 +483,17 @@ def suppliers(request):
 # GET, PUT y DELETE para un proveedor específico
 @csrf_exempt
 @require_http_methods(["GET", "PUT", "DELETE"])
+@conditional(supplier_stamp)
 def supplier_detail(request, supplier_id):
-    supplier = get_object_or_404(Supplier, id=supplier_id)
+    try:
+        fields = get_fields(request, SUPPLIER_FIELDS) if request.method == 'GET' else None
+    except InvalidQueryParam as error:
+        return JsonResponse({'status': 'error', 'message': str(error)}, status=400)
+    supplier = get_object_or_404(sparse(Supplier.objects, SUPPLIER_FIELDS, fields), id=supplier_id)
 
     # GET para obtener un proveedor específico
     if request.method == 'GET':
-        return JsonResponse({'supplier': serialize_supplier(supplier)})
+        return JsonResponse({'supplier': serialize_supplier(supplier, fields)})
 
     # PUT para actualizar un proveedor
     elif request.method == 'PUT':